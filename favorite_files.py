@@ -8,21 +8,54 @@ Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
 import sublime
 import sublime_plugin
 import os
-from FavoriteFiles.favorites import Favorites
-from FavoriteFiles.lib.notify import error
+import threading
+import time
+from FavoriteFiles.favorites import Favorites, FavFileMgr
+from FavoriteFiles.lib.eviction import LEAST_RECENTLY_OPENED
+from FavoriteFiles.lib.filelock import set_lock_folder
+from FavoriteFiles.lib.frecency import FrecencyIndex, FILES, GROUPS
+from FavoriteFiles.lib.importer import ImportJob, iter_import_paths, IMPORT_LIST, IMPORT_GLOB, IMPORT_TREE
+from FavoriteFiles.lib.metrics import metrics, MetricsLog
+from FavoriteFiles.lib.notify import batch, batched, error, notify
+from FavoriteFiles.lib.prefetch import Prefetcher
+from FavoriteFiles.lib.preview import Preview
+from FavoriteFiles.lib.profiler import profiler
+from FavoriteFiles.lib.projects import ProjectIndex
+from FavoriteFiles.lib.scan import ScanCache
+from FavoriteFiles.lib import settings
+from FavoriteFiles.lib.tasks import TaskScheduler
+
+RULE_STREAM_DELAY = 0.2
+# Entries on each side of the highlighted entry to prefetch
+PREFETCH_NEIGHBOURS = 1
 
 Favs = None
+Frecency = None
+Prefetch = Prefetcher()
+ProjectIdx = None
+PROJECT_INDEX_KEY = 'project_index'
+PRELOAD_KEY = 'preload'
+RuleCache = ScanCache()
+Tasks = TaskScheduler()
 
 
 class FavoriteFilesCleanOrphansCommand(sublime_plugin.WindowCommand):
     """Clean out favorites that no longer exist."""
 
+    @metrics.command('command.FavoriteFilesCleanOrphansCommand')
+    @profiler.profiled('FavoriteFilesCleanOrphansCommand')
+    @batched
     def run(self):
         """Run the command."""
 
-        # Clean out all dead links
-        if not Favs.load(clean=True, win_id=self.window.id()):
-            Favs.load(force=True, clean=True, win_id=self.window.id())
+        win_id = self.window.id()
+
+        def clean():
+            """Clean out all dead links."""
+            if not Favs.load(clean=True, win_id=win_id):
+                Favs.load(force=True, clean=True, win_id=win_id)
+
+        Tasks.submit(task_key('clean', win_id), clean)
 
 
 class FavoriteFilesEditAliasCommand(sublime_plugin.WindowCommand):
@@ -40,7 +73,7 @@ class FavoriteFilesEditAliasCommand(sublime_plugin.WindowCommand):
                 name = self.files[value][0]
 
                 self.current_index = value
-                self.window.show_input_panel("Alias:", name, self.apply_alias, None, None)
+                self.window.show_input_panel("Alias:", name, *profiler.bind_input(self.apply_alias))
             else:
                 # Descend into group
                 value -= self.num_files
@@ -54,7 +87,7 @@ class FavoriteFilesEditAliasCommand(sublime_plugin.WindowCommand):
                 if self.num_files:
                     self.window.show_quick_panel(
                         self.files,
-                        lambda x: self.edit_alias(x, group=True)
+                        profiler.bind(lambda x: self.edit_alias(x, group=True))
                     )
                 else:
                     error("No favorites found! Try adding some.")
@@ -63,38 +96,145 @@ class FavoriteFilesEditAliasCommand(sublime_plugin.WindowCommand):
         """Apply alias."""
 
         if value is not None:
-            Favs.set_alias(value, self.current_index, self.group_name)
+            with Favs.transaction():
+                Favs.set_alias(value, self.current_index, self.group_name)
+
+    def show_panel(self, entries):
+        """Show the favorites panel."""
+
+        if entries is None:
+            return
 
+        self.files, self.groups = entries[:2]
+        self.num_files = len(self.files)
+        self.num_groups = len(self.groups)
+        # initialize group to None, will be set if descending into a group
+        self.group_name = None
+        if self.num_files + self.num_groups > 0:
+            self.window.show_quick_panel(
+                self.files + self.groups,
+                profiler.bind(self.edit_alias)
+            )
+        else:
+            error("No favorites found! Try adding some.")
+
+    @metrics.command('command.FavoriteFilesEditAliasCommand')
+    @profiler.profiled('FavoriteFilesEditAliasCommand')
+    @batched
     def run(self):
         """Run the command."""
 
-        if not Favs.load(win_id=self.window.id()):
-            self.files = Favs.all_files()
-            self.num_files = len(self.files)
-            self.groups = Favs.all_groups()
-            self.num_groups = len(self.groups)
-            # initialize group to None, will be set if descending into a group
-            self.group_name = None
-            if self.num_files + self.num_groups > 0:
-                self.window.show_quick_panel(
-                    self.files + self.groups,
-                    self.edit_alias
-                )
-            else:
-                error("No favorites found! Try adding some.")
+        win_id = self.window.id()
+        Tasks.submit(task_key('edit_alias', win_id), lambda: load_panel_entries(win_id), self.show_panel)
 
 
 class FavoriteFilesOpenCommand(sublime_plugin.WindowCommand):
     """Open the selected favorite(s)."""
 
+    def open_names(self, names):
+        """Open the given files."""
+
+        active_group = self.window.active_group()
+
+        # Iterate through file list ensure they load in proper view index order
+        count = 0
+        focus_view = None
+
+        # Report all missing files at once instead of a dialog per file
+        with batch():
+            for n in names:
+                if os.path.exists(n):
+                    view = self.window.open_file(n)
+                    if view is not None:
+                        focus_view = view
+                        if active_group >= 0:
+                            self.window.set_view_index(view, active_group, count)
+                        count += 1
+                else:
+                    error("The following file does not exist:\n%s" % n)
+        if focus_view is not None:
+            # Horrible ugly hack to ensure opened file gets focus
+            def fn(focus_view):
+                """Ensure focus of view."""
+                self.window.focus_view(focus_view)
+                self.window.show_quick_panel(["None"], None)
+                self.window.run_command("hide_overlay")
+            sublime.set_timeout(lambda: fn(focus_view), 500)
+
+    def open_rule_file(self, value):
+        """Open a file found by a rule."""
+
+        if value == -1:
+            # Panel was dismissed; stop expanding the rule
+            self.rule_token = None
+            return
+
+        if value < len(self.rule_files):
+            self.rule_token = None
+            self.open_names([self.rule_files[value][1]])
+        else:
+            # "Show More" was selected while the rule is still being expanded
+            self.show_rule_panel(self.rule_token)
+
+    def show_rule_panel(self, token):
+        """Show the files found by the rule so far."""
+
+        if token is not self.rule_token:
+            return
+
+        self.rule_files = self.rule_matches[:]
+        items = list(self.rule_files)
+        if not self.rule_done:
+            items.append(["Show More...", "%d files found so far" % len(items)])
+
+        if items:
+            self.window.show_quick_panel(items, profiler.bind(self.open_rule_file))
+        else:
+            error("No files match the rule!")
+
+    def expand_rule(self, rule, token):
+        """Expand the rule in the background and stream the matches to the panel."""
+
+        patterns = [rule] if os.path.isabs(os.path.expanduser(rule)) else [
+            os.path.join(folder, rule) for folder in self.window.folders()
+        ]
+        start = time.time()
+        shown = [False]
+        seen = set()
+
+        def check():
+            """Check for cancellation and show the panel once matches take long; run for each folder and match."""
+
+            if token is not self.rule_token:
+                # Superseded or cancelled
+                return False
+            if not shown[0] and time.time() - start > RULE_STREAM_DELAY:
+                # Show what we have, the rest is available through "Show More"
+                shown[0] = True
+                sublime.set_timeout(lambda: self.show_rule_panel(token), 0)
+            return True
+
+        for pattern in patterns:
+            for path in RuleCache.iter_glob(pattern, check):
+                if not check():
+                    return
+                if path not in seen:
+                    seen.add(path)
+                    self.rule_matches.append([os.path.basename(path), path])
+        if token is not self.rule_token:
+            return
+        self.rule_done = True
+        if not shown[0]:
+            sublime.set_timeout(lambda: self.show_rule_panel(token), 0)
+
     def open_file(self, value, group=False):
         """Open the file(s)."""
 
+        self.close_preview(value, group)
         if value == -1:
             return
 
         if value >= 0:
-            active_group = self.window.active_group()
             if value < self.num_files or (group and value < self.num_files + 1):
                 # Open global file, file in group, or all files in group
                 names = []
@@ -102,67 +242,203 @@ class FavoriteFilesOpenCommand(sublime_plugin.WindowCommand):
                     if value == 0:
                         # Open all files in group
                         names = [self.files[x][1] for x in range(0, self.num_files)]
+                        record_open(GROUPS, self.group_name)
                     else:
                         # Open file in group
                         names.append(self.files[value - 1][1])
+                        record_open(FILES, names[0])
                 else:
                     # Open global file
                     names.append(self.files[value][1])
-
-                # Iterate through file list ensure they load in proper view index order
-                count = 0
-                focus_view = None
-
-                for n in names:
-                    if os.path.exists(n):
-                        view = self.window.open_file(n)
-                        if view is not None:
-                            focus_view = view
-                            if active_group >= 0:
-                                self.window.set_view_index(view, active_group, count)
-                            count += 1
-                    else:
-                        error("The following file does not exist:\n%s" % n)
-                if focus_view is not None:
-                    # Horrible ugly hack to ensure opened file gets focus
-                    def fn(focus_view):
-                        """Ensure focus of view."""
-                        self.window.focus_view(focus_view)
-                        self.window.show_quick_panel(["None"], None)
-                        self.window.run_command("hide_overlay")
-                    sublime.set_timeout(lambda: fn(focus_view), 500)
+                    record_open(FILES, names[0])
+
+                self.open_names(names)
+            elif value >= self.num_files + self.num_groups:
+                # Expand rule
+                token = object()
+                self.rule_token = token
+                self.rule_matches = []
+                self.rule_done = False
+                rule = self.rules[value - self.num_files - self.num_groups][1]
+                # Not on the async thread, which would hold up the tasks of other commands
+                self.rule_worker = threading.Thread(target=self.expand_rule, args=(rule, token))
+                self.rule_worker.daemon = True
+                self.rule_worker.start()
             else:
                 # Descend into group
                 value -= self.num_files
-                self.files = Favs.all_files(group_name=self.groups[value][0].replace("Group: ", "", 1))
+                self.group_name = self.groups[value][0].replace("Group: ", "", 1)
+                self.files = rank_rows(FILES, Favs.all_files(group_name=self.group_name))
                 self.num_files = len(self.files)
                 self.groups = []
                 self.num_groups = 0
 
                 # Show files in group
                 if self.num_files:
+                    self.file_offset = 1
+                    self.start_preview()
                     self.window.show_quick_panel(
                         [["Open Group", ""]] + self.files,
-                        lambda x: self.open_file(x, group=True)
+                        profiler.bind(lambda x: self.open_file(x, group=True)),
+                        on_highlight=self.highlight
                     )
+                    self.highlight(0)
                 else:
                     error("No favorites found! Try adding some.")
 
+    def show_panel(self, entries):
+        """Show the favorites panel."""
+
+        if entries is None:
+            return
+
+        self.files, self.groups, self.rules = entries
+        self.num_files = len(self.files)
+        self.num_groups = len(self.groups)
+        self.rule_token = None
+        self.file_offset = 0
+        if self.num_files + self.num_groups + len(self.rules) > 0:
+            Prefetch.reset(settings.get().prefetch_budget * 1024 * 1024)
+            self.start_preview()
+            self.window.show_quick_panel(
+                self.files + self.groups + self.rules,
+                profiler.bind(self.open_file),
+                on_highlight=self.highlight
+            )
+            self.highlight(0)
+        else:
+            error("No favorites found! Try adding some.")
+
+    def highlighted_file(self, index):
+        """Return the file of a panel row, or `None` if the row is not a file."""
+
+        index -= self.file_offset
+        return self.files[index][1] if 0 <= index < self.num_files else None
+
+    def highlight(self, index):
+        """Prefetch and preview the highlighted row."""
+
+        self.prefetch(index)
+        if self.preview is not None:
+            self.preview.highlight(self.highlighted_file(index))
+
+    def start_preview(self):
+        """Preview highlighted files in the panel about to be shown if enabled."""
+
+        self.preview = Preview(self.window) if settings.get().preview_on_highlight else None
+
+    def close_preview(self, value, group=False):
+        """Drop the preview when the panel closes, keeping the view of a file being opened."""
+
+        if self.preview is None:
+            return
+        if group and value == 0:
+            keep = [f[1] for f in self.files]
+        else:
+            keep = [self.highlighted_file(value)]
+        self.preview.close(keep)
+        self.preview = None
+
+    def prefetch(self, index):
+        """Prefetch the highlighted file and its neighbours into the page cache."""
+
+        if not settings.get().enable_prefetch:
+            return
+
+        # Rows before the files, such as "Open Group"
+        index -= self.file_offset
+        start = max(index - PREFETCH_NEIGHBOURS, 0)
+        end = min(index + PREFETCH_NEIGHBOURS + 1, self.num_files)
+        if start >= end:
+            return
+        # The highlighted file is queued last so it is prefetched first
+        names = [self.files[x][1] for x in range(start, end) if x != index]
+        if 0 <= index < self.num_files:
+            names.append(self.files[index][1])
+        Prefetch.prefetch(names)
+
+    @metrics.command('command.FavoriteFilesOpenCommand')
+    @profiler.profiled('FavoriteFilesOpenCommand')
+    @batched
     def run(self):
         """Run the command."""
 
-        if not Favs.load(win_id=self.window.id()):
-            self.files = Favs.all_files()
-            self.num_files = len(self.files)
-            self.groups = Favs.all_groups()
-            self.num_groups = len(self.groups)
-            if self.num_files + self.num_groups > 0:
-                self.window.show_quick_panel(
-                    self.files + self.groups,
-                    self.open_file
-                )
-            else:
-                error("No favorites found! Try adding some.")
+        win_id = self.window.id()
+        Tasks.submit(
+            task_key('open', win_id),
+            lambda: rank_panel_entries(load_panel_entries(win_id)),
+            self.show_panel
+        )
+
+
+class FavoriteFilesOpenAnyProjectCommand(FavoriteFilesOpenCommand):
+    """Open a favorite from any known project."""
+
+    empty_message = "No project favorites found! Toggle \"Per Projects\" on in a project and add some."
+
+    def open_project_file(self, value):
+        """Open the selected file."""
+
+        self.close_preview(value)
+        if value >= 0:
+            record_open(FILES, self.files[value][1])
+            self.open_names([self.files[value][1]])
+
+    def show_panel(self, rows):
+        """Show the favorites of all projects."""
+
+        if rows is None:
+            return
+
+        self.files = rows
+        self.num_files = len(rows)
+        self.file_offset = 0
+        if rows:
+            Prefetch.reset(settings.get().prefetch_budget * 1024 * 1024)
+            self.start_preview()
+            self.window.show_quick_panel(rows, profiler.bind(self.open_project_file), on_highlight=self.highlight)
+            self.highlight(0)
+        else:
+            error(self.empty_message)
+
+    @metrics.command('command.FavoriteFilesOpenAnyProjectCommand')
+    @profiler.profiled('FavoriteFilesOpenAnyProjectCommand')
+    @batched
+    def run(self):
+        """Run the command."""
+
+        Tasks.submit(PROJECT_INDEX_KEY, ProjectIdx.refresh, self.show_panel)
+
+    def is_enabled(self):
+        """Check if command is enabled."""
+
+        return settings.get().enable_per_projects
+
+
+class FavoriteFilesOpenInFolderCommand(FavoriteFilesOpenAnyProjectCommand):
+    """Open a favorite in the project folders or the given folders."""
+
+    empty_message = "No favorites found in the folder!"
+
+    @metrics.command('command.FavoriteFilesOpenInFolderCommand')
+    @profiler.profiled('FavoriteFilesOpenInFolderCommand')
+    @batched
+    def run(self, paths=None):
+        """Run the command."""
+
+        folders = paths if paths else self.window.folders()
+        win_id = self.window.id()
+        Tasks.submit(task_key('open_in_folder', win_id), lambda: load_folder_rows(win_id, folders), self.show_panel)
+
+    def is_enabled(self, paths=None):
+        """Check if command is enabled."""
+
+        return bool(paths if paths else self.window.folders())
+
+    def is_visible(self, paths=None):
+        """Only show the command for folders in the side bar."""
+
+        return paths is None or all(os.path.isdir(path) for path in paths)
 
 
 class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
@@ -171,44 +447,37 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
     def prompt_for_alias(self, name, group_name=None):
         """Prompt for an alias for the favorite file."""
 
-        index = None
-        files = Favs.obj.files['groups'][group_name] if group_name is not None else Favs.obj.files['files']
-
-        for idx, f in enumerate(files):
-            if f['alias'] == name:
-                index = idx
-                break
-
+        index = Favs.alias_index(name, group_name)
         if index is not None:
             self.current_index = index
             self.group_name = group_name
 
-        self.window.show_input_panel("Alias:", name, self.apply_alias, None, None)
+        self.window.show_input_panel("Alias:", name, *profiler.bind_input(self.apply_alias))
 
     def apply_alias(self, value):
         """Apply alias."""
 
         if value is not None:
-            Favs.set_alias(value, self.current_index, self.group_name)
+            with Favs.transaction():
+                Favs.set_alias(value, self.current_index, self.group_name)
 
     def add(self, names, group_name=None):
         """Add favorites."""
 
         disk_omit_count = 0
         added = 0
-        # Iterate names and add them to group/global if not already added
-        for n in names:
-            if Favs.file_index(n, group_name=group_name) is None:
-                if os.path.exists(n):
-                    Favs.set(n, group_name=group_name)
-                    added += 1
-                else:
-                    # File does not exist on disk; cannot add
-                    disk_omit_count += 1
+        # Iterate names and add them to group/global if not already added (saved once)
+        with Favs.transaction():
+            for n in names:
+                if Favs.file_index(n, group_name=group_name) is None:
+                    if os.path.exists(n):
+                        if Favs.set(n, group_name=group_name):
+                            added += 1
+                    else:
+                        # File does not exist on disk; cannot add
+                        disk_omit_count += 1
         if added:
-            # Save if files were added
-            Favs.save(True)
-            if len(names) == 1 and settings().get('always_ask_alias', False):
+            if len(names) == 1 and settings.get().always_ask_alias:
                 self.prompt_for_alias(os.path.basename(names[0]), group_name)
 
         if disk_omit_count:
@@ -233,16 +502,15 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
             repeat = True
         else:
             # Add group
-            Favs.add_group(value)
-            self.add(self.name, value)
+            with Favs.transaction():
+                Favs.add_group(value)
+                self.add(self.name, value)
         if repeat:
             # Ask again if name was not sufficient
             v = self.window.show_input_panel(
                 "Create Group: ",
                 "New Group",
-                self.create_group,
-                None,
-                None
+                *profiler.bind_input(self.create_group)
             )
             v.run_command("select_all")
 
@@ -251,11 +519,12 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
 
         if value >= 0:
             group_name = self.groups[value][0].replace("Group: ", "", 1)
-            if replace:
-                # Start with empty group for "Replace Group" selection
-                Favs.add_group(group_name)
-            # Add favorites
-            self.add(self.name, group_name)
+            with Favs.transaction():
+                if replace:
+                    # Start with empty group for "Replace Group" selection
+                    Favs.add_group(group_name)
+                # Add favorites
+                self.add(self.name, group_name)
 
     def show_groups(self, replace=False):
         """Prompt user with stored groups."""
@@ -264,7 +533,7 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
         self.groups = Favs.all_groups()
         self.window.show_quick_panel(
             self.groups,
-            lambda x: self.select_group(x, replace=replace)
+            profiler.bind(lambda x: self.select_group(x, replace=replace))
         )
 
     def group_answer(self, value):
@@ -279,9 +548,7 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
                 v = self.window.show_input_panel(
                     "Create Group: ",
                     "New Group",
-                    self.create_group,
-                    None,
-                    None
+                    *profiler.bind_input(self.create_group)
                 )
                 v.run_command("select_all")
             elif value == 2:
@@ -302,7 +569,7 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
 
         self.window.show_quick_panel(
             self.group,
-            self.group_answer
+            profiler.bind(self.group_answer)
         )
 
     def file_answer(self, value):
@@ -354,9 +621,12 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
         # Preset file options
         self.window.show_quick_panel(
             options,
-            self.file_answer
+            profiler.bind(self.file_answer)
         )
 
+    @metrics.command('command.FavoriteFilesAddCommand')
+    @profiler.profiled('FavoriteFilesAddCommand')
+    @batched
     def run(self):
         """Run the command."""
 
@@ -386,6 +656,139 @@ class FavoriteFilesAddCommand(sublime_plugin.WindowCommand):
                     self.group_prompt()
 
 
+class FavoriteFilesAddRuleCommand(sublime_plugin.WindowCommand):
+    """Add a folder or glob rule whose files are found when the favorites are shown."""
+
+    def add_rule(self, value):
+        """Add the rule."""
+
+        value = value.strip()
+        if not value:
+            error("Please provide a valid folder or glob pattern.")
+        elif not Favs.load(win_id=self.window.id()):
+            if Favs.rule_exists(value):
+                error("Rule \"%s\" already exists." % value)
+            else:
+                with Favs.transaction():
+                    Favs.add_rule(value)
+
+    @metrics.command('command.FavoriteFilesAddRuleCommand')
+    @profiler.profiled('FavoriteFilesAddRuleCommand')
+    @batched
+    def run(self, rule=None):
+        """Run the command."""
+
+        if rule is not None:
+            self.add_rule(rule)
+        else:
+            self.window.show_input_panel("Folder or Glob Pattern: ", "", *profiler.bind_input(self.add_rule))
+
+
+class FavoriteFilesImportCommand(sublime_plugin.WindowCommand):
+    """Import favorites in bulk from a path list, glob pattern, or folder."""
+
+    job = None
+    modes = [
+        [IMPORT_LIST, "Import From Path List", "Text file with one path per line"],
+        [IMPORT_GLOB, "Import From Glob Pattern", "Use '**' to match any number of folders"],
+        [IMPORT_TREE, "Import From Folder", "All files under the folder"]
+    ]
+
+    def progress(self, checked, found):
+        """Show import progress."""
+
+        sublime.status_message("FavoriteFiles: Importing... %d checked, %d found" % (checked, found))
+
+    def collect(self, job, win_id):
+        """Collect and commit the files to import (runs on the import's own thread)."""
+
+        added = 0
+        try:
+            if Favs.load(win_id=win_id):
+                # The list could not be read; cancel silently (the load reported the error)
+                job.cancel()
+                job.cancelled = True
+            else:
+                job.seen.update(Favs.file_lookup(self.group_name))
+                job.collect(self.progress)
+                added = job.commit(Favs, self.group_name)
+        except Exception as e:
+            print("FavoriteFiles: Failed to import favorites: %s" % e)
+            job.error = str(e)
+        finally:
+            # Always report, so another import can be started
+            sublime.set_timeout(lambda: self.finish(job, added), 0)
+
+    def finish(self, job, added):
+        """Report the result of the import on the UI thread."""
+
+        FavoriteFilesImportCommand.job = None
+        if job.error is not None:
+            error("Failed to import favorites!\n%s" % job.error)
+        elif job.cancelled:
+            if job.checked:
+                notify("Import cancelled.")
+        else:
+            notify("Imported %d favorite(s)." % added)
+            if job.missing:
+                error("%d file(s) do not exist on disk!" % job.missing)
+
+    def start(self, source, mode):
+        """Start the import."""
+
+        if not source:
+            error("Please provide a valid import source.")
+            return
+
+        try:
+            paths = iter_import_paths(source, mode)
+        except ValueError as e:
+            error(str(e))
+            return
+
+        win_id = self.window.id()
+        job = ImportJob(paths)
+        FavoriteFilesImportCommand.job = job
+        # Not on the async thread, which would hold up the tasks of other commands
+        self.worker = threading.Thread(target=self.collect, args=(job, win_id))
+        self.worker.daemon = True
+        self.worker.start()
+
+    def prompt_source(self, value):
+        """Prompt for the import source."""
+
+        if value >= 0:
+            mode, caption = self.modes[value][:2]
+            self.window.show_input_panel(caption + ": ", "", *profiler.bind_input(lambda x: self.start(x, mode)))
+
+    @metrics.command('command.FavoriteFilesImportCommand')
+    @profiler.profiled('FavoriteFilesImportCommand')
+    @batched
+    def run(self, source=None, mode=None, group=None, cancel=False):
+        """Run the command."""
+
+        if cancel:
+            if FavoriteFilesImportCommand.job is not None:
+                FavoriteFilesImportCommand.job.cancel()
+            return
+
+        if FavoriteFilesImportCommand.job is not None:
+            error("An import is already in progress!")
+            return
+
+        self.group_name = group
+        if source is not None:
+            self.start(source, mode if mode is not None else IMPORT_LIST)
+        elif mode is not None:
+            modes = [m[0] for m in self.modes]
+            if mode in modes:
+                self.prompt_source(modes.index(mode))
+            else:
+                error("Unknown import mode '%s'" % mode)
+        else:
+            self.window.show_quick_panel([m[1:] for m in self.modes], profiler.bind(self.prompt_source))
+
+
 class FavoriteFilesRemoveCommand(sublime_plugin.WindowCommand):
     """Remove the file favorites from the tracked list."""
 
@@ -401,8 +804,8 @@ class FavoriteFilesRemoveCommand(sublime_plugin.WindowCommand):
                         return
                     if value == 0:
                         # Remove group
-                        Favs.remove_group(group_name)
-                        Favs.save(True)
+                        with Favs.transaction():
+                            Favs.remove_group(group_name)
                         return
                     else:
                         # Remove group file
@@ -412,8 +815,12 @@ class FavoriteFilesRemoveCommand(sublime_plugin.WindowCommand):
                     name = self.files[value][1]
 
                 # Remove file and save
-                Favs.remove(name, group_name=group_name)
-                Favs.save(True)
+                with Favs.transaction():
+                    Favs.remove(name, group_name=group_name)
+            elif value >= self.num_files + self.num_groups:
+                # Remove rule
+                with Favs.transaction():
+                    Favs.remove_rule(self.rules[value - self.num_files - self.num_groups][1])
             else:
                 # Descend into group
                 value -= self.num_files
@@ -426,34 +833,47 @@ class FavoriteFilesRemoveCommand(sublime_plugin.WindowCommand):
                 if self.num_files:
                     self.window.show_quick_panel(
                         [["Remove Group", ""]] + self.files,
-                        lambda x: self.remove(x, group=True, group_name=group_name)
+                        profiler.bind(lambda x: self.remove(x, group=True, group_name=group_name))
                     )
                 else:
                     error("No favorites found! Try adding some.")
 
+    def show_panel(self, entries):
+        """Show the favorites panel."""
+
+        if entries is None:
+            return
+
+        # Present files, groups, and rules for removal
+        self.files, self.groups, self.rules = entries
+        self.num_files = len(self.files)
+        self.num_groups = len(self.groups)
+
+        # Show panel
+        if self.num_files + self.num_groups + len(self.rules) > 0:
+            self.window.show_quick_panel(
+                self.files + self.groups + self.rules,
+                profiler.bind(self.remove)
+            )
+        else:
+            error("No favorites to remove!")
+
+    @metrics.command('command.FavoriteFilesRemoveCommand')
+    @profiler.profiled('FavoriteFilesRemoveCommand')
+    @batched
     def run(self):
         """Run the command."""
 
-        if not Favs.load(win_id=self.window.id()):
-            # Present both files and groups for removal
-            self.files = Favs.all_files()
-            self.num_files = len(self.files)
-            self.groups = Favs.all_groups()
-            self.num_groups = len(self.groups)
-
-            # Show panel
-            if self.num_files + self.num_groups > 0:
-                self.window.show_quick_panel(
-                    self.files + self.groups,
-                    self.remove
-                )
-            else:
-                error("No favorites to remove!")
+        win_id = self.window.id()
+        Tasks.submit(task_key('remove', win_id), lambda: load_panel_entries(win_id), self.show_panel)
 
 
 class FavoriteFilesTogglePerProjectCommand(sublime_plugin.WindowCommand):
     """Toggle per project favorites."""
 
+    @metrics.command('command.FavoriteFilesTogglePerProjectCommand')
+    @profiler.profiled('FavoriteFilesTogglePerProjectCommand')
+    @batched
     def run(self):
         """Run the command."""
         win_id = self.window.id()
@@ -466,12 +886,120 @@ class FavoriteFilesTogglePerProjectCommand(sublime_plugin.WindowCommand):
         if Favs.toggle_per_projects(win_id):
             error('Could not find a project file!')
         else:
-            Favs.open(win_id=self.window.id())
+            Tasks.submit(task_key('toggle', win_id), lambda: Favs.open(win_id=win_id))
+            # Pick up the new project list in the cross project index
+            Tasks.submit(PROJECT_INDEX_KEY, ProjectIdx.refresh)
 
     def is_enabled(self):
         """Check if command is enabled."""
 
-        return settings().get("enable_per_projects", False)
+        return settings.get().enable_per_projects
+
+
+class FavoriteFilesProfileCommand(sublime_plugin.WindowCommand):
+    """Profile the next FavoriteFiles command invocations."""
+
+    def start(self, value):
+        """Arm the profiler."""
+
+        try:
+            count = int(value)
+        except ValueError:
+            count = 0
+        if count <= 0:
+            error("Please provide a valid number of commands to profile.")
+            return
+
+        profiler.arm(count, os.path.join(sublime.packages_path(), 'User', 'FavoriteFiles', 'profiles'))
+        notify("Profiling the next %d command(s)." % count)
+
+    def run(self, count=None):
+        """Run the command."""
+
+        if count is not None:
+            self.start(count)
+        else:
+            self.window.show_input_panel("Number of Commands to Profile: ", "1", self.start, None, None)
+
+
+class FavoriteFilesProfileSummaryCommand(sublime_plugin.WindowCommand):
+    """Show the summaries of the last profiled commands."""
+
+    def run(self):
+        """Show the summaries in a new view."""
+
+        summaries = profiler.summaries()
+        if not summaries:
+            error("No profiles captured! Run \"Favorite Files: Profile Commands\" first.")
+            return
+
+        text = []
+        for filename in summaries:
+            with open(filename) as f:
+                text.append(f.read())
+        view = self.window.new_file()
+        view.set_name('FavoriteFiles - Profile')
+        view.settings().set('gutter', False)
+        view.settings().set('word_wrap', False)
+        view.run_command('insert', {"characters": ('\n' + '=' * 80 + '\n\n').join(text)})
+        view.set_read_only(True)
+        view.set_scratch(True)
+
+
+def task_key(command, win_id):
+    """Return the key of a command's task for the window's favorites (only identical requests are merged)."""
+
+    return command, Favs.file_for_window(win_id)
+
+
+def load_panel_entries(win_id):
+    """Load the window's favorites and return the top level panel entries (runs off the UI thread)."""
+
+    if Favs.load(win_id=win_id):
+        return None
+    return Favs.panel_entries()
+
+
+def load_folder_rows(win_id, folders):
+    """Load the window's favorites and return the rows of those in the folders (runs off the UI thread)."""
+
+    if Favs.load(win_id=win_id):
+        return None
+    rows = []
+    seen = set()
+    for folder in folders:
+        for alias, name, group in Favs.files_under(folder):
+            if (name, group) not in seen:
+                seen.add((name, group))
+                rows.append([alias, name, "Group: %s" % group if group is not None else "Global"])
+    return rank_rows(FILES, rows)
+
+
+def rank_rows(kind, rows):
+    """Order panel rows by frecency if it is enabled."""
+
+    if not settings.get().enable_frecency:
+        return rows
+    if kind == FILES:
+        return Frecency.rank(FILES, rows, lambda row: row[1])
+    return Frecency.rank(GROUPS, rows, lambda row: row[0].replace("Group: ", "", 1))
+
+
+def rank_panel_entries(entries):
+    """Order the top level panel entries by frecency (runs off the UI thread)."""
+
+    if entries is None:
+        return None
+    files, groups, rules = entries
+    return rank_rows(FILES, files), rank_rows(GROUPS, groups), rules
+
+
+def record_open(kind, key):
+    """Record an open of a file or group if frecency or least recently opened eviction is enabled."""
+
+    options = settings.get()
+    if options.enable_frecency or options.favorite_eviction == LEAST_RECENTLY_OPENED:
+        Frecency.record(kind, key)
 
 
 def check_st_version():
@@ -483,14 +1011,38 @@ def check_st_version():
             window.run_command('open_file', {"file": "${packages}/FavoriteFiles/messages/upgrade-st-3080.md"})
 
 
-def settings():
-    """Return settings file."""
-    return sublime.load_settings("favorite_files.sublime-settings")
+def setup_metrics(options):
+    """Enable or disable metrics and the periodic metrics log."""
+
+    metrics.enabled = options.enable_metrics
+    interval = options.metrics_log_interval
+    if metrics.enabled and interval > 0:
+        MetricsLog.start(os.path.join(sublime.packages_path(), 'User', 'favorite_files_metrics.log'), interval)
+    else:
+        MetricsLog.stop()
 
 
 def plugin_loaded():
     """Setup plugin."""
 
     global Favs
-    Favs = Favorites(os.path.join(sublime.packages_path(), 'User', 'favorite_files_list.json'))
+    global Frecency
+    global ProjectIdx
+    settings.add_listener('favorite_files_metrics', setup_metrics)
+    settings.load()
+    set_lock_folder(os.path.join(sublime.packages_path(), 'User', 'FavoriteFiles', 'locks'))
+    Frecency = FrecencyIndex(os.path.join(sublime.packages_path(), 'User', 'FavoriteFiles', 'frecency.json'))
+    Favs = Favorites(
+        os.path.join(sublime.packages_path(), 'User', 'favorite_files_list.json'),
+        os.path.join(sublime.packages_path(), 'User', 'FavoriteFiles', 'state.json'),
+        lambda name: Frecency.last_open(FILES, name)
+    )
+    ProjectIdx = ProjectIndex(
+        os.path.join(sublime.packages_path(), 'User', 'FavoriteFiles', 'projects.json'),
+        FavFileMgr.read_favs_file
+    )
+    if settings.get().enable_per_projects:
+        # Parse the lists of restored project windows and build the cross project index in the background
+        Tasks.submit(PRELOAD_KEY, Favs.preload)
+        Tasks.submit(PROJECT_INDEX_KEY, ProjectIdx.refresh)
     check_st_version()
@@ -8,21 +8,80 @@ Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
 import sublime
 import os
 import json
-
+import time
+import traceback
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from FavoriteFiles.lib.changes import ChangeSet, apply_file_list
+from FavoriteFiles.lib.eviction import EvictionQueue, LEAST_RECENTLY_OPENED, POLICIES, REJECT
 from FavoriteFiles.lib.file_strip.json import sanitize_json
-from FavoriteFiles.lib.notify import error
+from FavoriteFiles.lib.filelock import locked, file_version, save_file, temp_name
+from FavoriteFiles.lib.merge import merge_file_lists
+from FavoriteFiles.lib.metrics import metrics
+from FavoriteFiles.lib.migrate import migrate, LATEST_VERSION
+from FavoriteFiles.lib.notify import error, notify
+from FavoriteFiles.lib.pathtrie import PathTrie
+from FavoriteFiles.lib.projects import project_favs_file
+from FavoriteFiles.lib.relocate import fingerprint, relocate_entries
+from FavoriteFiles.lib.rwlock import RWLock
+from FavoriteFiles.lib import settings
 
 FAVORITE_LIST_VERSION = 1
+# Parsed lists of other windows kept for switching back
+MAX_PRELOADED = 8
+
+
+def copy_file_list(file_list):
+    """Copy a favorites list so it can be used without holding the lock."""
+
+    data = dict(file_list)
+    data["files"] = [dict(entry) for entry in file_list.get("files", [])]
+    data["groups"] = dict((k, [dict(entry) for entry in v]) for k, v in file_list.get("groups", {}).items())
+    if "rules" in file_list:
+        data["rules"] = [dict(entry) for entry in file_list["rules"]]
+    return data
 
 
 class FavObj(object):
-    """Favorite object for tracking current state."""
+    """
+    Favorite object for tracking current state.
 
-    files = {}
-    projects = set([])
-    last_access = 0
-    global_file = ""
-    file_name = ""
+    All state is guarded by `lock`: hold the read lock to access it and the write lock to change it.
+    """
+
+    def __init__(self, global_file=""):
+        """Initialize."""
+
+        self.files = {"version": 2, "files": [], "groups": {}}
+        self.projects = set([])
+        # Project files with per project favorites on, kept in `state_file` across restarts
+        self.project_files = set([])
+        self.state_file = None
+        self.last_access = 0
+        self.global_file = global_file
+        self.file_name = global_file
+        # File name and compressed text of the list as last read or written, and the
+        # fingerprint of the file at the time; used to merge changes made by others.
+        self.base = None
+        self.disk_fp = None
+        # File `files` was read from, and changes read from disk not yet sent to listeners
+        self.loaded_from = None
+        # Other lists already parsed, oldest first: file name to (fingerprint, list, compressed text)
+        self.preloaded = OrderedDict()
+        self.changes = None
+        self.listeners = {}
+        # Copy of `files` taken when the outermost transaction started
+        self.transaction = None
+        # Entries of `files` by path, built when first needed
+        self.trie = None
+        # Eviction queues of full lists by group (`None` for the global list), and the
+        # number of favorites evicted and rejected since last reported
+        self.evict = {}
+        self.overflow = [0, 0]
+        self.lock = RWLock()
 
 
 class FavProjects(object):
@@ -33,13 +92,41 @@ class FavProjects(object):
         """Add window to projects."""
 
         obj.projects.add(win_id)
+        project = cls.get_project(win_id)
+        if project is not None and project not in obj.project_files:
+            obj.project_files.add(project)
+            cls.save_state(obj)
 
     @classmethod
     def remove(cls, obj, win_id):
         """Remove window from projects."""
 
-        if cls.is_project_tracked(obj, win_id):
-            obj.projects.remove(win_id)
+        obj.projects.discard(win_id)
+        project = cls.get_project(win_id)
+        if project in obj.project_files:
+            obj.project_files.remove(project)
+            cls.save_state(obj)
+
+    @classmethod
+    def load_state(cls, obj):
+        """Load the projects with per project favorites on."""
+
+        if obj.state_file is None:
+            return
+        try:
+            with open(obj.state_file) as f:
+                state = json.load(f)
+            projects = state.get("per_projects", [])
+        except (OSError, IOError, ValueError, AttributeError):
+            projects = []
+        obj.project_files = set(p for p in projects if isinstance(p, str))
+
+    @classmethod
+    def save_state(cls, obj):
+        """Save the projects with per project favorites on."""
+
+        if obj.state_file is not None:
+            save_file(obj.state_file, json.dumps({"per_projects": sorted(obj.project_files)}, indent=4))
 
     @classmethod
     def prune_projects(cls, obj):
@@ -51,9 +138,11 @@ class FavProjects(object):
 
     @classmethod
     def is_project_tracked(cls, obj, win_id):
-        """Check if the current window project is being tracked."""
+        """Check if the current window project is being tracked (and per project favorites are enabled)."""
 
-        return True if win_id is not None and win_id in obj.projects else False
+        if win_id is None or not settings.get().enable_per_projects:
+            return False
+        return win_id in obj.projects or cls.get_project(win_id) in obj.project_files
 
     @classmethod
     def project_adjust(cls, obj, win_id, force=False):
@@ -63,10 +152,10 @@ class FavProjects(object):
         if enabled:
             project = cls.get_project(win_id)
             if project is not None:
-                project_favs = os.path.splitext(project)[0] + "-favs.json"
+                project_favs = project_favs_file(project)
             if not os.path.exists(project_favs) and not force:
                 error('Cannot find favorite list!\nProject name probably changed.\nSwitching to global list.')
-                obj.projects.remove(win_id)
+                cls.remove(obj, win_id)
                 obj.file_name = obj.global_file
                 obj.last_access = 0
             # Make sure project is the new target
@@ -78,6 +167,16 @@ class FavProjects(object):
             obj.last_access = 0
         return enabled
 
+    @classmethod
+    def favs_file(cls, obj, win_id):
+        """Return the favorites file the window uses without switching to it."""
+
+        if cls.is_project_tracked(obj, win_id):
+            project = cls.get_project(win_id)
+            if project is not None:
+                return project_favs_file(project)
+        return obj.global_file
+
     @classmethod
     def has_project(cls, win_id):
         """Check if window has a project."""
@@ -102,45 +201,213 @@ class FavProjects(object):
 class FavFileMgr(object):
     """Handle file actions."""
 
+    @classmethod
+    def disk_fingerprint(cls, st):
+        """Return the fingerprint of a favorites file's stat result."""
+
+        return file_version(st)
+
+    @classmethod
+    def parse_favs(cls, text):
+        """Parse the text of a favorite list."""
+
+        # Allow C style comments and be forgiving of trailing commas
+        with metrics.timer('sanitize_json'):
+            content = sanitize_json(text, True)
+        return json.loads(content)
+
+    @classmethod
+    @metrics.timed('read_favs_file')
+    def load_favs_file(cls, filename):
+        """Read a favorite list and return its content, text, and the fingerprint of the file read."""
+
+        with open(filename) as file:
+            fp = cls.disk_fingerprint(os.fstat(file.fileno()))
+            text = file.read()
+        return cls.parse_favs(text), text, fp
+
     @classmethod
     def read_favs_file(cls, filename):
         """Read currently handled favorite list and returns its content."""
 
-        with open(filename) as file:
-            # Allow C style comments and be forgiving of trailing commas
-            content = sanitize_json(file.read(), True)
-        return json.loads(content)
+        return cls.load_favs_file(filename)[0]
 
     @classmethod
+    @metrics.timed('write_favs_file')
     def write_favs_file(cls, filename, data):
-        """Write currently handled favorite list."""
+        """Write currently handled favorite list and return the text written."""
 
-        with open(filename, "w") as file:
-            json.dump(data, file, sort_keys=True, indent=4, separators=(',', ': '))
+        text = json.dumps(data, sort_keys=True, indent=4, separators=(',', ': '))
+        # Write to a temporary file and swap it in so readers never see a partial list
+        temp = temp_name(filename)
+        with open(temp, "w") as file:
+            file.write(text)
+        try:
+            os.replace(temp, filename)
+        except OSError:
+            # The file may be held open (Windows); write it in place
+            os.remove(temp)
+            with open(filename, "w") as file:
+                file.write(text)
+        return text
+
+    @classmethod
+    def set_base(cls, obj, text, fp):
+        """Remember the list as it is on disk."""
+
+        obj.base = (obj.file_name, zlib.compress(text.encode('utf-8'), 1))
+        obj.disk_fp = fp
+
+    @classmethod
+    def merge_disk_changes(cls, obj, file_list):
+        """
+        Merge changes others saved since the list was read into `file_list`.
+
+        The file lock must be held. `file_list` is updated in place.
+        """
+
+        if obj.base is None or obj.base[0] != obj.file_name:
+            return
+        changes = cls.merge_from_disk(obj.file_name, obj.base[1], obj.disk_fp, file_list)
+        if changes is not None and file_list is obj.files:
+            cls.queue_disk_changes(obj, changes)
+
+    @classmethod
+    def merge_from_disk(cls, filename, packed, fp, file_list):
+        """
+        Merge changes saved to the file since the compressed text `packed` was read at fingerprint `fp`.
+
+        The file lock must be held. `file_list` is updated in place and the changes are returned,
+        or `None` if nothing was merged.
+        """
+
+        try:
+            st = os.stat(filename)
+        except OSError:
+            # Removed by someone else; the local list is written again
+            return None
+        if cls.disk_fingerprint(st) == fp:
+            return None
+
+        remote = cls.read_favs_file(filename)
+        if remote.get("version") != 2:
+            return None
+        base = cls.parse_favs(zlib.decompress(packed).decode('utf-8'))
+        changes = apply_file_list(file_list, merge_file_lists(base, file_list, remote), filename)
+        metrics.incr('write_favs_file.merge')
+        return changes
+
+    @classmethod
+    def queue_changes(cls, obj, changes):
+        """Queue changes for the listeners (write lock must be held)."""
+
+        if changes.is_empty():
+            return
+        cls.update_trie(obj, changes)
+        metrics.incr('load_favorite_files.changes', len(changes))
+        if obj.changes is None:
+            obj.changes = changes
+        else:
+            obj.changes.extend(changes)
+
+    @classmethod
+    def queue_disk_changes(cls, obj, changes):
+        """Queue changes read from disk (write lock must be held)."""
+
+        if not changes.is_empty():
+            # Eviction queues follow the changes made through `Favorites`, not these
+            obj.evict.clear()
+        cls.queue_changes(obj, changes)
+
+    @classmethod
+    def path_trie(cls, obj):
+        """Return the path trie of the list, building it if needed (write lock must be held)."""
+
+        if obj.trie is None:
+            obj.trie = PathTrie.from_file_list(obj.files)
+        return obj.trie
+
+    @classmethod
+    def update_trie(cls, obj, changes):
+        """Apply changes made to `obj.files` to the path trie (write lock must be held)."""
+
+        if obj.trie is None:
+            return
+        if changes.reset:
+            obj.trie = None
+            return
+        for group, entry in changes.removed:
+            obj.trie.discard(group, entry['file'])
+        for group, old, new in changes.changed:
+            obj.trie.add(group, new)
+        for group, entry in changes.added:
+            obj.trie.add(group, entry)
+
+    @classmethod
+    def dispatch_changes(cls, obj):
+        """Send queued changes to the listeners."""
+
+        with obj.lock.write():
+            changes = obj.changes
+            obj.changes = None
+            listeners = list(obj.listeners.values())
+        if changes is not None:
+            for callback in listeners:
+                try:
+                    callback(changes)
+                except Exception:
+                    traceback.print_exc()
+
+    @classmethod
+    def preload(cls, filename):
+        """Read a favorites list for the preload cache, or return `None` on failure."""
+
+        try:
+            file_list, text, fp = cls.load_current_favs_file(filename)
+        except Exception as e:
+            print("FavoriteFiles: Failed to preload %s: %s" % (filename, e))
+            return None
+        return fp, file_list, zlib.compress(text.encode('utf-8'), 1)
 
     @classmethod
-    def check_plugin_version(cls, favs):
-        """Perform necessary operations, when updating from a previous version."""
+    def keep_preloaded(cls, obj, filename, cached):
+        """
+        Keep a parsed list for when a window using it is used again (write lock must be held).
 
-        data = cls.read_favs_file(favs)
+        Lists no open window uses are dropped, as are the oldest beyond `MAX_PRELOADED`.
+        """
 
-        if data["version"] == 1:
-            cls._update_version2(data, favs)
+        obj.preloaded[filename] = cached
+        used = set(FavProjects.favs_file(obj, w.id()) for w in sublime.windows())
+        for name in [name for name in obj.preloaded if name not in used]:
+            del obj.preloaded[name]
+        while len(obj.preloaded) > MAX_PRELOADED:
+            obj.preloaded.popitem(last=False)
 
     @classmethod
-    def _update_version2(cls, data, favs):
-        """Update to version 2."""
+    def is_current(cls, filename, fp):
+        """Check if the file on disk still has the fingerprint."""
 
-        data["files"] = [
-            {"file": filename, "alias": os.path.basename(filename)} for filename in data["files"]
-        ]
+        try:
+            return cls.disk_fingerprint(os.stat(filename)) == fp
+        except OSError:
+            return False
 
-        for group in data['groups']:
-            data['groups'][group] = [
-                {"file": filename, "alias": os.path.basename(filename)} for filename in data['groups'][group]
-            ]
-        data["version"] = 2
-        cls.write_favs_file(favs, data)
+    @classmethod
+    def load_current_favs_file(cls, filename):
+        """Read a favorite list like `load_favs_file`, migrating it to the latest version first if needed."""
+
+        file_list, text, fp = cls.load_favs_file(filename)
+        attempts = 3
+        while file_list.get("version", 1) < LATEST_VERSION:
+            if not attempts:
+                raise RuntimeError("%s kept changing while it was migrated" % os.path.basename(filename))
+            del text
+            if migrate(filename, file_list, fp) is None:
+                # Saved by someone else before it could be migrated; start over with what they saved
+                attempts -= 1
+            file_list, text, fp = cls.load_favs_file(filename)
+        return file_list, text, fp
 
     @classmethod
     def is_global_file(cls, obj):
@@ -149,14 +416,33 @@ class FavFileMgr(object):
         return obj.file_name == obj.global_file
 
     @classmethod
+    @metrics.timed('clean_orphaned_favorites')
     def clean_orphaned_favorites(cls, file_list):
-        """Clean out dead links in global list and group lists and remove empty groups."""
-
-        file_list["files"] = [f for f in file_list["files"] if os.path.exists(f['file'])]
-        for g in file_list["groups"]:
-            file_list["groups"][g] = [f for f in file_list["groups"][g] if os.path.exists(f['file'])]
-            if len(file_list["groups"][g]) == 0:
-                del file_list["groups"][g]
+        """
+        Clean out dead links in global list and group lists and remove empty groups.
+
+        Files that moved under one of the `relocation_roots` are found by their
+        fingerprint and updated instead of being dropped.
+        """
+
+        missing = []
+        for entries in [file_list["files"]] + list(file_list["groups"].values()):
+            for entry in entries:
+                fp = fingerprint(entry['file'])
+                if fp is None:
+                    missing.append(entry)
+                else:
+                    # Keep fingerprints current so the file can be found if it moves
+                    entry['fingerprint'] = fp
+
+        if missing:
+            moved = relocate_entries(missing, settings.get().relocation_roots)
+            orphans = set(id(entry) for entry in missing) - set(id(entry) for entry in moved)
+            file_list["files"] = [f for f in file_list["files"] if id(f) not in orphans]
+            for g in list(file_list["groups"]):
+                file_list["groups"][g] = [f for f in file_list["groups"][g] if id(f) not in orphans]
+                if len(file_list["groups"][g]) == 0:
+                    del file_list["groups"][g]
 
     @classmethod
     def create_favorite_list(cls, obj, file_list, force=False):
@@ -164,46 +450,123 @@ class FavFileMgr(object):
 
         errors = False
 
-        if not os.path.exists(obj.file_name) or force:
-            try:
-                # Save as a JSON file
-                cls.write_favs_file(obj.file_name, file_list)
-                obj.last_access = os.path.getmtime(obj.file_name)
-            except Exception:
-                error('Failed to write %s!' % os.path.basename(obj.file_name))
-                errors = True
+        with obj.lock.write():
+            if not os.path.exists(obj.file_name) or force:
+                try:
+                    # Save as a JSON file, keeping changes others made since it was read
+                    with locked(obj.file_name):
+                        cls.merge_disk_changes(obj, file_list)
+                        text = cls.write_favs_file(obj.file_name, file_list)
+                        st = os.stat(obj.file_name)
+                    obj.last_access = st.st_mtime
+                    cls.set_base(obj, text, cls.disk_fingerprint(st))
+                except Exception:
+                    error('Failed to write %s!' % os.path.basename(obj.file_name))
+                    errors = True
         return errors
 
     @classmethod
-    def load_favorites(cls, obj, clean=False):
-        """Load favorites list."""
+    def read_favorites(cls, filename, cached, clean=False):
+        """
+        Read the favorites list, cleaning it if requested (runs without the lock held).
 
-        errors = False
-        try:
-            file_list = cls.read_favs_file(obj.file_name)
+        `cached` is a preloaded `(fingerprint, list, compressed text)`, used if still current.
+        Return the list, its compressed text, and the fingerprint and modification time of the file.
+        """
 
-            # Clean out dead links
-            if clean:
-                cls.clean_orphaned_favorites(file_list)
-                cls.create_favorite_list(obj, file_list, force=True)
+        if cached is not None and cls.is_current(filename, cached[0]):
+            metrics.incr('load_favorite_files.preloaded')
+            fp, file_list, packed = cached
+        else:
+            file_list, text, fp = cls.load_current_favs_file(filename)
+            packed = zlib.compress(text.encode('utf-8'), 1)
+            del text
 
-            # Update internal list and access times
-            obj.last_access = os.path.getmtime(obj.file_name)
+        # Clean out dead links
+        if clean:
+            cls.clean_orphaned_favorites(file_list)
+            try:
+                # Save, keeping changes others made since it was read
+                with locked(filename):
+                    cls.merge_from_disk(filename, packed, fp, file_list)
+                    text = cls.write_favs_file(filename, file_list)
+                    st = os.stat(filename)
+                packed = zlib.compress(text.encode('utf-8'), 1)
+                fp = cls.disk_fingerprint(st)
+            except Exception:
+                error('Failed to write %s!' % os.path.basename(filename))
+        return file_list, packed, fp, os.path.getmtime(filename)
+
+    @classmethod
+    def apply_favorites(cls, obj, request, loaded):
+        """Make the list read for the request the current one (write lock must be held)."""
+
+        filename, last_access, loaded_from = request[:3]
+        if (obj.file_name, obj.last_access, obj.loaded_from) != (filename, last_access, loaded_from):
+            # Loaded, saved, or switched by someone else while it was read; theirs is as current
+            metrics.incr('load_favorite_files.superseded')
+            return
+        if loaded_from not in (None, filename) and obj.base is not None and obj.base[0] == loaded_from:
+            # Keep the list being switched away from for when the window it belongs to is used again
+            cls.keep_preloaded(obj, loaded_from, (obj.disk_fp, obj.files, obj.base[1]))
+
+        file_list, packed, fp, mtime = loaded
+        obj.base = (filename, packed)
+        obj.disk_fp = fp
+        obj.last_access = mtime
+        if loaded_from == filename:
+            # Only apply what changed
+            cls.queue_disk_changes(obj, apply_file_list(obj.files, file_list, filename))
+        else:
             obj.files = file_list
-        except Exception:
-            errors = True
-            if cls.is_global_file(obj):
-                error('Failed to load %s!' % os.path.basename(obj.file_name))
-            else:
-                error(
-                    'Failed to load %s!\nDid you rename your project?\n'
-                    'Try toggling "Per Projects" off and on and try again.' % os.path.basename(obj.file_name)
+            obj.loaded_from = filename
+            cls.queue_disk_changes(obj, ChangeSet(filename, reset=True))
+
+    @classmethod
+    @metrics.timed('load_favorite_files')
+    def load_favorite_files(cls, obj, force=False, clean=False, win_id=None):
+        """
+        Load favorite files.
+
+        The write lock is only held to pick the file and to apply what was read, so readers
+        are not held up while the list is read, parsed, and cleaned.
+        """
+
+        request = None
+        with obj.lock.write():
+            errors = cls.check_favorite_files(obj, force, win_id)
+            if errors is None:
+                errors = False
+                request = (obj.file_name, obj.last_access, obj.loaded_from, obj.preloaded.pop(obj.file_name, None))
+
+        if request is not None:
+            filename = request[0]
+            try:
+                loaded = cls.read_favorites(
+                    filename, request[3] if request[2] != filename else None, clean=clean
                 )
+            except Exception:
+                errors = True
+                if filename == obj.global_file:
+                    error('Failed to load %s!' % os.path.basename(filename))
+                else:
+                    error(
+                        'Failed to load %s!\nDid you rename your project?\n'
+                        'Try toggling "Per Projects" off and on and try again.' % os.path.basename(filename)
+                    )
+            else:
+                with obj.lock.write():
+                    cls.apply_favorites(obj, request, loaded)
+        cls.dispatch_changes(obj)
         return errors
 
     @classmethod
-    def load_favorite_files(cls, obj, force=False, clean=False, win_id=None):
-        """Load favorite files."""
+    def check_favorite_files(cls, obj, force, win_id):
+        """
+        Switch to the window's file and check if it must be read (write lock must be held).
+
+        Return `None` if the file must be read, else whether there were errors.
+        """
 
         errors = False
 
@@ -221,23 +584,37 @@ class FavFileMgr(object):
             else:
                 errors = True
 
-        cls.check_plugin_version(obj.file_name)
         # Only reload if file has been written since last access (or if forced reload)
         if not errors and (force or os.path.getmtime(obj.file_name) != obj.last_access):
-            errors = cls.load_favorites(obj, clean=clean)
+            metrics.incr('load_favorite_files.reload')
+            return None
+        metrics.incr('load_favorite_files.hit')
         return errors
 
 
 class Favorites(object):
-    """High level favorites handling."""
+    """
+    High level favorites handling.
 
-    def __init__(self, global_file):
-        """Initialize."""
-        self.obj = FavObj()
-        self.obj.global_file = global_file
-        self.obj.last_access = 0
-        self.obj.file_name = self.obj.global_file
-        self.open(self.obj)
+    Each method is applied atomically, so favorites can be shared with worker threads.
+    Methods returning lists return copies that stay consistent after the lock is released.
+    Several changes can be applied and saved as one with `transaction`.
+    """
+
+    def __init__(self, global_file, state_file=None, last_opened=None):
+        """
+        Initialize.
+
+        The projects with per project favorites on are remembered in `state_file` if given.
+        `last_opened` returns the time a file was last opened, for evicting the least
+        recently opened favorites of a full list.
+        """
+
+        self.last_opened = last_opened if last_opened is not None else (lambda name: 0.0)
+        self.obj = FavObj(global_file)
+        self.obj.state_file = state_file
+        FavProjects.load_state(self.obj)
+        self.open()
 
     def open(self, win_id=None):  # noqa: A003
         """Open favorites."""
@@ -250,21 +627,118 @@ class Favorites(object):
         return FavFileMgr.load_favorite_files(self.obj, force, clean, win_id)
 
     def save(self, force=False):
-        """Save favorites."""
+        """Save favorites (deferred until commit inside a transaction)."""
+
+        with self.obj.lock.write():
+            if self.obj.transaction is not None:
+                return False
+            errors = FavFileMgr.create_favorite_list(self.obj, self.obj.files, force=force)
+        FavFileMgr.dispatch_changes(self.obj)
+        return errors
+
+    @contextmanager
+    def transaction(self):
+        """
+        Apply the changes made in the block as one.
+
+        The write lock is held for the block. On success, listeners get a single change
+        set and the list is saved once, if anything changed; on an exception, the changes
+        are rolled back. Nested transactions are part of the outermost one.
+        """
 
-        return FavFileMgr.create_favorite_list(self.obj, self.obj.files, force=force)
+        with self.obj.lock.write():
+            outer = self.obj.transaction is None
+            if outer:
+                self.obj.transaction = copy_file_list(self.obj.files)
+            try:
+                yield self
+            except Exception:
+                if outer:
+                    self.obj.files = self.obj.transaction
+                    self.obj.transaction = None
+                    self.obj.trie = None
+                    self.obj.evict.clear()
+                    self.obj.overflow = [0, 0]
+                    # Whatever was loaded in the block is read again
+                    self.obj.last_access = 0
+                raise
+            if outer:
+                base = self.obj.transaction
+                self.obj.transaction = None
+                changes = apply_file_list(base, self.obj.files, self.obj.file_name)
+                if not changes.is_empty():
+                    FavFileMgr.queue_changes(self.obj, changes)
+                    FavFileMgr.create_favorite_list(self.obj, self.obj.files, force=True)
+        if outer:
+            FavFileMgr.dispatch_changes(self.obj)
+            self.report_overflow()
+
+    def add_listener(self, key, callback):
+        """
+        Call `callback` with a `ChangeSet` whenever changes are read from disk or a transaction commits.
+
+        Listeners are called without the lock held, after the changes are applied.
+        """
+
+        with self.obj.lock.write():
+            self.obj.listeners[key] = callback
+
+    def remove_listener(self, key):
+        """Remove a change listener."""
+
+        with self.obj.lock.write():
+            self.obj.listeners.pop(key, None)
+
+    def preload(self, max_workers=4):
+        """
+        Parse the favorites lists of all open windows in parallel (runs off the UI thread).
+
+        The first load in each window then uses the parsed list if the file did not change since.
+        """
+
+        with self.obj.lock.read():
+            files = set(FavProjects.favs_file(self.obj, w.id()) for w in sublime.windows())
+            files -= set(self.obj.preloaded)
+            files.discard(self.obj.loaded_from)
+        files = sorted(f for f in files if os.path.exists(f))
+        if not files:
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+            results = list(executor.map(FavFileMgr.preload, files))
+        with self.obj.lock.write():
+            for filename, cached in zip(files, results):
+                if cached is not None and filename != self.obj.loaded_from and filename not in self.obj.preloaded:
+                    FavFileMgr.keep_preloaded(self.obj, filename, cached)
+        metrics.incr('preload', len(files))
+
+    def file_for_window(self, win_id):
+        """
+        Return the favorites file the window uses.
+
+        The lock is not taken so this can be called on the UI thread while a list loads; the
+        project sets are only tested for membership, which is safe while they are changed.
+        """
+
+        return FavProjects.favs_file(self.obj, win_id)
+
+    def snapshot(self):
+        """Return a copy of the current favorites list."""
+
+        with self.obj.lock.read():
+            return copy_file_list(self.obj.files)
 
     def toggle_global(self, win_id):
         """Toggle global."""
 
         errors = False
-        # Clean out closed windows
-        FavProjects.prune_projects(self.obj)
+        with self.obj.lock.write():
+            # Clean out closed windows
+            FavProjects.prune_projects(self.obj)
 
-        if FavProjects.is_project_tracked(self.obj, win_id):
-            self.obj.projects.remove(win_id)
-        else:
-            errors = True
+            if FavProjects.is_project_tracked(self.obj, win_id):
+                FavProjects.remove(self.obj, win_id)
+            else:
+                errors = True
         return errors
 
     def toggle_per_projects(self, win_id):
@@ -273,7 +747,8 @@ class Favorites(object):
         errors = False
 
         if FavProjects.has_project(win_id):
-            self.obj.projects.add(win_id)
+            with self.obj.lock.write():
+                FavProjects.add(self.obj, win_id)
         else:
             errors = True
         return errors
@@ -281,84 +756,238 @@ class Favorites(object):
     def remove_group(self, s):
         """Remove a group."""
 
-        if self.group_exists(s):
-            del self.obj.files["groups"][s]
+        with self.obj.lock.write():
+            if self.group_exists(s):
+                self._discard_group(s)
+                del self.obj.files["groups"][s]
+                self.obj.evict.pop(s, None)
 
     def add_group(self, s):
         """Add favorite group."""
 
-        self.obj.files["groups"][s] = []
+        with self.obj.lock.write():
+            if self.group_exists(s):
+                # The group is replaced
+                self._discard_group(s)
+                self.obj.evict.pop(s, None)
+            self.obj.files["groups"][s] = []
+
+    def _discard_group(self, s):
+        """Remove the entries of a group from the path trie (write lock must be held)."""
+
+        if self.obj.trie is not None:
+            for entry in self.obj.files["groups"][s]:
+                self.obj.trie.discard(s, entry['file'])
 
     def set_alias(self, alias, index, group_name=None):
         """Set an alias for the favorite file."""
 
-        if group_name is None:
-            self.obj.files['files'][index] = {
-                "alias": (alias if alias else os.path.basename(self.obj.files['files'][index]['file'])),
-                "file": self.obj.files['files'][index]['file']
-            }
-        else:
-            self.obj.files['groups'][group_name][index] = {
-                "alias": (alias if alias else os.path.basename(self.obj.files['groups'][group_name][index]['file'])),
-                "file": self.obj.files['groups'][group_name][index]['file']
-            }
+        with self.obj.lock.write():
+            entries = self.obj.files['files'] if group_name is None else self.obj.files['groups'][group_name]
+            # Keep the other fields of the entry, such as its fingerprint
+            entry = entries[index]
+            entry["alias"] = alias if alias else os.path.basename(entry['file'])
 
         self.save(True)
 
-    def set(self, s, group_name=None):  # noqa: A003
-        """Add file in global or group list."""
+    def set(self, s, group_name=None, fp=None):  # noqa: A003
+        """Add file in global or group list, recording its fingerprint (`fp` if already known)."""
 
+        if fp is None:
+            fp = fingerprint(s)
         s = {"file": s, "alias": os.path.basename(s)}
-
-        if group_name is None:
-            self.obj.files["files"].append(s)
-        else:
-            self.obj.files["groups"][group_name].append(s)
+        if fp is not None:
+            s["fingerprint"] = fp
+
+        options = settings.get()
+        limit = options.max_favorites if group_name is None else options.max_group_favorites
+        with self.obj.lock.write():
+            entries = self.obj.files["files"] if group_name is None else self.obj.files["groups"][group_name]
+            added = limit <= 0 or len(entries) < limit or self._evict(entries, group_name, limit, options)
+            if added:
+                entries.append(s)
+                if self.obj.trie is not None:
+                    self.obj.trie.add(group_name, s)
+                queue = self.obj.evict.get(group_name)
+                if queue is not None:
+                    queue.push(s, time.time())
+            report = self.obj.transaction is None
+        if report:
+            self.report_overflow()
+        return added
+
+    def _evict(self, entries, group_name, limit, options):
+        """Make room in a full list and return whether a favorite can be added (write lock must be held)."""
+
+        policy = options.favorite_eviction if options.favorite_eviction in POLICIES else REJECT
+        if policy == REJECT:
+            self.obj.overflow[1] += 1
+            return False
+
+        queue = self.obj.evict.get(group_name)
+        if queue is None or queue.policy != policy:
+            if policy == LEAST_RECENTLY_OPENED:
+                queue = EvictionQueue(entries, lambda entry: self.last_opened(entry['file']))
+            else:
+                queue = EvictionQueue(entries, lambda entry: 0)
+            queue.policy = policy
+            self.obj.evict[group_name] = queue
+        while len(entries) >= limit:
+            victim = queue.pop()
+            # A linear search, but no slower than deleting the entry from the list
+            index = next(i for i, entry in enumerate(entries) if entry is victim)
+            self._delete(entries, index, group_name)
+            self.obj.overflow[0] += 1
+        return True
+
+    def report_overflow(self):
+        """Report the favorites evicted or rejected because a list was full since the last report."""
+
+        with self.obj.lock.write():
+            evicted, rejected = self.obj.overflow
+            self.obj.overflow = [0, 0]
+        if rejected:
+            error('%d favorite(s) were not added because the list is full!' % rejected)
+        if evicted:
+            notify('%d favorite(s) were removed from a full list to make room.' % evicted)
 
     def group_exists(self, s):
         """Check if group exists."""
 
-        return s in self.obj.files["groups"]
+        with self.obj.lock.read():
+            return s in self.obj.files["groups"]
 
     def file_index(self, s, group_name=None):
         """Check if file exists, and return its index in this case."""
 
-        obj = self.obj.files["files"] if group_name is None else self.obj.files["groups"][group_name]
+        with self.obj.lock.read():
+            obj = self.obj.files["files"] if group_name is None else self.obj.files["groups"][group_name]
 
-        index = None
-        for idx, entry in enumerate(obj):
-            if entry['file'] == s:
-                index = idx
-                break
+            index = None
+            for idx, entry in enumerate(obj):
+                if entry['file'] == s:
+                    index = idx
+                    break
+
+        return index
+
+    def alias_index(self, alias, group_name=None):
+        """Return the index of the first file with the given alias."""
+
+        with self.obj.lock.read():
+            obj = self.obj.files["files"] if group_name is None else self.obj.files["groups"][group_name]
+
+            index = None
+            for idx, entry in enumerate(obj):
+                if entry['alias'] == alias:
+                    index = idx
+                    break
 
         return index
 
+    def file_lookup(self, group_name=None):
+        """Return the set of files in the group or global list for fast membership tests."""
+
+        with self.obj.lock.read():
+            if group_name is None:
+                obj = self.obj.files["files"]
+            else:
+                obj = self.obj.files["groups"].get(group_name, [])
+
+            return set(entry['file'] for entry in obj)
+
     def remove(self, s, group_name=None):
         """Remove file in group or global list."""
 
-        if group_name is None:
-            index = self.file_index(s)
-            if index is not None:
-                del self.obj.files["files"][index]
-        else:
+        with self.obj.lock.write():
+            entries = self.obj.files["files"] if group_name is None else self.obj.files["groups"][group_name]
             index = self.file_index(s, group_name=group_name)
             if index is not None:
-                del self.obj.files["groups"][group_name][index]
+                self._delete(entries, index, group_name)
+                self.obj.evict.pop(group_name, None)
+
+    def _delete(self, entries, index, group_name):
+        """Delete an entry of the group's list (write lock must be held)."""
+
+        name = entries[index]['file']
+        del entries[index]
+        if self.obj.trie is not None:
+            self.obj.trie.discard(group_name, name)
+            # The file may have been added more than once
+            index = self.file_index(name, group_name=group_name)
+            if index is not None:
+                self.obj.trie.add(group_name, entries[index])
 
     def all_files(self, group_name=None):
         """Return all files in group or global list."""
 
-        if group_name is not None:
-            return [[path['alias'], path['file']] for path in self.obj.files["groups"][group_name]]
-        else:
-            return [[path['alias'], path['file']] for path in self.obj.files["files"]]
+        with self.obj.lock.read():
+            if group_name is not None:
+                return [[path['alias'], path['file']] for path in self.obj.files["groups"][group_name]]
+            else:
+                return [[path['alias'], path['file']] for path in self.obj.files["files"]]
+
+    def files_under(self, folder):
+        """Return `[alias, file, group]` for the favorites in the folder or its subfolders, sorted by file."""
+
+        with self.obj.lock.read():
+            if self.obj.trie is not None:
+                return self._rows_under(self.obj.trie, folder)
+        # Build the trie once; later queries only need the read lock
+        with self.obj.lock.write():
+            return self._rows_under(FavFileMgr.path_trie(self.obj), folder)
+
+    def _rows_under(self, trie, folder):
+        """Return the rows of `files_under` (read lock must be held)."""
+
+        return sorted(
+            ([entry['alias'], entry['file'], group] for group, entry in trie.under(folder)),
+            key=lambda row: (row[1], row[2] or '')
+        )
+
+    def add_rule(self, rule, alias=None):
+        """Add a folder or glob rule that is expanded to files when shown."""
+
+        with self.obj.lock.write():
+            self.obj.files.setdefault("rules", []).append({"rule": rule, "alias": alias if alias else rule})
+
+    def rule_exists(self, rule):
+        """Check if rule exists."""
+
+        with self.obj.lock.read():
+            return any(entry['rule'] == rule for entry in self.obj.files.get("rules", []))
+
+    def remove_rule(self, rule):
+        """Remove a rule."""
+
+        with self.obj.lock.write():
+            rules = self.obj.files.get("rules", [])
+            for idx, entry in enumerate(rules):
+                if entry['rule'] == rule:
+                    del rules[idx]
+                    break
+
+    def all_rules(self):
+        """Return all rules."""
+
+        with self.obj.lock.read():
+            return [["Rule: " + entry['alias'], entry['rule']] for entry in self.obj.files.get("rules", [])]
+
+    def panel_entries(self):
+        """Return files, groups, and rules for the top level panel from a single consistent read."""
+
+        with self.obj.lock.read():
+            return self.all_files(), self.all_groups(), self.all_rules()
 
     def group_count(self):
         """Return group count."""
 
-        return len(self.obj.files["groups"])
+        with self.obj.lock.read():
+            return len(self.obj.files["groups"])
 
     def all_groups(self):
         """Return all groups."""
 
-        return sorted([["Group: " + k, "%d files" % len(v)] for k, v in self.obj.files["groups"].items()])
+        with self.obj.lock.read():
+            groups = [["Group: " + k, "%d files" % len(v)] for k, v in self.obj.files["groups"].items()]
+        return sorted(groups)
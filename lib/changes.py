@@ -0,0 +1,126 @@
+"""
+Favorite Files change sets.
+
+When a favorites list is read again, the new list is compared with the one in
+memory and only the differences are applied, so entries and groups that did not
+change keep their identity. The differences are passed to listeners as a `ChangeSet`.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+
+
+class ChangeSet(object):
+    """
+    Changes between two versions of a favorites list.
+
+    Entries are given as `(group, entry)` where `group` is `None` for the global list.
+    `changed` holds `(group, old, new)` for entries that were re-aliased (or otherwise
+    changed). A `reset` change set means the whole list was replaced, e.g. when
+    switching to another list, and has no details.
+    """
+
+    def __init__(self, file_name, reset=False):
+        """Initialize."""
+
+        self.file_name = file_name
+        self.reset = reset
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.reordered = []
+        self.groups_added = []
+        self.groups_removed = []
+        self.rules_changed = False
+
+    def is_empty(self):
+        """Check if nothing changed."""
+
+        return not any((
+            self.reset, self.added, self.removed, self.changed, self.reordered,
+            self.groups_added, self.groups_removed, self.rules_changed
+        ))
+
+    def extend(self, other):
+        """Add the changes of a later change set."""
+
+        if other.reset or other.file_name != self.file_name:
+            self.__dict__.update(other.__dict__)
+            return
+        self.added.extend(other.added)
+        self.removed.extend(other.removed)
+        self.changed.extend(other.changed)
+        self.reordered.extend(g for g in other.reordered if g not in self.reordered)
+        self.groups_added.extend(other.groups_added)
+        self.groups_removed.extend(other.groups_removed)
+        self.rules_changed = self.rules_changed or other.rules_changed
+
+    def __len__(self):
+        """Return the number of changed entries and groups."""
+
+        return sum(
+            len(entries)
+            for entries in (self.added, self.removed, self.changed, self.groups_added, self.groups_removed)
+        )
+
+
+def _apply_entries(changes, group, old, new):
+    """Return the new entry list, reusing unchanged entries (or `old` itself if nothing changed)."""
+
+    old_map = dict((e['file'], e) for e in old)
+    result = []
+    modified = False
+    for entry in new:
+        previous = old_map.pop(entry['file'], None)
+        if previous is None:
+            changes.added.append((group, entry))
+            result.append(entry)
+            modified = True
+        elif previous == entry:
+            result.append(previous)
+        else:
+            changes.changed.append((group, previous, entry))
+            result.append(entry)
+            modified = True
+    for entry in old_map.values():
+        changes.removed.append((group, entry))
+        modified = True
+
+    if not modified:
+        if all(a is b for a, b in zip(old, result)):
+            return old
+        changes.reordered.append(group)
+    return result
+
+
+def apply_file_list(current, new, file_name):
+    """
+    Update the `current` favorites list in place to match `new` and return the changes.
+
+    Lists and entries that did not change are kept as they are.
+    """
+
+    changes = ChangeSet(file_name)
+    current["version"] = new.get("version", current.get("version"))
+    current["files"] = _apply_entries(changes, None, current.get("files", []), new.get("files", []))
+
+    groups = current.setdefault("groups", {})
+    new_groups = new.get("groups", {})
+    for name in [g for g in groups if g not in new_groups]:
+        changes.groups_removed.append(name)
+        changes.removed.extend((name, e) for e in groups.pop(name))
+    for name, entries in new_groups.items():
+        if name in groups:
+            groups[name] = _apply_entries(changes, name, groups[name], entries)
+        else:
+            changes.groups_added.append(name)
+            changes.added.extend((name, e) for e in entries)
+            groups[name] = entries
+
+    if current.get("rules", []) != new.get("rules", []):
+        changes.rules_changed = True
+        if "rules" in new:
+            current["rules"] = new["rules"]
+        else:
+            del current["rules"]
+    return changes
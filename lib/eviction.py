@@ -0,0 +1,56 @@
+"""
+Favorite Files list size limits.
+
+When a list is full, the favorite to evict is taken from a heap of the list's
+entries, which is built once and then kept up to date as favorites are added, so
+finding it does not sort the list. The queues follow the changes made through
+`Favorites` and are rebuilt when changes are read from disk. Deleting the victim
+still looks it up in the list, which is linear, like the deletion itself.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import heapq
+
+LEAST_RECENTLY_OPENED = "least_recently_opened"
+OLDEST_ADDED = "oldest_added"
+REJECT = "reject"
+POLICIES = (LEAST_RECENTLY_OPENED, OLDEST_ADDED, REJECT)
+
+
+class EvictionQueue(object):
+    """
+    Entries of a list, lowest key first; entries with the same key are in list order.
+
+    `key` returns the entry's current key, which may grow after it was queued (a file
+    was opened since); such entries are queued again when they come up.
+    """
+
+    def __init__(self, entries, key):
+        """Initialize."""
+
+        self.key = key
+        # Policy the queue was built for
+        self.policy = None
+        self.heap = [(key(entry), index, entry) for index, entry in enumerate(entries)]
+        heapq.heapify(self.heap)
+        self.count = len(self.heap)
+
+    def push(self, entry, key=None):
+        """Queue an entry added to the end of the list, with `key` if it is newer than its current key."""
+
+        current = self.key(entry)
+        heapq.heappush(self.heap, (current if key is None else max(key, current), self.count, entry))
+        self.count += 1
+
+    def pop(self):
+        """Remove and return the entry to evict, or `None` if there are none."""
+
+        while self.heap:
+            key, index, entry = heapq.heappop(self.heap)
+            current = self.key(entry)
+            if current > key:
+                heapq.heappush(self.heap, (current, index, entry))
+                continue
+            return entry
+        return None
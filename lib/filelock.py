@@ -0,0 +1,112 @@
+"""
+Favorite Files shared file helpers: advisory locks, versions, and safe writes.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Windows has no advisory locks; saves are only guarded within the process
+    fcntl = None
+
+# Folder lock files are kept in, if not beside the files
+_lock_folder = [None]
+
+
+def file_version(st):
+    """Return the version of a shared file from its stat result; it changes whenever the file is saved."""
+
+    return (st.st_ino, st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime))
+
+
+def path_version(filename):
+    """Return the version of the file, or `None` if it does not exist."""
+
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return file_version(st)
+
+
+def temp_name(filename):
+    """Return a temporary file name beside the file, unique to the process and thread writing it."""
+
+    return '%s.%d.%d.tmp' % (filename, os.getpid(), threading.current_thread().ident)
+
+
+def save_file(filename, text, encoding=None):
+    """
+    Write the text to a temporary file and swap it in, so readers never see a partial file.
+
+    The folder is created if needed. Return whether the file was written; failures are
+    reported to the console.
+    """
+
+    temp = temp_name(filename)
+    try:
+        folder = os.path.dirname(filename)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(temp, 'w', encoding=encoding) as f:
+            f.write(text)
+        os.replace(temp, filename)
+    except (OSError, IOError) as e:
+        print("FavoriteFiles: Failed to write %s: %s" % (filename, e))
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def set_lock_folder(folder):
+    """Keep lock files in the folder instead of beside the files they lock (`None` to restore)."""
+
+    _lock_folder[0] = folder
+
+
+def lock_file(filename):
+    """
+    Return the lock file of a file.
+
+    In the lock folder, the lock file is named after a hash of the file's real path, so
+    no lock files are left in project folders.
+    """
+
+    folder = _lock_folder[0]
+    if folder is None:
+        return filename + '.lock'
+    key = hashlib.sha1(os.path.normcase(os.path.realpath(filename)).encode('utf-8')).hexdigest()
+    return os.path.join(folder, key + '.lock')
+
+
+@contextmanager
+def locked(filename):
+    """
+    Hold an exclusive advisory lock for the file between processes.
+
+    The lock is taken on a separate lock file (see `lock_file`), as the file itself is
+    replaced on every save. Locks are not re-entrant.
+    """
+
+    if fcntl is None:
+        yield
+        return
+
+    name = lock_file(filename)
+    folder = os.path.dirname(name)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+    with open(name, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
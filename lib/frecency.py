@@ -0,0 +1,187 @@
+"""
+Favorite Files frecency index.
+
+Each entry's score is a count of opens that halves every `half_life` seconds. Scores
+are stored as "anchors" (`log2(score) + time / half_life`), which do not change as
+time passes; decay shifts every score by the same amount, so entries can be ordered
+by anchor without recomputing anything. An open only raises one anchor, so the best
+entries are kept in a small sorted top-k list that is updated in place.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import sublime
+import heapq
+import json
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from .filelock import save_file
+
+FILES = 'files'
+GROUPS = 'groups'
+HALF_LIFE = 7 * 24 * 60 * 60.0
+TOP_K = 50
+# Opens within this many milliseconds are written in one flush
+FLUSH_DELAY = 5000
+
+
+class TopK(object):
+    """The `k` keys with the highest anchors, kept in ascending order."""
+
+    def __init__(self, k):
+        """Initialize."""
+
+        self.k = k
+        self.items = []
+        self.members = {}
+
+    def update(self, key, anchor):
+        """Record a key's new (higher) anchor."""
+
+        old = self.members.pop(key, None)
+        if old is not None:
+            del self.items[bisect_left(self.items, (old, key))]
+        elif len(self.items) >= self.k and anchor <= self.items[0][0]:
+            return
+        insort(self.items, (anchor, key))
+        self.members[key] = anchor
+        if len(self.items) > self.k:
+            _, evicted = self.items.pop(0)
+            del self.members[evicted]
+
+    def rebuild(self, anchors):
+        """Rebuild from all anchors."""
+
+        self.items = sorted((a, k) for k, a in heapq.nlargest(self.k, anchors.items(), key=lambda x: x[1]))
+        self.members = dict((k, a) for a, k in self.items)
+
+    def keys(self):
+        """Return the keys, best first."""
+
+        return [key for _, key in reversed(self.items)]
+
+
+class FrecencyIndex(object):
+    """Decaying open counts of files and groups, persisted to a sidecar file."""
+
+    def __init__(self, filename, half_life=HALF_LIFE, top_k=TOP_K, flush_delay=FLUSH_DELAY):
+        """Initialize."""
+
+        self.filename = filename
+        self.half_life = float(half_life)
+        self.flush_delay = flush_delay
+        self.lock = threading.Lock()
+        self.anchors = {FILES: {}, GROUPS: {}}
+        # Time of the last open
+        self.last = {FILES: {}, GROUPS: {}}
+        self.top = {FILES: TopK(top_k), GROUPS: TopK(top_k)}
+        self.loaded = False
+        self.dirty = False
+        self.flush_pending = False
+
+    def _load(self):
+        """Load the sidecar file on first use (lock must be held)."""
+
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (OSError, IOError, ValueError):
+            return
+        for kind in (FILES, GROUPS):
+            anchors = data.get(kind, {})
+            if isinstance(anchors, dict):
+                self.anchors[kind].update(
+                    (k, float(a)) for k, a in anchors.items() if isinstance(a, (int, float))
+                )
+                self.top[kind].rebuild(self.anchors[kind])
+            last = data.get("last", {}).get(kind, {})
+            if isinstance(last, dict):
+                self.last[kind].update((k, float(t)) for k, t in last.items() if isinstance(t, (int, float)))
+
+    def load(self):
+        """Load the sidecar file if it has not been loaded yet."""
+
+        with self.lock:
+            self._load()
+
+    def record(self, kind, key, now=None):
+        """Record an open and schedule a flush."""
+
+        if now is None:
+            now = time.time()
+        offset = now / self.half_life
+        with self.lock:
+            self._load()
+            anchor = self.anchors[kind].get(key)
+            score = 1.0 if anchor is None else 2.0 ** (anchor - offset) + 1.0
+            anchor = math.log(score, 2) + offset
+            self.anchors[kind][key] = anchor
+            self.last[kind][key] = now
+            self.top[kind].update(key, anchor)
+            self.dirty = True
+            schedule = not self.flush_pending
+            self.flush_pending = True
+        if schedule:
+            sublime.set_timeout_async(self.flush, self.flush_delay)
+
+    def score(self, kind, key, now=None):
+        """Return the decayed score of the key."""
+
+        if now is None:
+            now = time.time()
+        with self.lock:
+            self._load()
+            anchor = self.anchors[kind].get(key)
+        return 0.0 if anchor is None else 2.0 ** (anchor - now / self.half_life)
+
+    def last_open(self, kind, key):
+        """Return the time the key was last opened, or 0 if it never was."""
+
+        with self.lock:
+            self._load()
+            return self.last[kind].get(key, 0.0)
+
+    def best(self, kind):
+        """Return the top keys, best first."""
+
+        with self.lock:
+            self._load()
+            return self.top[kind].keys()
+
+    def rank(self, kind, rows, key):
+        """Move rows whose key is in the top entries to the front, best first; the rest keep their order."""
+
+        position = dict((k, i) for i, k in enumerate(self.best(kind)))
+        if not position:
+            return rows
+        ranked = []
+        rest = []
+        for row in rows:
+            i = position.get(key(row))
+            if i is None:
+                rest.append(row)
+            else:
+                ranked.append((i, row))
+        ranked.sort(key=lambda x: x[0])
+        return [row for _, row in ranked] + rest
+
+    def flush(self):
+        """Write the sidecar file if anything changed (runs off the UI thread)."""
+
+        with self.lock:
+            self.flush_pending = False
+            if not self.dirty:
+                return
+            self.dirty = False
+            data = {
+                "version": 1,
+                FILES: dict(self.anchors[FILES]),
+                GROUPS: dict(self.anchors[GROUPS]),
+                "last": {FILES: dict(self.last[FILES]), GROUPS: dict(self.last[GROUPS])}
+            }
+        save_file(self.filename, json.dumps(data))
@@ -0,0 +1,147 @@
+"""
+Favorite Files bulk import.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .relocate import fingerprint
+from .scan import iter_glob, walk_files
+
+IMPORT_LIST = "list"
+IMPORT_GLOB = "glob"
+IMPORT_TREE = "tree"
+
+BATCH_SIZE = 1000
+MAX_WORKERS = 8
+
+
+def iter_path_list(filename):
+    """Yield each path listed in a text file (one per line, `#` starts a comment line)."""
+
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+
+def iter_import_paths(source, mode=IMPORT_LIST):
+    """Stream paths from a path list file, glob pattern, or folder tree."""
+
+    if mode == IMPORT_LIST:
+        return iter_path_list(source)
+    elif mode == IMPORT_GLOB:
+        return iter_glob(source)
+    elif mode == IMPORT_TREE:
+        return walk_files(source)
+    raise ValueError("Unknown import mode '%s'" % mode)
+
+
+class ImportJob(object):
+    """
+    Bulk import of paths into a favorites list.
+
+    Paths are streamed and de-duplicated against the existing list, verified on disk in
+    concurrent batches, and then committed to the list with a single write.
+    """
+
+    def __init__(self, paths, existing=None, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS):
+        """Initialize."""
+
+        self.paths = paths
+        self.seen = set(existing) if existing is not None else set()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.found = []
+        self.fingerprints = []
+        self.checked = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.cancelled = False
+        self.error = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Request cancellation of the import."""
+
+        self._cancel.set()
+
+    def is_cancelled(self):
+        """Check if cancellation has been requested."""
+
+        return self._cancel.is_set()
+
+    def _batches(self):
+        """Yield batches of unique, absolute paths."""
+
+        batch = []
+        for path in self.paths:
+            path = os.path.abspath(os.path.expanduser(path))
+            if path in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(path)
+            batch.append(path)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def collect(self, progress=None):
+        """
+        Collect the paths that should be imported.
+
+        `progress` is called with the number of checked and found paths after each batch.
+        """
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for batch in self._batches():
+                    if self.is_cancelled():
+                        break
+                    for path, fp in zip(batch, executor.map(fingerprint, batch)):
+                        if fp is not None:
+                            self.found.append(path)
+                            self.fingerprints.append(fp)
+                        else:
+                            self.missing += 1
+                    self.checked += len(batch)
+                    if progress is not None:
+                        progress(self.checked, len(self.found))
+        except (OSError, ValueError) as e:
+            # Source could not be read or decoded, or a path is invalid; nothing is committed
+            self.error = str(e)
+            self.cancel()
+        self.cancelled = self.is_cancelled()
+        return self.found
+
+    def commit(self, favs, group_name=None):
+        """Add the collected paths to the favorites and save once."""
+
+        if self.cancelled or not self.found:
+            return 0
+
+        added = 0
+        # Saved once, and only if anything was added
+        with favs.transaction():
+            if group_name is not None and not favs.group_exists(group_name):
+                favs.add_group(group_name)
+            # The list may have been reloaded while collecting, so check once more
+            existing = favs.file_lookup(group_name)
+            for path, fp in zip(self.found, self.fingerprints):
+                if path not in existing and favs.set(path, group_name=group_name, fp=fp):
+                    added += 1
+        return added
+
+
+def import_favorites(favs, paths, group_name=None, progress=None):
+    """Import paths into the favorites and return the finished job."""
+
+    job = ImportJob(paths, favs.file_lookup(group_name))
+    job.collect(progress)
+    job.commit(favs, group_name)
+    return job
@@ -0,0 +1,74 @@
+"""
+Favorite Files three-way merge.
+
+Merges a favorites list changed locally with the same list changed on disk by
+another instance, using the list both started from as the base. Entries are
+matched by file (or rule) within the global list and each group, and groups by
+name. When both sides changed the same entry, the local change wins.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+MISSING = object()
+
+
+def _merge_value(base, local, remote):
+    """Pick the value of one item; `MISSING` means the item is removed."""
+
+    if local == remote:
+        return local
+    if local == base:
+        # Only changed (or removed) on disk
+        return remote
+    if remote == base:
+        # Only changed (or removed) locally
+        return local
+    # Changed on both sides; a removal loses against a change
+    return remote if local is MISSING else local
+
+
+def _merge_keyed(base, local, remote, key):
+    """Merge lists of dictionaries matched by `key`. Order follows the disk, then new local items."""
+
+    base_map = dict((e[key], e) for e in base)
+    local_map = dict((e[key], e) for e in local)
+    remote_map = dict((e[key], e) for e in remote)
+    result = []
+    seen = set()
+    for k in [e[key] for e in remote] + [e[key] for e in local]:
+        if k in seen:
+            continue
+        seen.add(k)
+        value = _merge_value(base_map.get(k, MISSING), local_map.get(k, MISSING), remote_map.get(k, MISSING))
+        if value is not MISSING:
+            result.append(value)
+    return result
+
+
+def merge_file_lists(base, local, remote):
+    """Return the three-way merge of favorites lists."""
+
+    merged = dict(remote)
+    merged["version"] = max(local.get("version", 2), remote.get("version", 2))
+    merged["files"] = _merge_keyed(base.get("files", []), local.get("files", []), remote.get("files", []), "file")
+
+    base_groups = base.get("groups", {})
+    local_groups = local.get("groups", {})
+    remote_groups = remote.get("groups", {})
+    groups = {}
+    for name in set(local_groups) | set(remote_groups):
+        b = base_groups.get(name, MISSING)
+        lo = local_groups.get(name, MISSING)
+        r = remote_groups.get(name, MISSING)
+        if lo is MISSING or r is MISSING:
+            # Group added or removed on one side
+            value = _merge_value(b, lo, r)
+            if value is not MISSING:
+                groups[name] = value
+        else:
+            groups[name] = _merge_keyed([] if b is MISSING else b, lo, r, "file")
+    merged["groups"] = groups
+
+    if "rules" in local or "rules" in remote:
+        merged["rules"] = _merge_keyed(base.get("rules", []), local.get("rules", []), remote.get("rules", []), "rule")
+    return merged
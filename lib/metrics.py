@@ -0,0 +1,307 @@
+"""
+Favorite Files performance metrics.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import sublime
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+RESERVOIR_SIZE = 1024
+PERCENTILES = (50, 90, 99)
+
+
+class Histogram(object):
+    """Latency histogram keeping totals and a reservoir of the most recent samples."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def add(self, value):
+        """Add a sample."""
+
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def percentile(self, pct):
+        """Return the percentile of the recent samples (nearest rank)."""
+
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def summary(self):
+        """Return a summary in milliseconds."""
+
+        data = {
+            "count": self.count,
+            "mean": (self.total / self.count if self.count else 0.0) * 1000,
+            "min": (self.min or 0.0) * 1000,
+            "max": (self.max or 0.0) * 1000
+        }
+        for pct in PERCENTILES:
+            data["p%d" % pct] = self.percentile(pct) * 1000
+        return data
+
+
+class _Timer(object):
+    """Context manager timing a block."""
+
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        """Initialize."""
+
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        """Start timing."""
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        """Record the elapsed time."""
+
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer(object):
+    """Context manager that does nothing when metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Do nothing."""
+
+        return self
+
+    def __exit__(self, *args):
+        """Do nothing."""
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Span(object):
+    """
+    Latency of a command invocation.
+
+    A command may continue in background tasks, so the latency is only recorded once
+    the command and every task it started have finished.
+    """
+
+    def __init__(self, registry, name):
+        """Initialize."""
+
+        self.registry = registry
+        self.name = name
+        self.start = time.perf_counter()
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def retain(self):
+        """Keep the span open for another part."""
+
+        with self._lock:
+            self.pending += 1
+
+    def release(self):
+        """Release a part and record the latency when all parts are done."""
+
+        with self._lock:
+            self.pending -= 1
+            done = self.pending == 0
+        if done:
+            self.registry.observe(self.name, time.perf_counter() - self.start)
+
+
+class MetricsRegistry(object):
+    """
+    Registry of counters and latency histograms.
+
+    When disabled, recording is a single attribute check.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._local = threading.local()
+
+    def reset(self):
+        """Clear all recorded metrics."""
+
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def incr(self, name, value=1):
+        """Increment a counter."""
+
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record a latency sample."""
+
+        if self.enabled:
+            with self._lock:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram()
+                histogram.add(seconds)
+
+    def timer(self, name):
+        """Return a context manager that records the latency of its block."""
+
+        return _Timer(self, name) if self.enabled else NULL_TIMER
+
+    def timed(self, name):
+        """Decorator recording the latency of each call."""
+
+        def decorator(fn):
+            """Wrap the function."""
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                """Time the call."""
+
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def current(self):
+        """Return the command span open on the current thread, if any."""
+
+        return getattr(self._local, 'span', None)
+
+    @contextmanager
+    def resume(self, span):
+        """Run the block as part of the span, so tasks it starts are part of it too."""
+
+        previous = self.current()
+        self._local.span = span
+        try:
+            yield
+        finally:
+            self._local.span = previous
+
+    def command(self, name):
+        """Decorator recording the latency of each call, up to the end of the background tasks it starts."""
+
+        def decorator(fn):
+            """Wrap the function."""
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                """Time the call and its tasks."""
+
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                span = _Span(self, name)
+                span.retain()
+                try:
+                    with self.resume(span):
+                        return fn(*args, **kwargs)
+                finally:
+                    span.release()
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """Return the counters and latency summaries."""
+
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "latency": dict((k, v.summary()) for k, v in self.histograms.items())
+            }
+
+    def format_summary(self):
+        """Return a readable summary of the metrics."""
+
+        data = self.summary()
+        lines = []
+        for name in sorted(data["latency"]):
+            s = data["latency"][name]
+            lines.append(
+                "%s: n=%d p50=%.2fms p90=%.2fms p99=%.2fms max=%.2fms" % (
+                    name, s["count"], s["p50"], s["p90"], s["p99"], s["max"]
+                )
+            )
+        for name in sorted(data["counters"]):
+            lines.append("%s: %d" % (name, data["counters"][name]))
+        return '\n'.join(lines)
+
+    def dump(self, filename):
+        """Append the summary as a single JSON line to the log file."""
+
+        data = self.summary()
+        data["time"] = time.time()
+        with open(filename, 'a') as f:
+            f.write(json.dumps(data, sort_keys=True) + '\n')
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsLog(object):
+    """Periodically dump the metrics to a JSON log."""
+
+    _generation = 0
+
+    @classmethod
+    def start(cls, filename, interval):
+        """Start (or restart) periodic dumps every `interval` seconds."""
+
+        cls._generation += 1
+        generation = cls._generation
+
+        def dump():
+            """Dump metrics and schedule the next dump."""
+
+            if generation != cls._generation:
+                return
+            try:
+                metrics.dump(filename)
+            except Exception as e:
+                print('FavoriteFiles: Failed to write metrics log: %s' % e)
+            sublime.set_timeout_async(dump, int(interval * 1000))
+
+        sublime.set_timeout_async(dump, int(interval * 1000))
+
+    @classmethod
+    def stop(cls):
+        """Stop periodic dumps."""
+
+        cls._generation += 1
@@ -0,0 +1,198 @@
+"""
+Favorite Files list migrations.
+
+A list is migrated through an ordered chain of version steps. The new list is
+written group by group to a temporary file, which replaces the list once it is
+complete, so the list is never left half written. Progress is checkpointed, and an
+interrupted migration of the same list resumes from the last checkpoint.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import json
+import os
+from .filelock import locked, file_version, temp_name
+from .metrics import metrics
+
+LATEST_VERSION = 2
+TEMP_SUFFIX = '.migrate.part'
+CHECKPOINT_SUFFIX = '.migrate'
+# Groups written between checkpoints
+CHECKPOINT_EVERY = 50
+
+
+class Step(object):
+    """A migration to `version` from the version before it."""
+
+    version = None
+
+    def files(self, entries):
+        """Migrate the global list."""
+
+        return entries
+
+    def group(self, name, entries):
+        """Migrate a group."""
+
+        return entries
+
+
+class Version2(Step):
+    """Version 2 stores entries as objects with an alias instead of plain file names."""
+
+    version = 2
+
+    def entry(self, entry):
+        """Migrate an entry."""
+
+        if isinstance(entry, dict):
+            return entry
+        return {"file": entry, "alias": os.path.basename(entry)}
+
+    def files(self, entries):
+        """Migrate the global list."""
+
+        return [self.entry(e) for e in entries]
+
+    def group(self, name, entries):
+        """Migrate a group."""
+
+        return [self.entry(e) for e in entries]
+
+
+STEPS = (Version2(),)
+
+
+def _dump(value, level):
+    """Dump a value formatted as it is nested `level` deep in a saved list."""
+
+    return json.dumps(value, sort_keys=True, indent=4, separators=(',', ': ')).replace('\n', '\n' + '    ' * level)
+
+
+def _load_checkpoint(filename):
+    """Load the checkpoint of an earlier migration."""
+
+    try:
+        with open(filename + CHECKPOINT_SUFFIX) as f:
+            return json.load(f)
+    except (OSError, IOError, ValueError):
+        return None
+
+
+def _save_checkpoint(filename, checkpoint):
+    """Save the migration checkpoint."""
+
+    name = filename + CHECKPOINT_SUFFIX
+    temp = temp_name(name)
+    with open(temp, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp, name)
+
+
+def _sync(f):
+    """Flush the file to disk."""
+
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _resumable(checkpoint, temp, source, version):
+    """Check if a checkpoint is of a migration of the same list to the same version."""
+
+    if checkpoint is None or checkpoint.get("source") != source or checkpoint.get("version") != version:
+        return False
+    try:
+        return os.path.getsize(temp) >= checkpoint.get("offset", 0)
+    except OSError:
+        return False
+
+
+@metrics.timed('migrate')
+def migrate(filename, data, fp, steps=STEPS, checkpoint_every=CHECKPOINT_EVERY, progress=None):
+    """
+    Migrate the list `data` read from `filename` when it had the fingerprint `fp`.
+
+    The list's file lock is held for the whole migration, so only one process at a time
+    writes the temporary file and checkpoint, and no one saves the list meanwhile.
+    Returns the new version, or `None` if the list changed on disk since it was read.
+    `progress` is called with the number of groups written and the total at each checkpoint.
+    """
+
+    version = data.get("version", 1)
+    chain = [step for step in steps if step.version > version]
+    if not chain:
+        return version
+    target = chain[-1].version
+
+    groups = data.get("groups", {})
+    names = sorted(groups)
+    keys = sorted(set(data) | set(["files", "groups", "version"]))
+    temp = filename + TEMP_SUFFIX
+    source = list(fp)
+
+    with locked(filename):
+        try:
+            if file_version(os.stat(filename)) != tuple(fp):
+                return None
+        except OSError:
+            return None
+
+        checkpoint = _load_checkpoint(filename)
+        if _resumable(checkpoint, temp, source, target):
+            # Resume where the last checkpoint left off
+            f = open(temp, 'r+b')
+            f.seek(checkpoint["offset"])
+            f.truncate()
+            done = checkpoint["groups"]
+            metrics.incr('migrate.resume')
+        else:
+            f = open(temp, 'wb')
+            done = 0
+
+        try:
+            if done == 0:
+                head = []
+                for key in keys:
+                    if key == "groups":
+                        break
+                    value = data.get(key, [])
+                    if key == "files":
+                        for step in chain:
+                            value = step.files(value)
+                    head.append('    %s: %s' % (json.dumps(key), _dump(value, 1)))
+                f.write(('{\n%s,\n    "groups": {' % ',\n'.join(head)).encode('utf-8'))
+
+            for index in range(done, len(names)):
+                name = names[index]
+                entries = groups[name]
+                for step in chain:
+                    entries = step.group(name, entries)
+                f.write(
+                    (
+                        '%s\n        %s: %s' % (',' if index else '', json.dumps(name), _dump(entries, 2))
+                    ).encode('utf-8')
+                )
+                if (index + 1) % checkpoint_every == 0 and index + 1 < len(names):
+                    _sync(f)
+                    _save_checkpoint(
+                        filename,
+                        {"source": source, "version": target, "offset": f.tell(), "groups": index + 1}
+                    )
+                    if progress is not None:
+                        progress(index + 1, len(names))
+
+            tail = ['\n    }' if names else '}']
+            for key in keys[keys.index("groups") + 1:]:
+                value = target if key == "version" else data[key]
+                tail.append('    %s: %s' % (json.dumps(key), _dump(value, 1)))
+            f.write(('%s\n}' % ',\n'.join(tail)).encode('utf-8'))
+            _sync(f)
+        finally:
+            f.close()
+
+        os.replace(temp, filename)
+        try:
+            os.remove(filename + CHECKPOINT_SUFFIX)
+        except OSError:
+            pass
+    return target
@@ -5,6 +5,11 @@ Licensed under MIT
 Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
 """
 import sublime
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from . import settings
 try:
     from SubNotify.sub_notify import SubNotifyIsReadyCommand as Notify
 except Exception:
@@ -17,22 +22,195 @@ except Exception:
 
             return False
 
+# Identical errors are only shown once within this many seconds
+RATE_LIMIT = 2.0
+# Messages listed in a batched summary
+MAX_SUMMARY = 10
+OUTPUT_PANEL = 'favorite_files'
+
+_local = threading.local()
+_lock = threading.Lock()
+_last_shown = {}
+
+
+def _use_sub_notify():
+    """Check if SubNotify should be used."""
+
+    return settings.get().use_sub_notify and Notify.is_ready()
+
+
+def _show_panel(msg):
+    """Show the error in an output panel of the active window."""
+
+    window = sublime.active_window()
+    if window is None:
+        return False
+    view = window.create_output_panel(OUTPUT_PANEL)
+    view.run_command('append', {"characters": msg + '\n', "force": True, "scroll_to_end": True})
+    window.run_command('show_panel', {"panel": "output." + OUTPUT_PANEL})
+    return True
+
+
+def _rate_limited(key):
+    """Check if the message was shown too recently, and record it as shown if not."""
+
+    now = time.time()
+    with _lock:
+        last = _last_shown.get(key)
+        if last is not None and now - last < RATE_LIMIT:
+            return True
+        _last_shown[key] = now
+    return False
+
+
+def _show_error(msg, key=None):
+    """Show an error message."""
+
+    if _rate_limited(msg if key is None else key):
+        print("FavoriteFiles: %s" % msg)
+        sublime.status_message("FavoriteFiles: %s" % msg.replace('\n', ' '))
+    elif _use_sub_notify():
+        sublime.run_command("sub_notify", {"title": "FavoriteFiles", "msg": msg, "level": "error"})
+    elif settings.get().error_dialogs:
+        sublime.error_message("FavoriteFiles:\n%s" % msg)
+    else:
+        sublime.status_message("FavoriteFiles: %s" % msg.split('\n')[0])
+        _show_panel("FavoriteFiles: %s" % msg)
+
+
+def summarize(messages):
+    """Summarize batched messages; repeated messages are listed once with a count."""
+
+    counts = {}
+    unique = []
+    for msg in messages:
+        if msg not in counts:
+            counts[msg] = 0
+            unique.append(msg)
+        counts[msg] += 1
+
+    if len(messages) == 1:
+        return messages[0]
+
+    lines = []
+    for msg in unique[:MAX_SUMMARY]:
+        lines.append(msg if counts[msg] == 1 else "%s (x%d)" % (msg, counts[msg]))
+    if len(unique) > MAX_SUMMARY:
+        lines.append("...and %d more (see console)" % (len(unique) - MAX_SUMMARY))
+    return "%d errors:\n\n%s" % (len(messages), '\n\n'.join(lines))
+
+
+class Batch(object):
+    """
+    Errors buffered to be shown as a single summary.
+
+    A command may continue in background tasks, so a batch is made of several parts and
+    the summary is only shown once every part has finished.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self.messages = []
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def add(self, msg):
+        """Buffer an error."""
+
+        with self._lock:
+            self.messages.append(msg)
+
+    def retain(self):
+        """Keep the batch open for another part."""
+
+        with self._lock:
+            self.pending += 1
+
+    def release(self):
+        """Release a part and show the summary when all parts are done."""
+
+        with self._lock:
+            self.pending -= 1
+            messages = self.messages if self.pending == 0 else None
+        if messages:
+            if len(messages) > 1:
+                for msg in messages:
+                    print("FavoriteFiles: %s" % msg)
+            _show_error(summarize(messages), key=None if len(messages) == 1 else "batch")
+
+
+def current():
+    """Return the batch open on the current thread, if any."""
+
+    return getattr(_local, 'batch', None)
+
+
+@contextmanager
+def resume(batch):
+    """Buffer errors raised in the block in the given batch (if not `None`)."""
+
+    previous = current()
+    _local.batch = batch
+    try:
+        yield
+    finally:
+        _local.batch = previous
+
+
+@contextmanager
+def batch():
+    """
+    Buffer errors raised in the block and show them as a single summary at the end.
+
+    Batches can be nested; the outermost batch shows the summary.
+    """
+
+    if current() is not None:
+        yield
+        return
+
+    errors = Batch()
+    errors.retain()
+    try:
+        with resume(errors):
+            yield
+    finally:
+        errors.release()
+
+
+def batched(fn):
+    """Decorator buffering the errors of each call, and of the background tasks it starts, in one batch."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        """Run the call in a batch."""
+
+        with batch():
+            return fn(*args, **kwargs)
+    return wrapper
+
 
 def notify(msg):
     """Notify message."""
 
-    settings = sublime.load_settings("favorite_files.sublime-settings")
-    if settings.get("use_sub_notify", False) and Notify.is_ready():
+    if _use_sub_notify():
         sublime.run_command("sub_notify", {"title": "FavoriteFiles", "msg": msg})
     else:
         sublime.status_message(msg)
 
 
-def error(msg):
-    """Error message."""
+def error(msg, key=None):
+    """
+    Error message.
 
-    settings = sublime.load_settings("favorite_files.sublime-settings")
-    if settings.get("use_sub_notify", False) and Notify.is_ready():
-        sublime.run_command("sub_notify", {"title": "FavoriteFiles", "msg": msg, "level": "error"})
+    Inside a `batch`, the error is buffered. Otherwise, identical errors (or errors with
+    the same `key`) are only shown once within the rate limit and are sent to the
+    console and status bar in between.
+    """
+
+    errors = current()
+    if errors is not None:
+        errors.add(msg)
     else:
-        sublime.error_message("FavoriteFiles:\n%s" % msg)
+        _show_error(msg, key)
@@ -0,0 +1,104 @@
+"""
+Favorite Files path trie.
+
+Favorites are indexed by the components of their path, so the favorites under a
+folder are found without scanning the whole list, and the folders favorites share
+are stored once.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import re
+
+RE_SEP = re.compile(r'[\\/]+')
+
+
+def split_path(path):
+    """Split a path into its components."""
+
+    return RE_SEP.split(path.rstrip('\\/'))
+
+
+class _Node(object):
+    """A path component; `entries` maps the group (`None` for the global list) to the favorite of this path."""
+
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        """Initialize."""
+
+        self.children = {}
+        self.entries = None
+
+
+class PathTrie(object):
+    """Favorites by path."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.root = _Node()
+
+    @classmethod
+    def from_file_list(cls, file_list):
+        """Build the trie of a favorites list."""
+
+        trie = cls()
+        for entry in file_list.get("files", []):
+            trie.add(None, entry)
+        for group, entries in file_list.get("groups", {}).items():
+            for entry in entries:
+                trie.add(group, entry)
+        return trie
+
+    def add(self, group, entry):
+        """Add the favorite `entry` of the group."""
+
+        node = self.root
+        for part in split_path(entry['file']):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+            node = child
+        if node.entries is None:
+            node.entries = {}
+        node.entries[group] = entry
+
+    def discard(self, group, path):
+        """Remove the favorite of `path` in the group if there is one."""
+
+        node = self.root
+        nodes = []
+        for part in split_path(path):
+            nodes.append((node, part))
+            node = node.children.get(part)
+            if node is None:
+                return
+        if node.entries is None or node.entries.pop(group, None) is None:
+            return
+        if not node.entries:
+            node.entries = None
+        # Drop the folders that no longer lead to a favorite
+        for parent, part in reversed(nodes):
+            child = parent.children[part]
+            if child.entries is not None or child.children:
+                break
+            del parent.children[part]
+
+    def under(self, folder):
+        """Return `(group, entry)` for each favorite in the folder or its subfolders."""
+
+        node = self.root
+        for part in split_path(folder):
+            node = node.children.get(part)
+            if node is None:
+                return []
+
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.entries is not None:
+                found.extend(node.entries.items())
+            stack.extend(node.children.values())
+        return found
@@ -0,0 +1,116 @@
+"""
+Favorite Files page cache prefetching.
+
+While a favorites panel is shown, the files near the highlighted entry are read
+into the page cache in the background, so opening one does not wait on a cold disk.
+`os.posix_fadvise` is used where available; elsewhere the head of the file is read
+and discarded. At most `max_workers` files are prefetched at once, and each panel
+has a byte budget.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import metrics
+
+CHUNK_SIZE = 1024 * 1024
+MAX_WORKERS = 2
+# Requests waiting beyond this are dropped, oldest first
+MAX_PENDING = 8
+
+
+def advise(path, length):
+    """Ask the OS to read the first `length` bytes of the file into the page cache."""
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, length, os.POSIX_FADV_WILLNEED)
+        else:
+            remaining = length
+            while remaining > 0:
+                data = os.read(fd, min(CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+    finally:
+        os.close(fd)
+
+
+class Prefetcher(object):
+    """Prefetch files for a panel within a concurrency cap and a byte budget."""
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING, advise=advise):
+        """Initialize."""
+
+        self.max_workers = max_workers
+        self.advise = advise
+        self.lock = threading.Lock()
+        self.pending = deque(maxlen=max_pending)
+        self.active = 0
+        self.budget = 0
+        self.seen = set()
+        self.executor = None
+
+    def reset(self, budget):
+        """Start prefetching for a new panel with a budget in bytes."""
+
+        with self.lock:
+            self.pending.clear()
+            self.seen.clear()
+            self.budget = budget
+
+    def prefetch(self, paths):
+        """Queue files to prefetch; the last one given is prefetched first."""
+
+        with self.lock:
+            for path in paths:
+                if path not in self.seen:
+                    self.seen.add(path)
+                    self.pending.append(path)
+            start = min(self.max_workers - self.active, len(self.pending))
+            self.active += start
+            if start and self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        for _ in range(start):
+            self.executor.submit(self._work)
+
+    def _next(self):
+        """Return the next file and the bytes it may read, or `None` when done."""
+
+        while True:
+            with self.lock:
+                if not self.pending or self.budget <= 0:
+                    self.active -= 1
+                    return None
+                path = self.pending.pop()
+
+            # Stat outside the lock, so a slow disk does not hold up queuing from the UI thread
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+
+            with self.lock:
+                if self.budget > 0:
+                    length = min(size, self.budget)
+                    self.budget -= length
+                    return path, length
+
+    def _work(self):
+        """Prefetch queued files until there are none left."""
+
+        while True:
+            item = self._next()
+            if item is None:
+                break
+            path, length = item
+            try:
+                self.advise(path, length)
+                metrics.incr('prefetch.files')
+                metrics.incr('prefetch.bytes', length)
+            except OSError:
+                pass
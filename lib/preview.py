@@ -0,0 +1,138 @@
+"""
+Favorite Files highlight preview.
+
+The favorite highlighted in a panel is previewed in a transient view. Files too
+large to load quickly show only their head in a read only scratch view. Previews
+wait for the highlight to settle, so scrolling through a panel does not load every
+file passed on the way.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import sublime
+import mmap
+import os
+
+# Milliseconds a highlight must stay before it is previewed
+PREVIEW_DELAY = 150
+# Larger files only show their head
+MAX_PREVIEW_SIZE = 4 * 1024 * 1024
+HEAD_SIZE = 64 * 1024
+
+
+def read_head(path, size=HEAD_SIZE):
+    """Read the first `size` bytes of a file as text without reading the rest."""
+
+    with open(path, 'rb') as f:
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            return ''
+        try:
+            return m[:size].decode('utf-8', 'replace')
+        finally:
+            m.close()
+
+
+class Preview(object):
+    """Preview files in a window while a panel is shown."""
+
+    def __init__(self, window, delay=PREVIEW_DELAY, max_size=MAX_PREVIEW_SIZE, head_size=HEAD_SIZE):
+        """Initialize."""
+
+        self.window = window
+        self.delay = delay
+        self.max_size = max_size
+        self.head_size = head_size
+        self.original = window.active_view()
+        self.token = None
+        self.transient = None
+        self.scratch = None
+
+    def highlight(self, path):
+        """Preview the file once the highlight settles, or drop the preview if `path` is `None`."""
+
+        token = object()
+        self.token = token
+        if path is None:
+            self.drop()
+        else:
+            sublime.set_timeout(lambda: self.show(path, token), self.delay)
+
+    def show(self, path, token):
+        """Show the preview unless the highlight moved on."""
+
+        if token is not self.token:
+            return
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            self.drop()
+            return
+
+        if size <= self.max_size:
+            self.drop_scratch()
+            if self.transient is not None and self.transient.file_name() == path:
+                return
+            self.drop_transient()
+            opened = self.window.find_open_file(path) is None
+            view = self.window.open_file(path, sublime.TRANSIENT)
+            # Files that were already open are left open
+            self.transient = view if opened else None
+        else:
+            self.drop_transient()
+            try:
+                text = read_head(path, self.head_size)
+            except (OSError, IOError):
+                self.drop()
+                return
+            view = self.scratch
+            if view is None:
+                view = self.window.new_file()
+                view.set_scratch(True)
+                self.scratch = view
+            view.set_name('Preview: %s' % os.path.basename(path))
+            view.set_read_only(False)
+            view.run_command('select_all')
+            view.run_command('right_delete')
+            view.run_command(
+                'append',
+                {'characters': text + '\n\n[First %d KB of %d KB]' % (len(text.encode('utf-8')) // 1024, size // 1024)}
+            )
+            view.set_read_only(True)
+            self.window.focus_view(view)
+
+    def drop_transient(self):
+        """Close the transient view."""
+
+        if self.transient is not None:
+            self.transient.close()
+            self.transient = None
+
+    def drop_scratch(self):
+        """Close the scratch view."""
+
+        if self.scratch is not None:
+            self.scratch.close()
+            self.scratch = None
+
+    def drop(self):
+        """Close the preview and give the focus back."""
+
+        self.drop_transient()
+        self.drop_scratch()
+        if self.original is not None:
+            self.window.focus_view(self.original)
+
+    def close(self, keep=()):
+        """
+        Close the preview when the panel closes.
+
+        A previewed file in `keep` is about to be opened, so its view is kept.
+        """
+
+        self.token = None
+        if self.transient is not None and self.transient.file_name() in keep:
+            self.transient = None
+        self.drop()
@@ -0,0 +1,221 @@
+"""
+Favorite Files on-demand profiling.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+SUMMARY_LINES = 40
+
+
+class Capture(object):
+    """
+    Profile of a single command invocation.
+
+    A command may continue in background tasks, so a capture is made of several profiled
+    segments and is only saved once every segment has finished.
+    """
+
+    def __init__(self, profiler, name):
+        """Initialize."""
+
+        self.profiler = profiler
+        self.name = name
+        self.profiles = []
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def retain(self):
+        """Keep the capture open for another segment."""
+
+        with self._lock:
+            self.pending += 1
+
+    def release(self):
+        """Release a segment and save the capture when all segments are done."""
+
+        with self._lock:
+            self.pending -= 1
+            done = self.pending == 0
+        if done:
+            self.profiler.save(self)
+
+
+class Profiler(object):
+    """
+    Profile the next N invocations of instrumented commands with `cProfile`.
+
+    When not armed, the cost is a single attribute check.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self.remaining = 0
+        self.folder = None
+        self.saved = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def arm(self, count, folder):
+        """Profile the next `count` command invocations and save the results to `folder`."""
+
+        with self._lock:
+            self.remaining = count
+            self.folder = folder
+            self.saved = []
+
+    def disarm(self):
+        """Stop profiling further invocations."""
+
+        with self._lock:
+            self.remaining = 0
+
+    def current(self):
+        """Return the capture profiling the current thread, if any."""
+
+        return getattr(self._local, 'capture', None)
+
+    def begin(self, name):
+        """Start a capture if armed."""
+
+        with self._lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+        capture = Capture(self, name)
+        capture.retain()
+        return capture
+
+    @contextmanager
+    def segment(self, capture):
+        """Profile the block as part of the capture."""
+
+        if capture is None:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        previous = self.current()
+        self._local.capture = capture
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in a different thread
+            profile = None
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                capture.profiles.append(profile)
+            self._local.capture = previous
+
+    def bind(self, callback):
+        """
+        Return a quick panel callback that runs as part of the current capture, if any.
+
+        Panels continue a command after it returns, so the capture is kept open until the callback is called.
+        """
+
+        return self._bind(callback)[0]
+
+    def bind_input(self, on_done):
+        """Return the `on_done`, `on_change`, and `on_cancel` callbacks of an input panel, see `bind`."""
+
+        on_done, on_cancel = self._bind(on_done, None)
+        return on_done, None, on_cancel
+
+    def _bind(self, *callbacks):
+        """Wrap the callbacks to run as part of the current capture until the first of them is called."""
+
+        capture = self.current()
+        if capture is None:
+            return callbacks
+        capture.retain()
+        held = [capture]
+        lock = threading.Lock()
+
+        def wrap(fn):
+            """Wrap a callback."""
+
+            def wrapper(*args):
+                """Run the callback, the first one called as part of the capture."""
+
+                with lock:
+                    capture = held.pop() if held else None
+                if capture is None:
+                    return fn(*args) if fn is not None else None
+                try:
+                    with self.segment(capture):
+                        return fn(*args) if fn is not None else None
+                finally:
+                    capture.release()
+            return wrapper
+        return tuple(wrap(fn) for fn in callbacks)
+
+    def profiled(self, name):
+        """Decorator profiling the call when the profiler is armed."""
+
+        def decorator(fn):
+            """Wrap the function."""
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                """Profile the call."""
+
+                if self.remaining <= 0:
+                    return fn(*args, **kwargs)
+                capture = self.begin(name)
+                try:
+                    with self.segment(capture):
+                        return fn(*args, **kwargs)
+                finally:
+                    if capture is not None:
+                        capture.release()
+            return wrapper
+        return decorator
+
+    def save(self, capture):
+        """Save the capture's stats and a summary of the top functions."""
+
+        if not capture.profiles or self.folder is None:
+            return
+
+        stats = pstats.Stats(capture.profiles[0])
+        for profile in capture.profiles[1:]:
+            stats.add(profile)
+
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        base = os.path.join(
+            self.folder,
+            '%s-%d-%s' % (time.strftime('%Y%m%d-%H%M%S'), len(self.saved) + 1, capture.name)
+        )
+        stats.dump_stats(base + '.pstats')
+
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.strip_dirs().sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        with open(base + '.txt', 'w') as f:
+            f.write('%s\n\n%s' % (capture.name, stream.getvalue()))
+
+        with self._lock:
+            self.saved.append(base + '.txt')
+
+    def summaries(self):
+        """Return the summary files saved since the profiler was last armed."""
+
+        with self._lock:
+            return list(self.saved)
+
+
+profiler = Profiler()
@@ -0,0 +1,147 @@
+"""
+Favorite Files cross project index.
+
+Per project favorites files are discovered from the open windows and a registry of
+projects seen before. Files are loaded in parallel and merged into one list; a refresh
+only reloads files whose fingerprint changed.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import sublime
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .filelock import path_version, save_file
+from .metrics import metrics
+
+PROJECT_SUFFIX = "-favs.json"
+
+
+def project_favs_file(project):
+    """Return the favorites file of a project file."""
+
+    return os.path.splitext(project)[0] + PROJECT_SUFFIX
+
+
+def project_name(favs_file):
+    """Return the project name of a favorites file."""
+
+    name = os.path.basename(favs_file)
+    return name[:-len(PROJECT_SUFFIX)] if name.endswith(PROJECT_SUFFIX) else name
+
+
+def entry_rows(favs_file, data):
+    """Return the panel rows of a favorites list: `[alias, file, location]`."""
+
+    def row(entry, location):
+        # Version 1 lists are plain file names
+        if isinstance(entry, dict):
+            return [entry.get('alias', os.path.basename(entry['file'])), entry['file'], location]
+        return [os.path.basename(entry), entry, location]
+
+    project = "Project: %s" % project_name(favs_file)
+    rows = [row(entry, project) for entry in data.get("files", [])]
+    for group in sorted(data.get("groups", {})):
+        location = "%s, Group: %s" % (project, group)
+        rows.extend(row(entry, location) for entry in data["groups"][group])
+    return rows
+
+
+class ProjectIndex(object):
+    """Merged index of all known per project favorites."""
+
+    def __init__(self, registry, reader, max_workers=4):
+        """
+        Initialize.
+
+        `registry` is the file known projects are stored in, and `reader` reads and
+        parses a favorites file.
+        """
+
+        self.registry = registry
+        self.reader = reader
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.known = None
+        self.loaded = {}
+        self.merged = None
+
+    def _load_registry(self):
+        """Load the registry of known favorites files."""
+
+        try:
+            with open(self.registry) as f:
+                known = json.load(f)
+        except (OSError, IOError, ValueError):
+            known = []
+        return set(k for k in known if isinstance(k, str))
+
+    def _save_registry(self):
+        """Save the registry of known favorites files."""
+
+        save_file(self.registry, json.dumps(sorted(self.known), indent=4))
+
+    def discover(self):
+        """Return the versions of all existing project favorites files, registering new ones."""
+
+        if self.known is None:
+            self.known = self._load_registry()
+        candidates = set(self.known)
+        for window in sublime.windows():
+            project = window.project_file_name()
+            if project:
+                candidates.add(project_favs_file(project))
+
+        found = {}
+        for filename in candidates:
+            version = path_version(filename)
+            if version is not None:
+                found[filename] = version
+
+        # Forget projects whose favorites are gone
+        if set(found) != self.known:
+            self.known = set(found)
+            self._save_registry()
+        return found
+
+    def _read(self, filename):
+        """Read a favorites file and return its rows, or `None` on failure."""
+
+        try:
+            return entry_rows(filename, self.reader(filename))
+        except Exception as e:
+            print("FavoriteFiles: Failed to index %s: %s" % (filename, e))
+            return None
+
+    @metrics.timed('project_index.refresh')
+    def refresh(self):
+        """Reload changed favorites files and return the merged rows (runs off the UI thread)."""
+
+        with self.lock:
+            found = self.discover()
+            changed = [f for f, version in found.items() if f not in self.loaded or self.loaded[f][0] != version]
+            removed = [f for f in self.loaded if f not in found]
+
+            if changed:
+                metrics.incr('project_index.reload', len(changed))
+                if len(changed) == 1:
+                    results = [self._read(changed[0])]
+                else:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(changed))) as executor:
+                        results = list(executor.map(self._read, changed))
+                for filename, rows in zip(changed, results):
+                    if rows is None:
+                        self.loaded.pop(filename, None)
+                    else:
+                        self.loaded[filename] = (found[filename], rows)
+
+            for filename in removed:
+                del self.loaded[filename]
+
+            if changed or removed or self.merged is None:
+                self.merged = []
+                for filename in sorted(self.loaded, key=lambda f: project_name(f).lower()):
+                    self.merged.extend(self.loaded[filename][1])
+            return self.merged
@@ -0,0 +1,103 @@
+"""
+Favorite Files relocation of moved files.
+
+Each favorite records a `(device, inode, size, mtime)` fingerprint. A file that was
+moved or renamed within the same file system keeps its device and inode, even if it
+was edited too, so missing favorites can be found again by scanning a few root folders
+once. The size and mtime only choose between several paths of the same file.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import stat
+from .metrics import metrics
+from .scan import scandir
+
+
+def stat_fingerprint(st):
+    """Return the fingerprint of a stat result."""
+
+    return [st.st_dev, st.st_ino, st.st_size, getattr(st, 'st_mtime_ns', int(st.st_mtime * 1e9))]
+
+
+def fingerprint(path):
+    """Return the fingerprint of a file, or `None` if it is not a file."""
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return stat_fingerprint(st) if stat.S_ISREG(st.st_mode) else None
+
+
+def _entry_inode(entry):
+    """Return the inode of a directory entry."""
+
+    inode = getattr(entry, 'inode', None)
+    return inode() if inode is not None else entry.stat(follow_symlinks=False).st_ino
+
+
+@metrics.timed('relocate.find')
+def find_moved(fingerprints, roots):
+    """
+    Scan the roots once and return a map of `(device, inode)` to the file's new path.
+
+    Only entries whose inode is wanted are stat'ed, which `os.scandir` provides for free
+    on POSIX, so large trees cost little more than listing them. If a file has several
+    paths (hard links or overlapping roots), one with the recorded size and mtime is preferred.
+    """
+
+    wanted = {}
+    for fp in fingerprints:
+        wanted.setdefault((fp[0], fp[1]), fp)
+    inodes = set(key[1] for key in wanted)
+    found = {}
+    exact = 0
+    stack = [os.path.expanduser(root) for root in roots]
+    while stack and exact < len(wanted):
+        folder = stack.pop()
+        try:
+            entries = list(scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif _entry_inode(entry) in inodes:
+                    fp = stat_fingerprint(entry.stat(follow_symlinks=False))
+                    key = (fp[0], fp[1])
+                    if key in wanted:
+                        score = (fp[2] == wanted[key][2], fp[3] == wanted[key][3])
+                        if key not in found or score > found[key][0]:
+                            found[key] = (score, entry.path)
+                            if all(score):
+                                exact += 1
+            except OSError:
+                continue
+    metrics.incr('relocate.found', len(found))
+    return dict((key, path) for key, (score, path) in found.items())
+
+
+def relocate_entries(entries, roots):
+    """
+    Point the entries at their files' new locations and return the entries that were moved.
+
+    Entries are favorites dictionaries with a `fingerprint`; an alias that was the old
+    file name follows the new file name.
+    """
+
+    candidates = [e for e in entries if isinstance(e.get('fingerprint'), list) and len(e['fingerprint']) == 4]
+    if not candidates or not roots:
+        return []
+    found = find_moved([e['fingerprint'] for e in candidates], roots)
+    moved = []
+    for entry in candidates:
+        path = found.get((entry['fingerprint'][0], entry['fingerprint'][1]))
+        if path is not None:
+            if entry.get('alias') == os.path.basename(entry['file']):
+                entry['alias'] = os.path.basename(path)
+            entry['file'] = path
+            moved.append(entry)
+    return moved
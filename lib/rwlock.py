@@ -0,0 +1,110 @@
+"""
+Favorite Files reader-writer lock.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import threading
+from contextlib import contextmanager
+
+try:
+    from threading import get_ident
+except ImportError:  # pragma: no cover
+    from _thread import get_ident
+
+
+class RWLock(object):
+    """
+    Reader-writer lock.
+
+    Any number of readers may hold the lock at once, but a writer holds it alone.
+    Waiting writers block new readers so writers are not starved. Both read and write
+    locks are re-entrant, and the thread holding the write lock may also read, but a
+    reader cannot upgrade to a writer.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        """Acquire the read lock."""
+
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me not in self._readers:
+                while self._writer is not None or self._writers_waiting:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        """Release the read lock."""
+
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth -= 1
+                return
+            count = self._readers[me] - 1
+            if count:
+                self._readers[me] = count
+            else:
+                del self._readers[me]
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        """Acquire the write lock."""
+
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        """Release the write lock."""
+
+        with self._cond:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Hold the read lock for the duration of the context."""
+
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Hold the write lock for the duration of the context."""
+
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
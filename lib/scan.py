@@ -0,0 +1,256 @@
+"""
+Favorite Files directory scanning.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+try:
+    from os import scandir
+except ImportError:  # pragma: no cover
+    # Python 3.3 plugin host does not have `os.scandir`
+    class _DirEntry(object):
+        """Minimal `os.DirEntry` fallback."""
+
+        def __init__(self, folder, name):
+            """Initialize."""
+
+            self.name = name
+            self.path = os.path.join(folder, name)
+
+        def is_dir(self, follow_symlinks=True):
+            """Check if entry is a directory."""
+
+            if not follow_symlinks and os.path.islink(self.path):
+                return False
+            return os.path.isdir(self.path)
+
+        def is_file(self, follow_symlinks=True):
+            """Check if entry is a file."""
+
+            if not follow_symlinks and os.path.islink(self.path):
+                return False
+            return os.path.isfile(self.path)
+
+        def stat(self, follow_symlinks=True):
+            """Stat the entry."""
+
+            return os.stat(self.path) if follow_symlinks else os.lstat(self.path)
+
+    def scandir(folder):
+        """Scan the folder and return directory entries."""
+
+        return iter([_DirEntry(folder, name) for name in os.listdir(folder)])
+
+
+RE_MAGIC = re.compile(r'[*?\[]')
+# Folder listings kept by a scan cache
+MAX_FOLDERS = 10000
+
+
+def walk_files(root, max_depth=None):
+    """
+    Walk the tree under root and yield the path of every file.
+
+    Symlinked folders are not followed to avoid cycles.
+    """
+
+    stack = [(root, 1)]
+    while stack:
+        folder, depth = stack.pop()
+        try:
+            entries = list(scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if max_depth is None or depth < max_depth:
+                        stack.append((entry.path, depth + 1))
+                elif entry.is_file():
+                    yield entry.path
+            except OSError:
+                continue
+
+
+def _translate_part(part):
+    """Translate a single glob path component to a regular expression."""
+
+    i = 0
+    length = len(part)
+    result = []
+    while i < length:
+        c = part[i]
+        i += 1
+        if c == '*':
+            result.append('[^/]*')
+        elif c == '?':
+            result.append('[^/]')
+        elif c == '[':
+            j = i
+            if j < length and part[j] == '!':
+                j += 1
+            if j < length and part[j] == ']':
+                j += 1
+            end = part.find(']', j)
+            if end == -1:
+                result.append(re.escape(c))
+            else:
+                chars = part[i:end].replace('\\', '\\\\')
+                i = end + 1
+                if chars.startswith('!'):
+                    chars = '^' + chars[1:]
+                result.append('[%s]' % chars)
+        else:
+            result.append(re.escape(c))
+    return ''.join(result)
+
+
+def split_glob(pattern):
+    """
+    Split a glob pattern into its literal base folder and the pattern parts below it.
+
+    `**` matches any number of folders.
+    """
+
+    parts = os.path.normpath(os.path.expanduser(pattern)).replace('\\', '/').split('/')
+    index = 0
+    for index, part in enumerate(parts):
+        if RE_MAGIC.search(part):
+            break
+    else:
+        # No magic, the pattern is a literal path
+        index = len(parts)
+    base = '/'.join(parts[:index])
+    if not base and pattern.startswith(('/', '\\')):
+        base = '/'
+    return os.path.normpath(base) if base else os.curdir, parts[index:]
+
+
+def compile_glob(parts):
+    """Compile glob pattern parts into a regular expression matching paths relative to the base."""
+
+    pattern = []
+    last = len(parts) - 1
+    for index, part in enumerate(parts):
+        if part == '**':
+            pattern.append('.*' if index == last else '(?:[^/]*/)*')
+        else:
+            pattern.append(_translate_part(part) + ('' if index == last else '/'))
+    return re.compile('^%s$' % ''.join(pattern), re.IGNORECASE if os.name == 'nt' else 0)
+
+
+def glob_depth(parts):
+    """Return the maximum folder depth a glob can match, or `None` if unbounded."""
+
+    return None if '**' in parts else len(parts)
+
+
+def iter_glob(pattern, walk=walk_files):
+    """
+    Yield each file matching the glob pattern.
+
+    A pattern without any magic that points to a folder yields all files under the folder.
+    """
+
+    base, parts = split_glob(pattern)
+    if not parts:
+        if os.path.isfile(base):
+            yield base
+        elif os.path.isdir(base):
+            yield from walk(base)
+        return
+
+    regex = compile_glob(parts)
+    for path in walk(base, glob_depth(parts)):
+        if regex.match(os.path.relpath(path, base).replace('\\', '/')):
+            yield path
+
+
+class ScanCache(object):
+    """
+    Cache of folder listings keyed by the folder's modification time.
+
+    Adding, removing, or renaming an entry updates the modification time of its parent
+    folder, so only folders that changed since the last walk are scanned again.
+    """
+
+    def __init__(self, max_folders=MAX_FOLDERS):
+        """Initialize."""
+
+        self._folders = OrderedDict()
+        self.max_folders = max_folders
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """Clear the cache."""
+
+        with self._lock:
+            self._folders.clear()
+
+    def listdir(self, folder):
+        """Return the files and sub-folders of a folder."""
+
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return [], []
+
+        with self._lock:
+            cached = self._folders.get(folder)
+            if cached is not None:
+                self._folders.move_to_end(folder)
+        if cached is not None and cached[0] == mtime:
+            self.hits += 1
+            return cached[1], cached[2]
+
+        self.misses += 1
+        files = []
+        folders = []
+        try:
+            for entry in scandir(folder):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+        except OSError:
+            return [], []
+
+        with self._lock:
+            self._folders[folder] = (mtime, files, folders)
+            self._folders.move_to_end(folder)
+            while len(self._folders) > self.max_folders:
+                # Drop the least recently used listing
+                self._folders.popitem(last=False)
+        return files, folders
+
+    def walk_files(self, root, max_depth=None, check=None):
+        """
+        Walk the tree under root using cached listings and yield the path of every file.
+
+        If given, `check` is called before each folder is listed; the walk stops when it returns false.
+        """
+
+        stack = [(root, 1)]
+        while stack:
+            folder, depth = stack.pop()
+            if check is not None and not check():
+                return
+            files, folders = self.listdir(folder)
+            yield from files
+            if max_depth is None or depth < max_depth:
+                stack.extend((f, depth + 1) for f in reversed(folders))
+
+    def iter_glob(self, pattern, check=None):
+        """Yield each file matching the glob pattern using cached listings, see `walk_files` for `check`."""
+
+        return iter_glob(pattern, lambda root, max_depth=None: self.walk_files(root, max_depth, check))
@@ -0,0 +1,95 @@
+"""
+Favorite Files settings.
+
+A read only snapshot of all options is kept and only rebuilt when the settings
+file changes, so reading an option is a plain attribute access.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import sublime
+from collections import namedtuple
+
+SETTINGS_FILE = "favorite_files.sublime-settings"
+ON_CHANGE_KEY = "favorite_files_settings"
+
+# Option name, type, and default (matching favorite_files.sublime-settings)
+OPTIONS = (
+    ("enable_per_projects", bool, True),
+    ("use_sub_notify", bool, True),
+    ("error_dialogs", bool, True),
+    ("always_ask_alias", bool, False),
+    ("max_favorites", int, 0),
+    ("max_group_favorites", int, 0),
+    ("favorite_eviction", str, "reject"),
+    ("enable_frecency", bool, False),
+    ("enable_prefetch", bool, False),
+    ("prefetch_budget", int, 64),
+    ("preview_on_highlight", bool, False),
+    ("enable_metrics", bool, False),
+    ("metrics_log_interval", (int, float), 0),
+    ("cache_rendered_docs", bool, False),
+    ("relocation_roots", tuple, ())
+)
+
+Options = namedtuple("Options", [name for name, _, _ in OPTIONS])
+
+DEFAULTS = Options(*[default for _, _, default in OPTIONS])
+
+_snapshot = [None]
+_listeners = {}
+
+
+def _read(settings):
+    """Build a snapshot from the settings object; values of the wrong type use the default."""
+
+    values = []
+    for name, kind, default in OPTIONS:
+        value = settings.get(name, default)
+        if kind is bool:
+            value = bool(value)
+        elif kind is tuple and isinstance(value, list):
+            # Keep the snapshot immutable
+            value = tuple(value)
+        elif not isinstance(value, kind) or isinstance(value, bool):
+            print("FavoriteFiles: Invalid value for '%s', using the default" % name)
+            value = default
+        values.append(value)
+    return Options(*values)
+
+
+def _refresh():
+    """Rebuild the snapshot and notify listeners."""
+
+    _snapshot[0] = _read(sublime.load_settings(SETTINGS_FILE))
+    for callback in list(_listeners.values()):
+        callback(_snapshot[0])
+
+
+def load():
+    """Load the settings and watch them for changes."""
+
+    settings = sublime.load_settings(SETTINGS_FILE)
+    settings.clear_on_change(ON_CHANGE_KEY)
+    settings.add_on_change(ON_CHANGE_KEY, _refresh)
+    _refresh()
+
+
+def get():
+    """Return the current snapshot of the options."""
+
+    if _snapshot[0] is None:
+        load()
+    return _snapshot[0]
+
+
+def add_listener(key, callback):
+    """Call `callback` with the new snapshot whenever the settings change."""
+
+    _listeners[key] = callback
+
+
+def remove_listener(key):
+    """Remove a change listener."""
+
+    _listeners.pop(key, None)
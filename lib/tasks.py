@@ -0,0 +1,145 @@
+"""
+Favorite Files background tasks.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import sublime
+import threading
+import traceback
+from collections import OrderedDict
+from . import notify
+from .metrics import metrics
+from .profiler import profiler
+
+
+class Task(object):
+    """A unit of work run off the UI thread."""
+
+    def __init__(self, key, fn, on_done=None):
+        """Initialize."""
+
+        self.key = key
+        self.fn = fn
+        self.on_done = on_done
+        self._cancelled = threading.Event()
+        # Continue profiling the command that submitted the task
+        self.capture = profiler.current()
+        if self.capture is not None:
+            self.capture.retain()
+        # The command's latency includes the task
+        self.span = metrics.current()
+        if self.span is not None:
+            self.span.retain()
+        # Errors are shown with those of the command once it is done
+        self.errors = notify.current()
+        if self.errors is not None:
+            self.errors.retain()
+
+    def cancel(self):
+        """Cancel the task; it will not run, or its result will be discarded."""
+
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        """Check if task is cancelled."""
+
+        return self._cancelled.is_set()
+
+    def release(self):
+        """Release the task's profile capture, command span, and error batch."""
+
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        if self.span is not None:
+            self.span.release()
+            self.span = None
+        if self.errors is not None:
+            self.errors.release()
+            self.errors = None
+
+
+class TaskScheduler(object):
+    """
+    Run tasks with `sublime.set_timeout_async` and deliver results on the UI thread.
+
+    Tasks are keyed (by the command and its favorites file), so only identical requests are
+    merged. A task submitted for a key cancels any older task for the same key: a queued task
+    is replaced in the queue, and a running task has its result discarded. Results are passed
+    to `on_done` through `sublime.set_timeout`.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self._lock = threading.Lock()
+        self._queue = OrderedDict()
+        self._latest = {}
+
+    def submit(self, key, fn, on_done=None):
+        """Queue a task and return it."""
+
+        task = Task(key, fn, on_done)
+        with self._lock:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = task
+            coalesced = key in self._queue
+            self._queue[key] = task
+
+        # A coalesced task takes the place of the one already scheduled
+        if not coalesced:
+            sublime.set_timeout_async(self._run_next, 0)
+        return task
+
+    def cancel(self, key):
+        """Cancel the latest task for the key."""
+
+        with self._lock:
+            self._queue.pop(key, None)
+            task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def pending(self):
+        """Return the number of queued tasks."""
+
+        with self._lock:
+            return len(self._queue)
+
+    def _run_next(self):
+        """Run the oldest queued task."""
+
+        with self._lock:
+            if not self._queue:
+                return
+            task = self._queue.popitem(last=False)[1]
+
+        if task.is_cancelled():
+            task.release()
+            return
+
+        try:
+            with profiler.segment(task.capture), metrics.resume(task.span), notify.resume(task.errors):
+                result = task.fn()
+        except Exception:
+            traceback.print_exc()
+            task.release()
+            return
+
+        if task.on_done is not None and not task.is_cancelled():
+            sublime.set_timeout(lambda: self._finish(task, result), 0)
+        else:
+            task.release()
+
+    def _finish(self, task, result):
+        """Deliver the result on the UI thread unless superseded in the meantime."""
+
+        try:
+            if not task.is_cancelled():
+                with profiler.segment(task.capture), metrics.resume(task.span), notify.resume(task.errors):
+                    task.on_done(result)
+        finally:
+            task.release()
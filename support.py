@@ -1,9 +1,15 @@
 """Support command."""
 import sublime
 import sublime_plugin
+import hashlib
+import os
 import textwrap
+import threading
 import webbrowser
 import re
+from FavoriteFiles.lib.filelock import save_file
+from FavoriteFiles.lib.metrics import metrics
+from FavoriteFiles.lib import settings
 
 __version__ = "1.6.1"
 __pc_name__ = 'FavoriteFiles'
@@ -18,6 +24,11 @@ div.favorite-files { padding: 10px; margin: 0; }
 .favorite-files a { text-decoration: none; }
 '''
 
+# Rendered markdown by key, and `mdpopups` with its phantom support (checked once per session)
+_rendered = {}
+_mdpopups = []
+_lock = threading.Lock()
+
 
 def list2string(obj):
     """Convert list to string."""
@@ -49,6 +60,96 @@ def is_installed_by_package_control():
     return str(__pc_name__ in set(settings.get('installed_packages', [])))
 
 
+def import_mdpopups():
+    """Return `mdpopups` (or `None` if it is not installed) and whether it can show phantoms."""
+
+    with _lock:
+        if not _mdpopups:
+            try:
+                import mdpopups
+                has_phantom_support = (mdpopups.version() >= (1, 10, 0)) and (int(sublime.version()) >= 3124)
+            except Exception:
+                mdpopups = None
+                has_phantom_support = False
+            _mdpopups.append((mdpopups, has_phantom_support))
+        return _mdpopups[0]
+
+
+def get_mdpopups():
+    """Return `mdpopups` if it can show phantoms, or `None`."""
+
+    mdpopups, has_phantom_support = import_mdpopups()
+    return mdpopups if has_phantom_support else None
+
+
+def render_key(mdpopups, view, text):
+    """Return the cache key of markdown rendered in the view from its content, mdpopups version, and color scheme."""
+
+    content = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    scheme = view.settings().get('color_scheme', '')
+    context = '%s\n%s' % (format_version(mdpopups, 'version', call=True), scheme)
+    return '%s-%s' % (content, hashlib.sha1(context.encode('utf-8')).hexdigest()[:16])
+
+
+def render_markdown(mdpopups, view, text):
+    """Return the markdown rendered to minihtml, reusing an earlier render if there is one."""
+
+    key = render_key(mdpopups, view, text)
+    with _lock:
+        html = _rendered.get(key)
+    if html is not None:
+        metrics.incr('render_cache.hit')
+        return html
+
+    cache = None
+    if settings.get().cache_rendered_docs:
+        cache = os.path.join(sublime.cache_path(), 'FavoriteFiles', 'rendered')
+        try:
+            with open(os.path.join(cache, key + '.html'), encoding='utf-8') as f:
+                html = f.read()
+            metrics.incr('render_cache.disk_hit')
+        except (OSError, IOError):
+            pass
+
+    if html is None:
+        metrics.incr('render_cache.miss')
+        with metrics.timer('render_markdown'):
+            html = mdpopups.md2html(view, text)
+        if cache is not None:
+            save_file(os.path.join(cache, key + '.html'), html, encoding='utf-8')
+
+    with _lock:
+        _rendered[key] = html
+    return html
+
+
+def show_markdown(window, name, key, text, on_navigate):
+    """Show markdown in a new view, rendered if phantoms are supported; return the view."""
+
+    mdpopups = get_mdpopups()
+    view = window.new_file()
+    view.set_name(name)
+    view.settings().set('gutter', False)
+    view.settings().set('word_wrap', False)
+    if mdpopups is not None:
+        mdpopups.add_phantom(
+            view,
+            key,
+            sublime.Region(0),
+            render_markdown(mdpopups, view, text),
+            sublime.LAYOUT_INLINE,
+            md=False,
+            css=CSS,
+            wrapper_class="favorite-files",
+            on_navigate=on_navigate
+        )
+    else:
+        view.run_command('insert', {"characters": text})
+    view.set_read_only(True)
+    view.set_scratch(True)
+    return view
+
+
 class FavoriteFilesSupportInfoCommand(sublime_plugin.ApplicationCommand):
     """Support info."""
 
@@ -62,10 +163,10 @@ class FavoriteFilesSupportInfoCommand(sublime_plugin.ApplicationCommand):
         info["arch"] = sublime.arch()
         info["plugin_version"] = __version__
         info["pc_install"] = is_installed_by_package_control()
-        try:
-            import mdpopups
+        mdpopups = import_mdpopups()[0]
+        if mdpopups is not None:
             info["mdpopups_version"] = format_version(mdpopups, 'version', call=True)
-        except Exception:
+        else:
             info["mdpopups_version"] = 'Version could not be acquired!'
 
         msg = textwrap.dedent(
@@ -79,6 +180,11 @@ class FavoriteFilesSupportInfoCommand(sublime_plugin.ApplicationCommand):
             """ % info
         )
 
+        if metrics.enabled:
+            summary = metrics.format_summary()
+            if summary:
+                msg += '- Metrics:\n' + textwrap.indent(summary, '    - ') + '\n'
+
         sublime.message_dialog(msg + '\nInfo has been copied to the clipboard.')
         sublime.set_clipboard(msg)
 
@@ -108,35 +214,11 @@ class FavoriteFilesDocCommand(sublime_plugin.WindowCommand):
     def run(self, page):
         """Open page."""
 
-        try:
-            import mdpopups
-            has_phantom_support = (mdpopups.version() >= (1, 10, 0)) and (int(sublime.version()) >= 3124)
-        except Exception:
-            has_phantom_support = False
-
-        if not has_phantom_support:
+        if get_mdpopups() is None:
             sublime.run_command('open_file', {"file": page})
         else:
             text = sublime.load_resource(page.replace('${packages}', 'Packages'))
-            view = self.window.new_file()
-            view.set_name('FavoriteFiles - Quick Start')
-            view.settings().set('gutter', False)
-            view.settings().set('word_wrap', False)
-            if has_phantom_support:
-                mdpopups.add_phantom(
-                    view,
-                    'quickstart',
-                    sublime.Region(0),
-                    text,
-                    sublime.LAYOUT_INLINE,
-                    css=CSS,
-                    wrapper_class="favorite-files",
-                    on_navigate=self.on_navigate
-                )
-            else:
-                view.run_command('insert', {"characters": text})
-            view.set_read_only(True)
-            view.set_scratch(True)
+            show_markdown(self.window, 'FavoriteFiles - Quick Start', 'quickstart', text, self.on_navigate)
 
 
 class FavoriteFilesChangesCommand(sublime_plugin.WindowCommand):
@@ -144,32 +226,9 @@ class FavoriteFilesChangesCommand(sublime_plugin.WindowCommand):
 
     def run(self):
         """Show the changelog in a new view."""
-        try:
-            import mdpopups
-            has_phantom_support = (mdpopups.version() >= (1, 10, 0)) and (int(sublime.version()) >= 3124)
-        except Exception:
-            has_phantom_support = False
 
         text = sublime.load_resource('Packages/FavoriteFiles/CHANGES.md')
-        view = self.window.new_file()
-        view.set_name('FavoriteFiles - Changelog')
-        view.settings().set('gutter', False)
-        view.settings().set('word_wrap', False)
-        if has_phantom_support:
-            mdpopups.add_phantom(
-                view,
-                'changelog',
-                sublime.Region(0),
-                text,
-                sublime.LAYOUT_INLINE,
-                wrapper_class="favorite-files",
-                css=CSS,
-                on_navigate=self.on_navigate
-            )
-        else:
-            view.run_command('insert', {"characters": text})
-        view.set_read_only(True)
-        view.set_scratch(True)
+        show_markdown(self.window, 'FavoriteFiles - Changelog', 'changelog', text, self.on_navigate)
 
     def on_navigate(self, href):
         """Open links."""
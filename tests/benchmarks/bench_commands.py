@@ -0,0 +1,157 @@
+"""
+Benchmark FavoriteFiles commands end to end with the stand-in Sublime API.
+
+Run from the repository root:
+
+    python -m tests.benchmarks.bench_commands --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from .. import util
+
+metrics = util.load_module('lib.metrics')
+
+
+class Bench(object):
+    """Command benchmark over a generated favorites list."""
+
+    def __init__(self, size, repeat, windows):
+        """Initialize."""
+
+        self.size = size
+        self.repeat = repeat
+        self.window_count = windows
+        self.tempdir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.tempdir, 'User', 'favorite_files_list.json')
+        os.makedirs(os.path.dirname(self.list_file))
+        util.write_favorites(
+            self.list_file,
+            util.make_favorites(size, groups=max(1, size // 1000), group_size=100, root=self.tempdir)
+        )
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.window = self.sublime.create_window()
+        self.results = {}
+
+    def close(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def measure(self, name, fn, setup=None):
+        """Time `fn` (including the background work it starts) `repeat` times."""
+
+        histogram = metrics.Histogram()
+        for i in range(self.repeat):
+            if setup is not None:
+                setup(i)
+            start = time.perf_counter()
+            fn(i)
+            self.sublime.flush_async()
+            histogram.add(time.perf_counter() - start)
+        self.results[name] = histogram.summary()
+
+    def touch(self, i):
+        """Change the list's modification time so it is reloaded."""
+
+        stamp = time.time() + i + 1
+        os.utime(self.list_file, (stamp, stamp))
+
+    def open_panel(self, i, window=None):
+        """Show the Open panel and close it."""
+
+        window = window or self.window
+        self.plugin.FavoriteFilesOpenCommand(window).run()
+        self.sublime.flush_async()
+        if window.quick_panel is not None:
+            window.select(-1)
+
+    def add(self, i):
+        """Add the active file without a group."""
+
+        self.plugin.FavoriteFilesAddCommand(self.window).run()
+        self.window.select(0)
+
+    def new_file(self, i):
+        """Open a new file to add as the only view."""
+
+        for view in self.window.views():
+            view.close()
+        path = os.path.join(self.tempdir, 'added%d.txt' % i)
+        with open(path, 'w') as f:
+            f.write('')
+        self.window.open_file(path)
+
+    def remove(self, i):
+        """Remove the first favorite."""
+
+        self.plugin.FavoriteFilesRemoveCommand(self.window).run()
+        self.sublime.flush_async()
+        self.window.select(0)
+
+    def run(self):
+        """Run all scenarios."""
+
+        self.measure('open (reload)', self.open_panel, self.touch)
+        self.measure('open (cached)', self.open_panel)
+        self.measure('add', self.add, self.new_file)
+        self.measure('remove', self.remove)
+
+        # Per project toggling and opening across many windows
+        windows = []
+        for w in range(self.window_count):
+            project = os.path.join(self.tempdir, 'project%d.sublime-project' % w)
+            util.write_favorites(
+                os.path.splitext(project)[0] + '-favs.json',
+                util.make_favorites(self.size, root=os.path.join(self.tempdir, 'project%d' % w))
+            )
+            windows.append(self.sublime.create_window(project_file_name=project))
+
+        def toggle(i):
+            for w in windows:
+                self.plugin.FavoriteFilesTogglePerProjectCommand(w).run()
+
+        self.measure('toggle per project (%d windows)' % self.window_count, toggle)
+
+        def open_all(i):
+            for w in windows + [self.window]:
+                self.open_panel(i, w)
+
+        self.measure('open (%d windows)' % (self.window_count + 1), open_all)
+        return self.results
+
+
+def main():
+    """Run the benchmarks."""
+
+    parser = argparse.ArgumentParser(description='Benchmark FavoriteFiles commands.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Favorites list sizes.')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per scenario.')
+    parser.add_argument('--windows', type=int, default=8, help='Project windows for multi-window scenarios.')
+    parser.add_argument('--json', help='Write results to this JSON file.')
+    args = parser.parse_args()
+
+    report = {}
+    for size in args.sizes:
+        bench = Bench(size, args.repeat, args.windows)
+        try:
+            results = bench.run()
+        finally:
+            bench.close()
+        report[size] = results
+        print('\n%d entries' % size)
+        print('%-32s %8s %8s %8s %8s' % ('scenario', 'mean', 'p50', 'p90', 'max'))
+        for name, s in results.items():
+            print('%-32s %7.2fms %7.2fms %7.2fms %7.2fms' % (name, s['mean'], s['p50'], s['p90'], s['max']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark migrating a large version 1 favorites list.
+
+Run from the repository root:
+
+    python -m tests.benchmarks.bench_migrate --entries 100000 --groups 1000
+
+Reports the time to read the list, migrate it, and load the migrated list, and
+checks the result against a plain conversion of the whole list.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from .. import util
+
+migrate = util.load_module('lib.migrate')
+favorites = util.load_module('favorites')
+
+
+def make_v1(entries, groups, root='/home/build/workspaces/repo'):
+    """Generate a version 1 list with the entries spread evenly over the groups and the global list."""
+
+    per_group = entries // (groups + 1)
+    return {
+        "version": 1,
+        "files": ['%s/global/file%d.py' % (root, i) for i in range(entries - per_group * groups)],
+        "groups": dict(
+            ('group%04d' % g, ['%s/group%d/file%d.py' % (root, g, i) for i in range(per_group)])
+            for g in range(groups)
+        )
+    }
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description='Benchmark favorites list migration.')
+    parser.add_argument('--entries', type=int, default=100000, help='Number of entries.')
+    parser.add_argument('--groups', type=int, default=1000, help='Number of groups.')
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(tempdir, 'favorite_files_list.json')
+        data = make_v1(args.entries, args.groups)
+        util.write_favorites(filename, data)
+        print('%d entries in %d groups, %.1f MB' % (
+            args.entries, args.groups, os.path.getsize(filename) / 1e6
+        ))
+
+        start = time.perf_counter()
+        loaded, _, fp = favorites.FavFileMgr.load_favs_file(filename)
+        read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        version = migrate.migrate(filename, loaded, fp)
+        elapsed = time.perf_counter() - start
+        del loaded
+
+        start = time.perf_counter()
+        migrated = favorites.FavFileMgr.read_favs_file(filename)
+        reload = time.perf_counter() - start
+
+        print('%-10s %8.3fs' % ('read', read))
+        print('%-10s %8.3fs' % ('migrate', elapsed))
+        print('%-10s %8.3fs' % ('reload', reload))
+
+        expected = migrate.Version2()
+        assert version == 2 and migrated["version"] == 2
+        assert migrated["files"] == expected.files(data["files"])
+        assert all(migrated["groups"][k] == expected.group(k, v) for k, v in data["groups"].items())
+        print('migrated to version %d' % version)
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark JSON format validation on large settings files.
+
+Run from the repository root:
+
+    python -m tests.benchmarks.bench_validate_json --lines 10000 50000 100000
+
+Time per line should stay roughly flat as the file grows.
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from .. import validate_json_format
+
+
+def make_settings(lines):
+    """Generate a settings file with comments and dangling commas of about the given number of lines."""
+
+    out = ['{\n']
+    count = max(1, lines // 4)
+    for i in range(count):
+        out.append('    // Setting %d.\n' % i)
+        out.append('    "setting_%d": [\n' % i)
+        out.append('        %d, "value, with // comma",\n' % i)
+        # Each array and the last setting end with a dangling comma
+        out.append('    ],\n')
+    out.append('}\n')
+    return ''.join(out)
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description='Benchmark JSON format validation.')
+    parser.add_argument('--lines', type=int, nargs='+', default=[10000, 50000, 100000], help='File sizes in lines.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per size (best is reported).')
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        print('%10s %10s %14s' % ('lines', 'best', 'per line'))
+        for lines in args.lines:
+            filename = os.path.join(tempdir, 'bench%d.sublime-settings' % lines)
+            with open(filename, 'w') as f:
+                f.write(make_settings(lines))
+            best = None
+            for _ in range(args.repeat):
+                checker = validate_json_format.CheckJsonFormat(False, False)
+                start = time.perf_counter()
+                # Every comment and dangling comma is reported, don't flood the output
+                with contextlib.redirect_stdout(io.StringIO()):
+                    checker.check_format(filename)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print('%10d %9.3fs %12.2fus' % (lines, best, best / lines * 1e6))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
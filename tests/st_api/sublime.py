@@ -0,0 +1,613 @@
+"""
+Headless stand-in for the Sublime Text `sublime` API.
+
+Simulates windows, views, quick and input panels, timeouts, and settings so the plugin
+can be driven from tests and benchmarks. Only what the plugin uses is provided.
+
+`set_timeout` callbacks are queued for the main thread, which is the test's thread: the
+test helpers (`flush_async` and the panel helpers) run them, in the order they are due,
+as if that much time had passed. `set_timeout_async` callbacks run one at a time on a
+single worker thread, like Sublime's async thread. Use `flush_async` to wait for both
+threads to become idle.
+"""
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+import traceback
+
+TRANSIENT = 4
+ENCODED_POSITION = 1
+FORCE_GROUP = 8
+LAYOUT_INLINE = 0
+LAYOUT_BELOW = 1
+LAYOUT_BLOCK = 2
+MONOSPACE_FONT = 1
+KEEP_OPEN_ON_FOCUS_LOST = 2
+
+_packages_path = ""
+_settings = {}
+_windows = []
+_resources = {}
+_clipboard = ""
+_ids = [0]
+_lock = threading.Lock()
+# Main thread callbacks: (due, order, generation, callback)
+_main_queue = []
+_main_order = itertools.count()
+_generation = [0]
+messages = []
+
+
+def _next_id():
+    """Return a new object ID."""
+
+    with _lock:
+        _ids[0] += 1
+        return _ids[0]
+
+
+def reset():
+    """Reset all state."""
+
+    global _clipboard
+    with _lock:
+        # Callbacks queued by earlier tests are dropped
+        _generation[0] += 1
+        del _main_queue[:]
+    del _windows[:]
+    _settings.clear()
+    _resources.clear()
+    del messages[:]
+    _clipboard = ""
+
+
+def version():
+    """Return the Sublime Text version."""
+
+    return "4180"
+
+
+def platform():
+    """Return the platform."""
+
+    return "linux"
+
+
+def arch():
+    """Return the architecture."""
+
+    return "x64"
+
+
+def packages_path():
+    """Return the packages path."""
+
+    return _packages_path
+
+
+def set_packages_path(path):
+    """Set the packages path."""
+
+    global _packages_path
+    _packages_path = path
+
+
+def cache_path():
+    """Return the cache path (kept inside the packages path so tests remove it with it)."""
+
+    return os.path.join(_packages_path, 'Cache')
+
+
+def add_resource(name, text):
+    """Register a package resource."""
+
+    _resources[name] = text
+
+
+def load_resource(name):
+    """Load a package resource."""
+
+    if name in _resources:
+        return _resources[name]
+    path = os.path.join(os.path.dirname(_packages_path), name) if name.startswith('Packages/') else name
+    with open(path) as f:
+        return f.read()
+
+
+def set_clipboard(text):
+    """Set the clipboard."""
+
+    global _clipboard
+    _clipboard = text
+
+
+def get_clipboard():
+    """Get the clipboard."""
+
+    return _clipboard
+
+
+class Region(object):
+    """Region."""
+
+    def __init__(self, a, b=None):
+        """Initialize."""
+
+        self.a = a
+        self.b = a if b is None else b
+
+
+class Settings(object):
+    """Settings object."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self._data = {}
+        self._on_change = {}
+
+    def add_on_change(self, key, callback):
+        """Register a change callback."""
+
+        self._on_change[key] = callback
+
+    def clear_on_change(self, key):
+        """Remove a change callback."""
+
+        self._on_change.pop(key, None)
+
+    def get(self, key, default=None):
+        """Get setting."""
+
+        return self._data.get(key, default)
+
+    def set(self, key, value):  # noqa: A003
+        """Set setting."""
+
+        self._data[key] = value
+        for callback in list(self._on_change.values()):
+            callback()
+
+    def erase(self, key):
+        """Erase setting."""
+
+        self._data.pop(key, None)
+
+    def has(self, key):
+        """Check if setting exists."""
+
+        return key in self._data
+
+
+class View(object):
+    """View."""
+
+    def __init__(self, window, file_name=None):
+        """Initialize."""
+
+        self._id = _next_id()
+        self._window = window
+        self._file_name = file_name
+        self._settings = Settings()
+        self._name = ""
+        self.text = ""
+        self.read_only = False
+        self.scratch = False
+        self.closed = False
+        self.all_selected = False
+
+    def id(self):  # noqa: A003
+        """Return view ID."""
+
+        return self._id
+
+    def window(self):
+        """Return the view's window."""
+
+        return self._window
+
+    def file_name(self):
+        """Return the view's file name."""
+
+        return self._file_name
+
+    def name(self):
+        """Return the view name."""
+
+        return self._name
+
+    def set_name(self, name):
+        """Set the view name."""
+
+        self._name = name
+
+    def settings(self):
+        """Return view settings."""
+
+        return self._settings
+
+    def size(self):
+        """Return the size of the buffer."""
+
+        return len(self.text)
+
+    def is_loading(self):
+        """Check if the view is loading."""
+
+        return False
+
+    def set_read_only(self, value):
+        """Set read only."""
+
+        self.read_only = value
+
+    def set_scratch(self, value):
+        """Set scratch."""
+
+        self.scratch = value
+
+    def close(self):
+        """Close the view."""
+
+        if self._window is not None:
+            self._window._close_view(self)
+        self.closed = True
+
+    def run_command(self, cmd, args=None):
+        """Run a text command."""
+
+        if cmd == 'insert':
+            self.text += args.get('characters', '')
+        elif cmd == 'append':
+            self.text += args.get('characters', '')
+        elif cmd == 'select_all':
+            self.all_selected = True
+        elif cmd == 'right_delete' and self.all_selected:
+            self.text = ""
+            self.all_selected = False
+
+
+class QuickPanel(object):
+    """A shown quick panel."""
+
+    def __init__(self, items, on_select, flags, selected_index, on_highlight):
+        """Initialize."""
+
+        self.items = items
+        self.on_select = on_select
+        self.flags = flags
+        self.selected_index = selected_index
+        self.on_highlight = on_highlight
+
+
+class InputPanel(object):
+    """A shown input panel."""
+
+    def __init__(self, caption, initial_text, on_done, on_change, on_cancel):
+        """Initialize."""
+
+        self.caption = caption
+        self.initial_text = initial_text
+        self.on_done = on_done
+        self.on_change = on_change
+        self.on_cancel = on_cancel
+        self.view = View(None)
+
+
+class Window(object):
+    """Window."""
+
+    def __init__(self, folders=None, project_file_name=None):
+        """Initialize."""
+
+        self._id = _next_id()
+        self._folders = list(folders or [])
+        self._project_file_name = project_file_name
+        self._groups = [[]]
+        self._active_group = 0
+        self._active_view = None
+        self.quick_panel = None
+        self.input_panel = None
+        self.output_panels = {}
+        self.commands = []
+        self.panel_event = threading.Event()
+
+    def id(self):  # noqa: A003
+        """Return window ID."""
+
+        return self._id
+
+    def folders(self):
+        """Return the window's folders."""
+
+        return list(self._folders)
+
+    def project_file_name(self):
+        """Return the window's project file."""
+
+        return self._project_file_name
+
+    def num_groups(self):
+        """Return the number of layout groups."""
+
+        return len(self._groups)
+
+    def set_num_groups(self, count):
+        """Set the number of layout groups (test helper)."""
+
+        while len(self._groups) < count:
+            self._groups.append([])
+
+    def active_group(self):
+        """Return the active layout group."""
+
+        return self._active_group
+
+    def views(self):
+        """Return all views."""
+
+        return [v for group in self._groups for v in group]
+
+    def views_in_group(self, group):
+        """Return the views in a layout group."""
+
+        return list(self._groups[group])
+
+    def active_view(self):
+        """Return the active view."""
+
+        return self._active_view
+
+    def get_view_index(self, view):
+        """Return the group and index of the view."""
+
+        for g, group in enumerate(self._groups):
+            if view in group:
+                return g, group.index(view)
+        return -1, -1
+
+    def set_view_index(self, view, group, index):
+        """Move the view."""
+
+        g, i = self.get_view_index(view)
+        if g != -1:
+            del self._groups[g][i]
+        self._groups[group].insert(min(index, len(self._groups[group])), view)
+
+    def find_open_file(self, file_name):
+        """Return the view of an open file."""
+
+        for view in self.views():
+            if view.file_name() == file_name:
+                return view
+        return None
+
+    def open_file(self, file_name, flags=0, group=-1):
+        """Open a file."""
+
+        view = self.find_open_file(file_name)
+        if view is None:
+            view = View(self, file_name)
+            self._groups[self._active_group if group < 0 else group].append(view)
+        self._active_view = view
+        return view
+
+    def new_file(self):
+        """Create a new view."""
+
+        view = View(self)
+        self._groups[self._active_group].append(view)
+        self._active_view = view
+        return view
+
+    def focus_view(self, view):
+        """Focus the view."""
+
+        self._active_view = view
+
+    def _close_view(self, view):
+        """Remove a closed view."""
+
+        g, i = self.get_view_index(view)
+        if g != -1:
+            del self._groups[g][i]
+        if self._active_view is view:
+            views = self.views()
+            self._active_view = views[-1] if views else None
+
+    def create_output_panel(self, name):
+        """Create or clear an output panel."""
+
+        view = View(None)
+        self.output_panels[name] = view
+        return view
+
+    def find_output_panel(self, name):
+        """Return an output panel."""
+
+        return self.output_panels.get(name)
+
+    def show_quick_panel(self, items, on_select, flags=0, selected_index=-1, on_highlight=None):
+        """Show a quick panel."""
+
+        previous = self.quick_panel
+        self.quick_panel = QuickPanel(items, on_select, flags, selected_index, on_highlight)
+        if previous is not None and previous.on_select is not None:
+            # Showing a new panel cancels the old one
+            previous.on_select(-1)
+        self.panel_event.set()
+
+    def show_input_panel(self, caption, initial_text, on_done, on_change, on_cancel):
+        """Show an input panel."""
+
+        self.input_panel = InputPanel(caption, initial_text, on_done, on_change, on_cancel)
+        self.panel_event.set()
+        return self.input_panel.view
+
+    def run_command(self, cmd, args=None):
+        """Run a window command."""
+
+        self.commands.append((cmd, args))
+        if cmd == 'close_window':
+            _windows.remove(self)
+        elif cmd == 'hide_overlay' and self.quick_panel is not None:
+            panel = self.quick_panel
+            self.quick_panel = None
+            if panel.on_select is not None:
+                panel.on_select(-1)
+
+    def wait_for_panel(self, timeout=30):
+        """Wait for a quick or input panel to be shown, running main thread callbacks meanwhile (test helper)."""
+
+        end = time.time() + timeout
+        shown = False
+        while not shown and time.time() < end:
+            run_main()
+            shown = self.panel_event.wait(0.01)
+        self.panel_event.clear()
+        return shown
+
+    def highlight(self, index):
+        """Highlight an item in the quick panel (test helper)."""
+
+        if self.quick_panel.on_highlight is not None:
+            self.quick_panel.on_highlight(index)
+        run_main()
+
+    def select(self, index):
+        """Select an item in the quick panel, or -1 to cancel (test helper)."""
+
+        panel = self.quick_panel
+        self.quick_panel = None
+        if panel.on_select is not None:
+            panel.on_select(index)
+        run_main()
+
+    def submit(self, text):
+        """Submit text to the input panel (test helper)."""
+
+        panel = self.input_panel
+        self.input_panel = None
+        if panel.on_done is not None:
+            panel.on_done(text)
+        run_main()
+
+
+def create_window(folders=None, project_file_name=None):
+    """Create a window (test helper)."""
+
+    window = Window(folders, project_file_name)
+    _windows.append(window)
+    return window
+
+
+def windows():
+    """Return all windows."""
+
+    return list(_windows)
+
+
+def active_window():
+    """Return the active window."""
+
+    return _windows[0] if _windows else None
+
+
+def load_settings(name):
+    """Load settings."""
+
+    if name not in _settings:
+        _settings[name] = Settings()
+    return _settings[name]
+
+
+def error_message(msg):
+    """Record an error dialog."""
+
+    messages.append(('error', msg))
+
+
+def message_dialog(msg):
+    """Record a message dialog."""
+
+    messages.append(('message', msg))
+
+
+def status_message(msg):
+    """Record a status message."""
+
+    messages.append(('status', msg))
+
+
+def set_timeout(callback, delay=0):
+    """Queue callback for the main thread."""
+
+    with _lock:
+        heapq.heappush(_main_queue, (time.time() + delay / 1000.0, next(_main_order), _generation[0], callback))
+
+
+def run_main():
+    """Run the queued main thread callbacks on the calling thread and return whether any ran (test helper)."""
+
+    ran = False
+    while True:
+        with _lock:
+            if not _main_queue:
+                return ran
+            generation, callback = heapq.heappop(_main_queue)[2:]
+            if generation != _generation[0]:
+                continue
+        ran = True
+        try:
+            callback()
+        except Exception:
+            traceback.print_exc()
+
+
+_async_queue = queue.Queue()
+
+
+def _async_worker():
+    """Run async callbacks one at a time like Sublime's async thread."""
+
+    while True:
+        callback = _async_queue.get()
+        try:
+            callback()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            _async_queue.task_done()
+
+
+_async_thread = threading.Thread(target=_async_worker, daemon=True)
+_async_thread.start()
+
+
+def set_timeout_async(callback, delay=0):
+    """Run callback on the async thread."""
+
+    if delay > 0:
+        timer = threading.Timer(delay / 1000.0, _async_queue.put, (callback,))
+        timer.daemon = True
+        timer.start()
+    else:
+        _async_queue.put(callback)
+
+
+def flush_async():
+    """Wait until all async callbacks, and the main thread callbacks they queued, have run (test helper)."""
+
+    while True:
+        _async_queue.join()
+        if not run_main():
+            return
+
+
+def run_command(cmd, args=None):
+    """Run an application command."""
+
+    messages.append(('command', (cmd, args)))
@@ -0,0 +1,27 @@
+"""Headless stand-in for the Sublime Text `sublime_plugin` API."""
+
+
+class ApplicationCommand(object):
+    """Application command."""
+
+
+class WindowCommand(object):
+    """Window command."""
+
+    def __init__(self, window):
+        """Initialize."""
+
+        self.window = window
+
+
+class TextCommand(object):
+    """Text command."""
+
+    def __init__(self, view):
+        """Initialize."""
+
+        self.view = view
+
+
+class EventListener(object):
+    """Event listener."""
@@ -0,0 +1,118 @@
+"""Test incremental reloads."""
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from . import util
+
+changes = util.load_module('lib.changes')
+favorites = util.load_module('favorites')
+
+
+def entry(path, alias=None):
+    """Return a favorites entry."""
+
+    return {"file": path, "alias": alias or os.path.basename(path)}
+
+
+class TestChanges(unittest.TestCase):
+    """Test change sets."""
+
+    def test_apply(self):
+        """Test that only changes are applied."""
+
+        current = {
+            "version": 2,
+            "files": [entry('/a'), entry('/b')],
+            "groups": {"same": [entry('/c')], "edit": [entry('/d'), entry('/e')], "gone": [entry('/f')]}
+        }
+        files = current["files"]
+        same = current["groups"]["same"]
+        kept = current["groups"]["edit"][0]
+        new = {
+            "version": 2,
+            "files": [entry('/a'), entry('/b')],
+            "groups": {"same": [entry('/c')], "edit": [entry('/d'), entry('/e', 'E'), entry('/g')], "new": []}
+        }
+        result = changes.apply_file_list(current, new, 'list.json')
+        self.assertEqual(current, new)
+        self.assertIs(current["files"], files)
+        self.assertIs(current["groups"]["same"], same)
+        self.assertIs(current["groups"]["edit"][0], kept)
+        self.assertEqual(result.added, [('edit', entry('/g'))])
+        self.assertEqual(result.changed, [('edit', entry('/e'), entry('/e', 'E'))])
+        self.assertEqual(result.removed, [('gone', entry('/f'))])
+        self.assertEqual(result.groups_added, ['new'])
+        self.assertEqual(result.groups_removed, ['gone'])
+
+    def test_reorder(self):
+        """Test that moved entries are reported."""
+
+        current = {"version": 2, "files": [entry('/a'), entry('/b')], "groups": {}}
+        result = changes.apply_file_list(current, {"version": 2, "files": [entry('/b'), entry('/a')], "groups": {}}, '')
+        self.assertEqual(result.reordered, [None])
+        self.assertEqual(len(result), 0)
+        self.assertFalse(result.is_empty())
+
+
+class TestListeners(unittest.TestCase):
+    """Test change listeners."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.tempdir, 'favorite_files_list.json')
+        util.write_favorites(self.list_file, {"version": 2, "files": [entry('/a'), entry('/b')], "groups": {}})
+        self.favs = favorites.Favorites(self.list_file)
+        self.seen = []
+        self.favs.add_listener('test', self.seen.append)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_external_edit(self):
+        """Test that an external edit is sent to listeners as a change set."""
+
+        self.assertFalse(self.favs.load())
+        self.assertEqual(self.seen, [])
+
+        util.write_favorites(self.list_file, {"version": 2, "files": [entry('/a', 'A'), entry('/b')], "groups": {}})
+        # Make sure the modification time changes
+        os.utime(self.list_file, (time.time() + 1, time.time() + 1))
+        self.assertFalse(self.favs.load())
+        self.assertEqual(len(self.seen), 1)
+        self.assertEqual(self.seen[0].changed, [(None, entry('/a'), entry('/a', 'A'))])
+        self.assertEqual(self.favs.all_files()[0][0], 'A')
+
+    def test_merge(self):
+        """Test that changes merged on save are sent to listeners."""
+
+        other = favorites.Favorites(self.list_file)
+        other.set('/c')
+        other.save(True)
+        os.utime(self.list_file, (time.time() + 1, time.time() + 1))
+
+        self.favs.set('/d')
+        self.favs.save(True)
+        self.assertEqual(len(self.seen), 1)
+        self.assertEqual(self.seen[0].added, [(None, {"file": "/c", "alias": "c"})])
+        self.assertEqual([f[1] for f in self.favs.all_files()], ['/a', '/b', '/c', '/d'])
+
+    def test_switch(self):
+        """Test that switching to a project list is sent as a reset."""
+
+        sublime = util.load_api('sublime')
+        sublime.reset()
+        window = sublime.create_window(project_file_name=os.path.join(self.tempdir, 'test.sublime-project'))
+        self.assertFalse(self.favs.toggle_per_projects(window.id()))
+        self.favs.open(win_id=window.id())
+        self.assertEqual([c.reset for c in self.seen], [True])
+        self.assertEqual(self.seen[0].file_name, os.path.join(self.tempdir, 'test-favs.json'))
+
+
+if __name__ == "__main__":
+    unittest.main()
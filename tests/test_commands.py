@@ -0,0 +1,141 @@
+"""Test commands end to end with the stand-in Sublime API."""
+import unittest
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+from . import util
+
+
+class TestCommands(unittest.TestCase):
+    """Test the window commands."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.tempdir, 'User', 'favorite_files_list.json')
+        os.makedirs(os.path.dirname(self.list_file))
+        self.files = []
+        for name in ('a.txt', 'b.txt', 'c.txt'):
+            path = os.path.join(self.tempdir, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            self.files.append(path)
+        util.write_favorites(
+            self.list_file,
+            {
+                "version": 2,
+                "files": [{"file": self.files[0], "alias": "a.txt"}],
+                "groups": {"group": [{"file": self.files[1], "alias": "b.txt"}]}
+            }
+        )
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.window = self.sublime.create_window()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def run_command(self, name, **kwargs):
+        """Run a window command and wait for its panel."""
+
+        getattr(self.plugin, name)(self.window).run(**kwargs)
+        self.sublime.flush_async()
+
+    def saved(self):
+        """Return the saved favorites list."""
+
+        with open(self.list_file) as f:
+            return json.load(f)
+
+    def test_open(self):
+        """Test opening a favorite."""
+
+        self.run_command('FavoriteFilesOpenCommand')
+        self.assertEqual(self.window.quick_panel.items, [["a.txt", self.files[0]], ["Group: group", "1 files"]])
+        self.window.select(0)
+        self.assertEqual(self.window.active_view().file_name(), self.files[0])
+
+    def test_open_group(self):
+        """Test opening a group."""
+
+        self.run_command('FavoriteFilesOpenCommand')
+        self.window.select(1)
+        self.assertEqual(self.window.quick_panel.items, [["Open Group", ""], ["b.txt", self.files[1]]])
+        self.window.select(0)
+        self.assertEqual([v.file_name() for v in self.window.views()], [self.files[1]])
+
+    def test_add(self):
+        """Test adding the active file."""
+
+        self.window.open_file(self.files[2])
+        self.run_command('FavoriteFilesAddCommand')
+        self.assertEqual(self.window.quick_panel.items[:2], ["No Group", "Create Group"])
+        self.window.select(0)
+        self.assertEqual([e['file'] for e in self.saved()['files']], [self.files[0], self.files[2]])
+
+    def test_remove(self):
+        """Test removing a favorite."""
+
+        self.run_command('FavoriteFilesRemoveCommand')
+        self.window.select(0)
+        self.assertEqual(self.saved()['files'], [])
+
+    def test_edit_alias(self):
+        """Test editing an alias, with the panels profiled as part of the command."""
+
+        self.plugin.profiler.arm(1, os.path.join(self.tempdir, 'profiles'))
+        self.addCleanup(self.plugin.profiler.disarm)
+        self.run_command('FavoriteFilesEditAliasCommand')
+        self.window.select(0)
+        self.assertEqual(self.window.input_panel.initial_text, "a.txt")
+        self.assertEqual(self.plugin.profiler.summaries(), [])
+        self.window.submit("first")
+        self.assertEqual(self.saved()['files'][0]['alias'], "first")
+        summaries = self.plugin.profiler.summaries()
+        self.assertEqual(len(summaries), 1)
+        functions = [key[2] for key in pstats.Stats(summaries[0][:-4] + '.pstats').stats]
+        self.assertIn('set_alias', functions)
+
+    def test_clean_then_open(self):
+        """Test that opening the list does not replace a queued clean up of the same list."""
+
+        os.remove(self.files[0])
+        gate = threading.Event()
+        started = threading.Event()
+
+        def block():
+            started.set()
+            gate.wait(5)
+
+        self.sublime.set_timeout_async(block, 0)
+        started.wait(5)
+        self.plugin.FavoriteFilesCleanOrphansCommand(self.window).run()
+        self.plugin.FavoriteFilesOpenCommand(self.window).run()
+        gate.set()
+        self.sublime.flush_async()
+        self.assertEqual(self.saved()['files'], [])
+        self.assertEqual(self.window.quick_panel.items, [["Group: group", "1 files"]])
+
+    def test_toggle_per_project(self):
+        """Test toggling per project favorites."""
+
+        project = os.path.join(self.tempdir, 'test.sublime-project')
+        window = self.sublime.create_window(project_file_name=project)
+        self.plugin.FavoriteFilesTogglePerProjectCommand(window).run()
+        self.sublime.flush_async()
+        self.assertTrue(os.path.exists(os.path.join(self.tempdir, 'test-favs.json')))
+        self.assertEqual(self.plugin.Favs.file_for_window(window.id()), os.path.join(self.tempdir, 'test-favs.json'))
+
+        # Toggle back to the global list
+        self.plugin.FavoriteFilesTogglePerProjectCommand(window).run()
+        self.assertEqual(self.plugin.Favs.file_for_window(window.id()), self.list_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""Test list size limits."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestEviction(unittest.TestCase):
+    """Test list size limits."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.eviction = util.load_module('lib.eviction')
+        self.favorites = util.load_module('favorites')
+        self.settings = self.sublime.load_settings("favorite_files.sublime-settings")
+        self.opened = {}
+        self.favs = self.favorites.Favorites(
+            os.path.join(self.tempdir, 'list.json'), last_opened=lambda name: self.opened.get(name, 0.0)
+        )
+
+    def tearDown(self):
+        """Cleanup."""
+
+        # Later tests may use the settings snapshot without reloading the plugin
+        self.settings.set("max_favorites", 0)
+        self.settings.set("max_group_favorites", 0)
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def shown(self, kind):
+        """Return the messages of the given kind."""
+
+        return [msg for k, msg in self.sublime.messages if k == kind]
+
+    def files(self, group_name=None):
+        """Return the files of the list."""
+
+        return [f[1] for f in self.favs.all_files(group_name)]
+
+    def test_queue(self):
+        """Test that entries come out lowest key first and are requeued when their key grew."""
+
+        keys = {'a': 3, 'b': 1, 'c': 1, 'd': 0}
+        entries = [{'file': name} for name in ('a', 'b', 'c')]
+        queue = self.eviction.EvictionQueue(entries, lambda entry: keys[entry['file']])
+        queue.push({'file': 'd'}, key=2)
+        keys['b'] = 5
+        self.assertEqual([queue.pop()['file'] for _ in range(4)], ['c', 'd', 'a', 'b'])
+        self.assertIsNone(queue.pop())
+
+    def test_reject(self):
+        """Test that a full list rejects new favorites and reports them once."""
+
+        self.settings.set("max_favorites", 2)
+        with self.favs.transaction():
+            for name in ('/a', '/b', '/c', '/d'):
+                self.favs.set(name)
+        self.assertEqual(self.files(), ['/a', '/b'])
+        self.assertEqual(
+            self.shown('error'), ['FavoriteFiles:\n2 favorite(s) were not added because the list is full!']
+        )
+
+    def test_oldest_added(self):
+        """Test evicting the oldest favorites of a group."""
+
+        self.settings.set("max_group_favorites", 2)
+        self.settings.set("favorite_eviction", "oldest_added")
+        self.favs.add_group('g')
+        with self.favs.transaction():
+            for name in ('/a', '/b', '/c', '/d'):
+                self.favs.set(name, group_name='g')
+            self.favs.set('/e')
+        self.assertEqual(self.files('g'), ['/c', '/d'])
+        self.assertEqual(self.files(), ['/e'])
+        self.assertEqual(
+            self.shown('status'), ['2 favorite(s) were removed from a full list to make room.']
+        )
+
+    def test_least_recently_opened(self):
+        """Test evicting the favorite opened least recently."""
+
+        self.settings.set("max_favorites", 3)
+        self.settings.set("favorite_eviction", "least_recently_opened")
+        for name in ('/a', '/b', '/c'):
+            self.favs.set(name)
+        self.opened.update({'/a': 10.0, '/b': 5.0, '/c': 20.0})
+        self.favs.set('/d')
+        self.assertEqual(self.files(), ['/a', '/c', '/d'])
+
+        # "/a" was opened again since the queue was built
+        self.opened['/a'] = 30.0
+        self.favs.set('/e')
+        self.assertEqual(self.files(), ['/a', '/d', '/e'])
+
+    def test_queue_kept(self):
+        """Test that queues are kept across commits and rebuilt when the list is read from disk."""
+
+        self.settings.set("max_favorites", 2)
+        self.settings.set("favorite_eviction", "oldest_added")
+        for name in ('/a', '/b', '/c'):
+            with self.favs.transaction():
+                self.favs.set(name)
+        queue = self.favs.obj.evict[None]
+        with self.favs.transaction():
+            self.favs.set('/d')
+        self.assertIs(self.favs.obj.evict[None], queue)
+        self.assertEqual(self.files(), ['/c', '/d'])
+
+        # Changes saved by someone else
+        util.write_favorites(
+            self.favs.obj.file_name, {"version": 2, "files": [{"file": "/e", "alias": "e"}], "groups": {}}
+        )
+        os.utime(self.favs.obj.file_name, (0, 0))
+        self.assertFalse(self.favs.load())
+        self.assertEqual(self.favs.obj.evict, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
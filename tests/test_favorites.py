@@ -0,0 +1,322 @@
+"""Test favorites."""
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from . import util
+
+favorites = util.load_module('favorites')
+
+
+class TestConcurrency(unittest.TestCase):
+    """Test favorites shared between threads."""
+
+    THREADS = 8
+    ITERATIONS = 200
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.favs = favorites.Favorites(os.path.join(self.tempdir, 'favorite_files_list.json'))
+        self.favs.add_group('group')
+        self.favs.save(True)
+        self.failures = []
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def run_threads(self, target, count=None):
+        """Run the target in several threads and wait for them."""
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(count or self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def guard(self, fn):
+        """Record any exception raised by a worker."""
+
+        def wrapper(index):
+            try:
+                fn(index)
+            except Exception as e:
+                self.failures.append(e)
+        return wrapper
+
+    def check_rows(self, rows):
+        """Check that panel rows are consistent."""
+
+        paths = [row[1] for row in rows]
+        self.assertEqual(len(paths), len(set(paths)))
+        for alias, path in rows:
+            self.assertEqual(alias, os.path.basename(path))
+
+    def test_instances_do_not_share_state(self):
+        """Test that state is per instance."""
+
+        other = favorites.Favorites(os.path.join(self.tempdir, 'other.json'))
+        self.favs.set('/a/file.txt')
+        self.favs.obj.projects.add(1)
+        self.assertEqual(other.all_files(), [])
+        self.assertEqual(other.obj.projects, set())
+
+    def test_set_remove(self):
+        """Test that concurrent adds and removes are not lost."""
+
+        def worker(index):
+            for i in range(self.ITERATIONS):
+                name = '/thread%d/file%d.txt' % (index, i)
+                self.favs.set(name)
+                self.favs.set(name, group_name='group')
+                if i % 2:
+                    self.favs.remove(name)
+                    self.favs.remove(name, group_name='group')
+                self.check_rows(self.favs.all_files())
+
+        self.run_threads(self.guard(worker))
+        self.assertEqual(self.failures, [])
+
+        expected = set(
+            '/thread%d/file%d.txt' % (t, i) for t in range(self.THREADS) for i in range(0, self.ITERATIONS, 2)
+        )
+        self.assertEqual(set(row[1] for row in self.favs.all_files()), expected)
+        self.assertEqual(set(row[1] for row in self.favs.all_files('group')), expected)
+
+    def test_load_save(self):
+        """Test that reads always see a consistent list while others load and save."""
+
+        def mutator(index):
+            for i in range(self.ITERATIONS):
+                name = '/thread%d/file%d.txt' % (index, i)
+                self.favs.set(name, group_name='group')
+                self.favs.save(True)
+                self.favs.remove(name, group_name='group')
+
+        def reader(index):
+            for i in range(self.ITERATIONS):
+                self.assertFalse(self.favs.load(force=(i % 2 == 0)))
+                self.check_rows(self.favs.all_files('group'))
+                data = self.favs.snapshot()
+                self.assertEqual(data['version'], 2)
+                self.check_rows([[e['alias'], e['file']] for e in data['groups']['group']])
+
+        mutators = self.guard(mutator)
+        readers = self.guard(reader)
+        self.run_threads(lambda i: (mutators if i % 2 else readers)(i))
+        self.assertEqual(self.failures, [])
+
+        # Memory and disk agree after a final save and load
+        before = self.favs.all_files('group')
+        self.favs.save(True)
+        self.assertFalse(self.favs.load(force=True))
+        self.assertEqual(self.favs.all_files('group'), before)
+
+
+class TestTransaction(unittest.TestCase):
+    """Test transactions."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.tempdir, 'favorite_files_list.json')
+        self.favs = favorites.Favorites(self.list_file)
+        self.favs.add_group('group')
+        self.favs.set('/a', group_name='group')
+        self.favs.save(True)
+        self.changes = []
+        self.favs.add_listener('test', self.changes.append)
+        self.writes = []
+        write = favorites.FavFileMgr.write_favs_file
+
+        def counted(filename, data):
+            self.writes.append(filename)
+            return write(filename, data)
+
+        favorites.FavFileMgr.write_favs_file = counted
+        self.addCleanup(setattr, favorites.FavFileMgr, 'write_favs_file', write)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_commit(self):
+        """Test that changes are saved and sent to listeners once."""
+
+        with self.favs.transaction():
+            # Replace the group
+            self.favs.add_group('group')
+            with self.favs.transaction():
+                self.favs.set('/b', group_name='group')
+                self.favs.save(True)
+            self.favs.set('/c', group_name='group')
+            self.favs.set_alias('C', 1, group_name='group')
+            self.assertEqual(self.writes, [])
+        self.assertEqual(self.writes, [self.list_file])
+        self.assertEqual(len(self.changes), 1)
+        self.assertEqual(
+            sorted(e['file'] for _, e in self.changes[0].added), ['/b', '/c']
+        )
+        self.assertEqual([e['file'] for _, e in self.changes[0].removed], ['/a'])
+        self.assertEqual(favorites.FavFileMgr.read_favs_file(self.list_file)['groups']['group'][1]['alias'], 'C')
+
+    def test_no_changes(self):
+        """Test that nothing is saved if nothing changed."""
+
+        with self.favs.transaction():
+            self.favs.save(True)
+        self.assertEqual(self.writes, [])
+        self.assertEqual(self.changes, [])
+
+    def test_rollback(self):
+        """Test that changes are rolled back on an exception."""
+
+        with self.assertRaises(ValueError):
+            with self.favs.transaction():
+                self.favs.remove_group('group')
+                self.favs.set('/b')
+                raise ValueError()
+        self.assertEqual(self.favs.all_files(group_name='group'), [['a', '/a']])
+        self.assertEqual(self.favs.all_files(), [])
+        self.assertEqual(self.writes, [])
+        self.assertEqual(self.changes, [])
+
+
+class TestProjects(unittest.TestCase):
+    """Test per project favorites across restarts."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime = util.load_api('sublime')
+        self.sublime.reset()
+        self.list_file = os.path.join(self.tempdir, 'favorite_files_list.json')
+        self.state_file = os.path.join(self.tempdir, 'FavoriteFiles', 'state.json')
+        self.windows = []
+        for name in ('a', 'b'):
+            window = self.sublime.create_window(
+                project_file_name=os.path.join(self.tempdir, '%s.sublime-project' % name)
+            )
+            util.write_favorites(
+                os.path.join(self.tempdir, '%s-favs.json' % name),
+                {"version": 2, "files": [{"file": '/%s' % name, "alias": name}], "groups": {}}
+            )
+            self.windows.append(window.id())
+        favs = favorites.Favorites(self.list_file, self.state_file)
+        for win_id in self.windows:
+            self.assertFalse(favs.toggle_per_projects(win_id))
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def restart(self):
+        """Reopen the project windows and return new favorites."""
+
+        self.sublime.reset()
+        self.windows = [
+            self.sublime.create_window(
+                project_file_name=os.path.join(self.tempdir, '%s.sublime-project' % name)
+            ).id() for name in ('a', 'b')
+        ]
+        return favorites.Favorites(self.list_file, self.state_file)
+
+    def test_state(self):
+        """Test that per project favorites stay on after a restart until toggled off."""
+
+        favs = self.restart()
+        self.assertEqual(favs.file_for_window(self.windows[0]), os.path.join(self.tempdir, 'a-favs.json'))
+        self.assertFalse(favs.toggle_global(self.windows[0]))
+
+        favs = self.restart()
+        self.assertEqual(favs.file_for_window(self.windows[0]), self.list_file)
+        self.assertEqual(favs.file_for_window(self.windows[1]), os.path.join(self.tempdir, 'b-favs.json'))
+
+    def test_preload(self):
+        """Test that preloaded lists are used while they are current."""
+
+        favs = self.restart()
+        favs.preload()
+        self.assertEqual(sorted(favs.obj.preloaded), [
+            os.path.join(self.tempdir, 'a-favs.json'), os.path.join(self.tempdir, 'b-favs.json')
+        ])
+        preloaded = favs.obj.preloaded[os.path.join(self.tempdir, 'a-favs.json')][1]
+        util.write_favorites(
+            os.path.join(self.tempdir, 'b-favs.json'),
+            {"version": 2, "files": [{"file": '/c', "alias": 'c'}], "groups": {}}
+        )
+
+        self.assertFalse(favs.load(win_id=self.windows[0]))
+        self.assertIs(favs.obj.files, preloaded)
+        self.assertFalse(favs.load(win_id=self.windows[1]))
+        self.assertEqual([f[1] for f in favs.all_files()], ['/c'])
+
+        # The list switched away from is kept for the next switch back
+        self.assertFalse(favs.load(win_id=self.windows[0]))
+        self.assertIs(favs.obj.files, preloaded)
+
+    def test_preload_closed(self):
+        """Test that the lists of closed windows are not kept, and that the number kept is limited."""
+
+        favs = self.restart()
+        favs.preload()
+        self.assertFalse(favs.load(win_id=self.windows[0]))
+        self.assertEqual(list(favs.obj.preloaded), [os.path.join(self.tempdir, 'b-favs.json')])
+
+        window = self.sublime.create_window(project_file_name=os.path.join(self.tempdir, 'c.sublime-project'))
+        util.write_favorites(os.path.join(self.tempdir, 'c-favs.json'), {"version": 2, "files": [], "groups": {}})
+        self.assertFalse(favs.toggle_per_projects(window.id()))
+        self.sublime.windows()[1].run_command('close_window')
+        self.assertFalse(favs.load(win_id=window.id()))
+        self.assertEqual(list(favs.obj.preloaded), [os.path.join(self.tempdir, 'a-favs.json')])
+
+        self.addCleanup(setattr, favorites, 'MAX_PRELOADED', favorites.MAX_PRELOADED)
+        favorites.MAX_PRELOADED = 0
+        self.assertFalse(favs.load(win_id=self.windows[0]))
+        self.assertEqual(list(favs.obj.preloaded), [])
+
+    def test_not_blocked_by_load(self):
+        """Test that the list can be used while another thread reads a list."""
+
+        favs = self.restart()
+        self.assertFalse(favs.load(win_id=self.windows[0]))
+        reading = threading.Event()
+        gate = threading.Event()
+        load = favorites.FavFileMgr.__dict__['load_current_favs_file']
+
+        def blocked(cls, filename):
+            reading.set()
+            gate.wait(5)
+            return load.__func__(cls, filename)
+
+        favorites.FavFileMgr.load_current_favs_file = classmethod(blocked)
+        results = []
+        try:
+            thread = threading.Thread(target=lambda: results.append(favs.load(win_id=self.windows[1])))
+            thread.start()
+            self.assertTrue(reading.wait(5))
+            start = time.time()
+            self.assertEqual(favs.file_for_window(self.windows[1]), os.path.join(self.tempdir, 'b-favs.json'))
+            self.assertEqual(favs.group_count(), 0)
+            self.assertEqual([f[1] for f in favs.all_files()], ['/a'])
+            self.assertFalse(favs.toggle_per_projects(self.windows[0]))
+            self.assertLess(time.time() - start, 1)
+        finally:
+            gate.set()
+            favorites.FavFileMgr.load_current_favs_file = load
+        thread.join(5)
+        self.assertEqual(results, [False])
+        self.assertEqual([f[1] for f in favs.all_files()], ['/b'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Test shared file helpers."""
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from . import util
+
+filelock = util.load_module('lib.filelock')
+
+
+class TestSaveFile(unittest.TestCase):
+    """Test saving files."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_save(self):
+        """Test that the folder is created and no temporary file is left behind."""
+
+        filename = os.path.join(self.tempdir, 'folder', 'state.json')
+        self.assertTrue(filelock.save_file(filename, '{}'))
+        self.assertTrue(filelock.save_file(filename, '[]'))
+        with open(filename) as f:
+            self.assertEqual(f.read(), '[]')
+        self.assertEqual(os.listdir(os.path.dirname(filename)), ['state.json'])
+        self.assertEqual(filelock.path_version(filename), filelock.file_version(os.stat(filename)))
+
+    def test_failed(self):
+        """Test that a failed save is reported and cleaned up."""
+
+        filename = os.path.join(self.tempdir, 'state.json')
+        os.mkdir(filename)
+        self.assertFalse(filelock.save_file(filename, '{}'))
+        self.assertEqual(os.listdir(self.tempdir), ['state.json'])
+        self.assertIsNone(filelock.path_version(os.path.join(self.tempdir, 'missing.json')))
+
+    def test_lock_folder(self):
+        """Test that lock files are kept in the lock folder, not beside the file."""
+
+        if filelock.fcntl is None:
+            self.skipTest("No advisory file locks")
+        folder = os.path.join(self.tempdir, 'locks')
+        filelock.set_lock_folder(folder)
+        self.addCleanup(filelock.set_lock_folder, None)
+        filename = os.path.join(self.tempdir, 'project', 'project-favs.json')
+        with filelock.locked(filename):
+            pass
+        self.assertEqual(os.listdir(self.tempdir), ['locks'])
+        self.assertEqual(os.listdir(folder), [os.path.basename(filelock.lock_file(filename))])
+        self.assertNotEqual(filelock.lock_file(filename), filelock.lock_file(filename + '.other'))
+
+    def test_temp_name(self):
+        """Test that temporary names are unique to the process and thread."""
+
+        expected = 'list.json.%d.%d.tmp' % (os.getpid(), threading.current_thread().ident)
+        self.assertEqual(filelock.temp_name('list.json'), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
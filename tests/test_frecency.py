@@ -0,0 +1,95 @@
+"""Test the frecency index."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestFrecency(unittest.TestCase):
+    """Test frecency."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.frecency = util.load_module('lib.frecency')
+        self.filename = os.path.join(self.tempdir, 'frecency.json')
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def test_decay(self):
+        """Test that recent opens outweigh older ones."""
+
+        index = self.frecency.FrecencyIndex(self.filename, half_life=10, flush_delay=0)
+        for _ in range(3):
+            index.record('files', 'old', now=0)
+        index.record('files', 'new', now=30)
+        self.assertAlmostEqual(index.score('files', 'old', now=30), 3 / 8.0)
+        self.assertAlmostEqual(index.score('files', 'new', now=30), 1.0)
+        self.assertEqual(index.best('files'), ['new', 'old'])
+
+        # Two more opens of "old" bring it back to the top
+        index.record('files', 'old', now=30)
+        self.assertEqual(index.best('files'), ['old', 'new'])
+
+    def test_top_k(self):
+        """Test that only the best entries are kept in order."""
+
+        index = self.frecency.FrecencyIndex(self.filename, top_k=3, flush_delay=0)
+        for i in range(6):
+            for _ in range(i + 1):
+                index.record('files', str(i), now=0)
+        self.assertEqual(index.best('files'), ['5', '4', '3'])
+
+        rows = [[str(i), str(i)] for i in range(6)]
+        self.assertEqual(
+            [r[1] for r in index.rank('files', rows, lambda r: r[1])],
+            ['5', '4', '3', '0', '1', '2']
+        )
+
+    def test_persist(self):
+        """Test that scores are flushed in the background and loaded again."""
+
+        index = self.frecency.FrecencyIndex(self.filename, flush_delay=0)
+        index.record('groups', 'group', now=0)
+        index.record('files', 'a', now=0)
+        self.sublime.flush_async()
+        self.assertTrue(os.path.exists(self.filename))
+
+        index = self.frecency.FrecencyIndex(self.filename)
+        self.assertEqual(index.best('groups'), ['group'])
+        self.assertAlmostEqual(index.score('files', 'a', now=0), 1.0)
+
+    def test_open_panel(self):
+        """Test that the open panel lists the most used file first."""
+
+        files = []
+        for name in ('a.txt', 'b.txt'):
+            path = os.path.join(self.tempdir, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            files.append(path)
+        util.write_favorites(
+            os.path.join(self.tempdir, 'User', 'favorite_files_list.json'),
+            {"version": 2, "files": [{"file": f, "alias": os.path.basename(f)} for f in files], "groups": {}}
+        )
+        self.sublime.load_settings("favorite_files.sublime-settings").set("enable_frecency", True)
+        self.plugin.Frecency.flush_delay = 0
+        window = self.sublime.create_window()
+
+        self.plugin.FavoriteFilesOpenCommand(window).run()
+        self.sublime.flush_async()
+        window.select(1)
+        self.plugin.FavoriteFilesOpenCommand(window).run()
+        self.sublime.flush_async()
+        self.assertEqual([row[1] for row in window.quick_panel.items], [files[1], files[0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""Test importing favorites in bulk."""
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from . import util
+
+
+class TestImporter(unittest.TestCase):
+    """Test importing favorites in bulk."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.importer = util.load_module('lib.importer')
+        self.favorites = util.load_module('favorites')
+        self.list_file = os.path.join(self.tempdir, 'User', 'favorite_files_list.json')
+        self.files = []
+        for name in ('a.txt', 'b.txt', 'c.txt'):
+            path = os.path.join(self.tempdir, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            self.files.append(path)
+        self.window = self.sublime.create_window()
+
+        # Count the writes of the favorites list
+        self.writes = []
+        self.write_favs_file = self.favorites.FavFileMgr.__dict__['write_favs_file']
+        write = self.favorites.FavFileMgr.write_favs_file
+
+        def counted(cls, filename, data):
+            self.writes.append(filename)
+            return write(filename, data)
+
+        self.favorites.FavFileMgr.write_favs_file = classmethod(counted)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.favorites.FavFileMgr.write_favs_file = self.write_favs_file
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def shown(self, kind):
+        """Return the messages of the given kind."""
+
+        return [msg for k, msg in self.sublime.messages if k == kind]
+
+    def path_list(self, *paths):
+        """Write a path list file and return its name."""
+
+        filename = os.path.join(self.tempdir, 'paths.txt')
+        with open(filename, 'w') as f:
+            f.write('# Favorites\n' + '\n'.join(paths) + '\n')
+        return filename
+
+    def run_import(self, **kwargs):
+        """Run the import command and wait for it to finish."""
+
+        command = self.plugin.FavoriteFilesImportCommand(self.window)
+        command.run(**kwargs)
+        command.worker.join(5)
+        self.sublime.flush_async()
+
+    def test_job(self):
+        """Test de-duplicating paths and counting missing files."""
+
+        missing = os.path.join(self.tempdir, 'missing.txt')
+        paths = [self.files[0], self.files[1], self.files[1], missing, self.files[2]]
+        job = self.importer.ImportJob(iter(paths), existing=[self.files[0]], batch_size=2)
+        progress = []
+        self.assertEqual(job.collect(lambda checked, found: progress.append((checked, found))), self.files[1:])
+        self.assertEqual((job.checked, job.duplicates, job.missing), (3, 2, 1))
+        self.assertEqual(progress, [(2, 1), (3, 2)])
+        self.assertEqual(len(job.fingerprints), 2)
+
+    def test_single_write(self):
+        """Test that the imported favorites are saved with one write."""
+
+        self.plugin.Favs.set(self.files[0])
+        del self.writes[:]
+        job = self.importer.import_favorites(self.plugin.Favs, iter(self.files), group_name='imported')
+        self.assertEqual(job.duplicates, 0)
+        self.assertEqual([f[1] for f in self.plugin.Favs.all_files('imported')], self.files)
+        self.assertEqual(self.writes, [self.list_file])
+
+    def test_cancelled(self):
+        """Test that a cancelled import adds nothing."""
+
+        job = self.importer.ImportJob(iter(self.files))
+        job.cancel()
+        self.assertEqual(job.collect(), [])
+        self.assertTrue(job.cancelled)
+        self.assertEqual(job.commit(self.plugin.Favs), 0)
+        self.assertEqual(self.writes, [])
+
+    def test_command(self):
+        """Test importing from a path list with the command."""
+
+        self.plugin.Favs.set(self.files[0])
+        del self.writes[:]
+        source = self.path_list(self.files[0], self.files[1], os.path.join(self.tempdir, 'missing.txt'))
+        self.run_import(source=source, mode='list')
+        self.assertEqual([f[1] for f in self.plugin.Favs.all_files()], self.files[:2])
+        self.assertEqual(self.writes, [self.list_file])
+        self.assertEqual(self.shown('status')[-1], 'Imported 1 favorite(s).')
+        self.assertEqual(self.shown('error'), ['FavoriteFiles:\n1 file(s) do not exist on disk!'])
+
+    def test_command_load_failed(self):
+        """Test that the import is cancelled without a report when the list cannot be read."""
+
+        self.plugin.Favs.set(self.files[0])
+        with open(self.list_file, 'w') as f:
+            f.write('{')
+        os.utime(self.list_file, (0, 0))
+        del self.sublime.messages[:]
+        self.run_import(source=self.path_list(self.files[1]), mode='list')
+        self.assertNotIn('Imported 0 favorite(s).', self.shown('status'))
+        self.assertIsNone(self.plugin.FavoriteFilesImportCommand.job)
+
+    def test_command_invalid(self):
+        """Test that a source that cannot be decoded or has invalid paths fails the import, and others can start."""
+
+        source = os.path.join(self.tempdir, 'paths.txt')
+        with open(source, 'wb') as f:
+            f.write(b'\xff\xfe\xfa\n')
+        self.run_import(source=source, mode='list')
+        self.run_import(source=self.path_list(self.files[0] + '\0'), mode='list')
+        self.assertEqual(len(self.shown('error')), 2)
+        failed = 'FavoriteFiles:\nFailed to import favorites!'
+        self.assertTrue(all(msg.startswith(failed) for msg in self.shown('error')))
+
+        self.run_import(source=self.path_list(self.files[0]), mode='list')
+        self.assertEqual(self.shown('status')[-1], 'Imported 1 favorite(s).')
+
+    def test_command_background(self):
+        """Test that other commands are not held up by an import."""
+
+        gate = threading.Event()
+
+        def paths():
+            gate.wait(5)
+            yield self.files[0]
+
+        self.plugin.Favs.set(self.files[1])
+        command = self.plugin.FavoriteFilesImportCommand(self.window)
+        command.group_name = None
+        original = self.plugin.iter_import_paths
+        self.plugin.iter_import_paths = lambda source, mode: paths()
+        try:
+            command.start('source', 'list')
+        finally:
+            self.plugin.iter_import_paths = original
+        try:
+            self.plugin.FavoriteFilesOpenCommand(self.window).run()
+            self.sublime.flush_async()
+            self.assertIsNotNone(self.window.quick_panel)
+        finally:
+            gate.set()
+        command.worker.join(5)
+        self.sublime.flush_async()
+        self.assertEqual(self.shown('status')[-1], 'Imported 1 favorite(s).')
+
+
+if __name__ == "__main__":
+    unittest.main()
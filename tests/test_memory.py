@@ -0,0 +1,110 @@
+"""
+Test memory use of loading favorites at scale.
+
+Peak and retained memory of each loading phase is measured with `tracemalloc` and
+divided by the number of entries in the list. A phase fails if it exceeds its per entry
+budget (in bytes).
+
+Sizes and budgets can be changed with environment variables:
+
+- `FAVORITE_FILES_MEMORY_SIZES`: space separated list sizes, e.g. `1000 100000`.
+- `FAVORITE_FILES_MEMORY_BUDGETS`: JSON object overriding budgets, e.g. `{"json.loads": {"peak": 600}}`.
+"""
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+from . import util
+
+favorites = util.load_module('favorites')
+file_strip = util.load_module('lib.file_strip.json')
+
+SIZES = [int(x) for x in os.environ.get('FAVORITE_FILES_MEMORY_SIZES', '1000 10000').split()]
+
+# Per entry budgets in bytes, about a third above what was measured when they were set
+BUDGETS = {
+    "read": {"peak": 350, "retained": 200},
+    "sanitize_json": {"peak": 1200, "retained": 200},
+    "json.loads": {"peak": 460, "retained": 460},
+    "load": {"peak": 1350, "retained": 460},
+    "panel rows": {"peak": 100, "retained": 100}
+}
+for _phase, _budget in json.loads(os.environ.get('FAVORITE_FILES_MEMORY_BUDGETS', '{}')).items():
+    BUDGETS.setdefault(_phase, {}).update(_budget)
+
+
+def measure(fn):
+    """Call `fn` and return its result with the peak and retained memory it allocated."""
+
+    tracemalloc.start()
+    try:
+        result = fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, retained
+
+
+class TestMemory(unittest.TestCase):
+    """Test memory budgets for loading favorites."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def check(self, phase, size, peak, retained):
+        """Check a phase against its budget."""
+
+        for kind, value in (("peak", peak), ("retained", retained)):
+            per_entry = value / float(size)
+            self.assertLessEqual(
+                per_entry,
+                BUDGETS[phase][kind],
+                "%s: %s memory of %.1f bytes per entry exceeds budget of %d bytes (%d entries)" % (
+                    phase, kind, per_entry, BUDGETS[phase][kind], size
+                )
+            )
+
+    def test_budgets(self):
+        """Test each loading phase at increasing sizes."""
+
+        for size in SIZES:
+            # 90% of the entries in the global list and the rest in groups of 10
+            data = util.make_favorites(size - size // 10, groups=size // 100, group_size=10)
+            filename = os.path.join(self.tempdir, 'favorite_files_list%d.json' % size)
+            util.write_favorites(filename, data)
+            del data
+
+            def read():
+                with open(filename) as f:
+                    return f.read()
+
+            text, peak, retained = measure(read)
+            self.check("read", size, peak, retained)
+
+            content, peak, retained = measure(lambda text=text: file_strip.sanitize_json(text, True))
+            self.check("sanitize_json", size, peak, retained)
+            del text
+
+            data, peak, retained = measure(lambda content=content: json.loads(content))
+            self.check("json.loads", size, peak, retained)
+            del content, data
+
+            favs, peak, retained = measure(lambda: favorites.Favorites(filename))
+            self.check("load", size, peak, retained)
+
+            rows, peak, retained = measure(lambda favs=favs: (favs.all_files(), favs.all_groups()))
+            self.check("panel rows", size, peak, retained)
+            del favs, rows
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Test merging of concurrent saves."""
+import unittest
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from . import util
+
+merge = util.load_module('lib.merge')
+
+PROCESSES = 8
+SAVES = 10
+
+
+def entry(path, alias=None):
+    """Return a favorites entry."""
+
+    return {"file": path, "alias": alias or os.path.basename(path)}
+
+
+def writer(list_file, worker, start):
+    """Add files to the list, saving after each one without reloading."""
+
+    favorites = util.load_module('favorites')
+    favs = favorites.Favorites(list_file)
+    start.wait()
+    for i in range(SAVES):
+        favs.set('/worker%d/file%d.txt' % (worker, i))
+        favs.set('/group%d/file%d.txt' % (worker, i), group_name='group')
+        favs.save(True)
+
+
+class TestMerge(unittest.TestCase):
+    """Test the three-way merge."""
+
+    def test_entries(self):
+        """Test merging entries changed on each side."""
+
+        base = {"version": 2, "files": [entry('/a'), entry('/b'), entry('/c')], "groups": {}}
+        local = {"version": 2, "files": [entry('/a', 'A'), entry('/c'), entry('/d')], "groups": {}}
+        remote = {"version": 2, "files": [entry('/b'), entry('/c', 'C'), entry('/e')], "groups": {}}
+        merged = merge.merge_file_lists(base, local, remote)
+        # "/a" was removed on disk but changed locally, so the change is kept
+        self.assertEqual(merged["files"], [entry('/c', 'C'), entry('/e'), entry('/a', 'A'), entry('/d')])
+
+    def test_conflict(self):
+        """Test that local changes win over changes on disk."""
+
+        base = {"version": 2, "files": [entry('/a')], "groups": {}}
+        local = {"version": 2, "files": [entry('/a', 'local')], "groups": {}}
+        remote = {"version": 2, "files": [entry('/a', 'remote')], "groups": {}}
+        self.assertEqual(merge.merge_file_lists(base, local, remote)["files"], [entry('/a', 'local')])
+
+    def test_groups(self):
+        """Test merging groups."""
+
+        base = {"version": 2, "files": [], "groups": {"old": [entry('/a')], "kept": [entry('/b')]}}
+        local = {"version": 2, "files": [], "groups": {"kept": [entry('/b'), entry('/c')], "new": []}}
+        remote = {
+            "version": 2, "files": [], "groups": {"old": [entry('/a')], "kept": [entry('/d')]},
+            "rules": [{"rule": "*.py", "alias": "py"}]
+        }
+        merged = merge.merge_file_lists(base, local, remote)
+        self.assertEqual(merged["groups"], {"kept": [entry('/d'), entry('/c')], "new": []})
+        self.assertEqual(merged["rules"], remote["rules"])
+
+
+class TestConcurrentSaves(unittest.TestCase):
+    """Test saving the same list from several processes."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.tempdir, 'favorite_files_list.json')
+        util.write_favorites(self.list_file, {"version": 2, "files": [], "groups": {"group": []}})
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_processes(self):
+        """Test that no process loses another one's changes."""
+
+        ctx = multiprocessing.get_context('spawn')
+        start = ctx.Event()
+        processes = [ctx.Process(target=writer, args=(self.list_file, i, start)) for i in range(PROCESSES)]
+        for p in processes:
+            p.start()
+        start.set()
+        for p in processes:
+            p.join(60)
+            self.assertEqual(p.exitcode, 0)
+
+        with open(self.list_file) as f:
+            data = json.load(f)
+        expected = set('/worker%d/file%d.txt' % (w, i) for w in range(PROCESSES) for i in range(SAVES))
+        self.assertEqual(set(e['file'] for e in data['files']), expected)
+        self.assertEqual(len(data['files']), len(expected))
+        self.assertEqual(len(data['groups']['group']), PROCESSES * SAVES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Test metrics."""
+import unittest
+from . import util
+
+metrics = util.load_module('lib.metrics')
+
+
+class TestMetrics(unittest.TestCase):
+    """Test the metrics registry."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.registry = metrics.MetricsRegistry()
+
+    def test_disabled(self):
+        """Test that nothing is recorded when disabled."""
+
+        @self.registry.timed('fn')
+        def fn():
+            return 1
+
+        self.assertEqual(fn(), 1)
+        self.registry.incr('count')
+        with self.registry.timer('block'):
+            pass
+        self.assertEqual(self.registry.summary(), {"counters": {}, "latency": {}})
+
+    def test_enabled(self):
+        """Test recording counters and latencies."""
+
+        self.registry.enabled = True
+
+        @self.registry.timed('fn')
+        def fn():
+            return 1
+
+        for _ in range(10):
+            fn()
+        self.registry.incr('count', 2)
+        summary = self.registry.summary()
+        self.assertEqual(summary["counters"], {"count": 2})
+        self.assertEqual(summary["latency"]["fn"]["count"], 10)
+        self.assertIn("fn: n=10", self.registry.format_summary())
+
+    def test_percentile(self):
+        """Test percentiles."""
+
+        histogram = metrics.Histogram()
+        for value in range(1, 101):
+            histogram.add(value)
+        self.assertEqual(histogram.percentile(50), 50)
+        self.assertEqual(histogram.percentile(99), 99)
+        self.assertEqual(histogram.percentile(100), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
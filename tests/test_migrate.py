@@ -0,0 +1,160 @@
+"""Test favorites list migrations."""
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from . import util
+
+migrate = util.load_module('lib.migrate')
+favorites = util.load_module('favorites')
+
+
+class Interrupted(Exception):
+    """Simulated crash."""
+
+
+def make_v1(groups, group_size):
+    """Return a version 1 list."""
+
+    return {
+        "version": 1,
+        "files": ['/files/%d.txt' % i for i in range(group_size)],
+        "groups": dict(
+            ('group%03d' % g, ['/group%d/%d.txt' % (g, i) for i in range(group_size)]) for g in range(groups)
+        )
+    }
+
+
+def make_v2(data):
+    """Return the expected version 2 list."""
+
+    def entries(files):
+        return [{"file": f, "alias": os.path.basename(f)} for f in files]
+
+    return {
+        "version": 2,
+        "files": entries(data["files"]),
+        "groups": dict((k, entries(v)) for k, v in data["groups"].items())
+    }
+
+
+class TestMigrate(unittest.TestCase):
+    """Test migrations."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.list_file = os.path.join(self.tempdir, 'favorite_files_list.json')
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def write(self, data):
+        """Write a list and return it with its fingerprint."""
+
+        util.write_favorites(self.list_file, data)
+        return favorites.FavFileMgr.load_favs_file(self.list_file)[::2]
+
+    def read_text(self):
+        """Read the list."""
+
+        with open(self.list_file) as f:
+            return f.read()
+
+    def test_format(self):
+        """Test that the migrated list is written like a saved list."""
+
+        for groups in (0, 3):
+            v1 = make_v1(groups, 2)
+            data, fp = self.write(v1)
+            self.assertEqual(migrate.migrate(self.list_file, data, fp), 2)
+            self.assertEqual(
+                self.read_text(),
+                json.dumps(make_v2(v1), sort_keys=True, indent=4, separators=(',', ': '))
+            )
+
+    def test_resume(self):
+        """Test that an interrupted migration resumes from its checkpoint."""
+
+        v1 = make_v1(10, 3)
+        data, fp = self.write(v1)
+        original = self.read_text()
+
+        def crash(done, total):
+            raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            migrate.migrate(self.list_file, data, fp, checkpoint_every=4, progress=crash)
+        self.assertEqual(self.read_text(), original)
+        self.assertTrue(os.path.exists(self.list_file + migrate.CHECKPOINT_SUFFIX))
+
+        seen = []
+        data, fp = favorites.FavFileMgr.load_favs_file(self.list_file)[::2]
+        self.assertEqual(
+            migrate.migrate(self.list_file, data, fp, checkpoint_every=4, progress=lambda d, t: seen.append(d)), 2
+        )
+        # The first four groups were not written again
+        self.assertEqual(seen, [8])
+        self.assertEqual(json.loads(self.read_text()), make_v2(v1))
+        self.assertEqual([f for f in os.listdir(self.tempdir) if '.migrate' in f], [])
+
+    def test_changed(self):
+        """Test that a list saved by someone else during the migration is kept."""
+
+        data, fp = self.write(make_v1(1, 1))
+        util.write_favorites(self.list_file, {"version": 2, "files": [], "groups": {}})
+        self.assertIsNone(migrate.migrate(self.list_file, data, fp))
+        self.assertEqual(json.loads(self.read_text())["files"], [])
+
+    def test_locked(self):
+        """Test that the list is locked for the whole migration."""
+
+        filelock = util.load_module('lib.filelock')
+        fcntl = filelock.fcntl
+        if fcntl is None:
+            self.skipTest("No advisory file locks")
+        data, fp = self.write(make_v1(10, 1))
+        held = []
+
+        def check(done, total):
+            with open(filelock.lock_file(self.list_file), 'a') as f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    held.append(done)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+        self.assertEqual(migrate.migrate(self.list_file, data, fp, checkpoint_every=4, progress=check), 2)
+        self.assertEqual(held, [4, 8])
+
+    def test_load_changing(self):
+        """Test that loading fails if the list keeps changing before it is migrated."""
+
+        self.write(make_v1(1, 1))
+        calls = []
+        original = favorites.migrate
+        favorites.migrate = lambda *args: calls.append(args) and None
+        try:
+            with self.assertRaises(RuntimeError):
+                favorites.FavFileMgr.load_current_favs_file(self.list_file)
+        finally:
+            favorites.migrate = original
+        self.assertEqual(len(calls), 3)
+
+    def test_load(self):
+        """Test that loading a version 1 list migrates it."""
+
+        v1 = make_v1(2, 2)
+        self.write(v1)
+        favs = favorites.Favorites(self.list_file)
+        self.assertEqual(favs.snapshot(), make_v2(v1))
+        self.assertEqual(json.loads(self.read_text())["version"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Test batched and rate limited notifications."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestNotify(unittest.TestCase):
+    """Test notifications."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.notify = util.load_module('lib.notify')
+        self.window = self.sublime.create_window()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def shown(self, kind='error'):
+        """Return the messages of the given kind."""
+
+        return [msg for k, msg in self.sublime.messages if k == kind]
+
+    def test_batch(self):
+        """Test that errors in a batch are shown once."""
+
+        with self.notify.batch():
+            with self.notify.batch():
+                self.notify.error("first")
+            self.notify.error("second")
+            self.notify.error("second")
+            self.assertEqual(self.shown(), [])
+        self.assertEqual(self.shown(), ["FavoriteFiles:\n3 errors:\n\nfirst\n\nsecond (x2)"])
+
+    def test_command_batch(self):
+        """Test that a command's errors and those of its background task are shown once the task is done."""
+
+        @self.notify.batched
+        def command():
+            self.notify.error("first")
+            self.plugin.Tasks.submit(
+                'key', lambda: self.notify.error("second"), lambda result: self.notify.error("third")
+            )
+
+        command()
+        self.assertEqual(self.shown(), [])
+        self.sublime.flush_async()
+        self.assertEqual(self.shown(), ["FavoriteFiles:\n3 errors:\n\nfirst\n\nsecond\n\nthird"])
+
+    def test_summary_limit(self):
+        """Test that long summaries are truncated."""
+
+        summary = self.notify.summarize(["error %d" % i for i in range(self.notify.MAX_SUMMARY + 5)])
+        self.assertTrue(summary.endswith("...and 5 more (see console)"))
+
+    def test_rate_limit(self):
+        """Test that repeated errors are sent to the status bar."""
+
+        self.notify.error("repeated")
+        self.notify.error("repeated")
+        self.notify.error("other")
+        self.assertEqual(self.shown(), ["FavoriteFiles:\nrepeated", "FavoriteFiles:\nother"])
+        self.assertEqual(self.shown('status'), ["FavoriteFiles: repeated"])
+
+    def test_no_dialogs(self):
+        """Test the output panel fallback."""
+
+        self.sublime.load_settings("favorite_files.sublime-settings").set("error_dialogs", False)
+        self.notify.error("no dialog\ndetails")
+        self.assertEqual(self.shown(), [])
+        self.assertEqual(self.shown('status'), ["FavoriteFiles: no dialog"])
+        self.assertEqual(self.window.find_output_panel('favorite_files').text, "FavoriteFiles: no dialog\ndetails\n")
+
+    def test_open_missing(self):
+        """Test that opening several missing files shows one error."""
+
+        missing = [os.path.join(self.tempdir, name) for name in ('x.txt', 'y.txt')]
+        self.plugin.FavoriteFilesOpenCommand(self.window).open_names(missing)
+        self.assertEqual(len(self.shown()), 1)
+        self.assertIn("2 errors", self.shown()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
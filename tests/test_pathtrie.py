@@ -0,0 +1,113 @@
+"""Test the path trie."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestPathTrie(unittest.TestCase):
+    """Test the path trie."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.pathtrie = util.load_module('lib.pathtrie')
+        self.list_file = os.path.join(self.tempdir, 'User', 'favorite_files_list.json')
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def test_trie(self):
+        """Test finding, adding, and removing favorites by folder."""
+
+        trie = self.pathtrie.PathTrie.from_file_list({
+            "files": [{"file": "/repo/a/1.txt"}, {"file": "/repo/b/2.txt"}],
+            "groups": {"g": [{"file": "/repo/a/1.txt"}, {"file": "/other/3.txt"}]}
+        })
+        self.assertEqual(
+            sorted((g or '', e['file']) for g, e in trie.under('/repo/a/')),
+            [('', '/repo/a/1.txt'), ('g', '/repo/a/1.txt')]
+        )
+        self.assertEqual(len(trie.under('/')), 4)
+        self.assertEqual(trie.under('/repo/c'), [])
+        # Only whole components match
+        self.assertEqual(trie.under('/rep'), [])
+
+        trie.discard(None, '/repo/a/1.txt')
+        trie.discard('g', '/repo/a/1.txt')
+        trie.discard('g', '/repo/a/missing.txt')
+        self.assertEqual(trie.under('/repo/a'), [])
+        self.assertNotIn('a', trie.root.children[''].children['repo'].children)
+        self.assertEqual(len(trie.under('/repo')), 1)
+
+    def test_favorites(self):
+        """Test that the trie follows changes to the list."""
+
+        favs = self.plugin.Favs
+        favs.set('/repo/a.txt')
+        favs.add_group('g')
+        favs.set('/repo/b.txt', group_name='g')
+        self.assertEqual(
+            favs.files_under('/repo'),
+            [['a.txt', '/repo/a.txt', None], ['b.txt', '/repo/b.txt', 'g']]
+        )
+
+        # Once built, the trie is queried under the read lock
+        writes = []
+        write = favs.obj.lock.write
+        favs.obj.lock.write = lambda: writes.append(True) or write()
+        try:
+            self.assertEqual(len(favs.files_under('/repo')), 2)
+        finally:
+            del favs.obj.lock.write
+        self.assertEqual(writes, [])
+
+        with favs.transaction():
+            favs.remove('/repo/a.txt')
+            favs.set('/repo/c.txt', group_name='g')
+        self.assertEqual([row[1] for row in favs.files_under('/repo')], ['/repo/b.txt', '/repo/c.txt'])
+
+        # Replacing the group drops its entries
+        favs.add_group('g')
+        self.assertEqual(favs.files_under('/repo'), [])
+
+        # Changes saved by someone else
+        util.write_favorites(
+            self.list_file,
+            {"version": 2, "files": [{"file": "/repo/d.txt", "alias": "d"}], "groups": {}}
+        )
+        os.utime(self.list_file, (0, 0))
+        self.assertFalse(favs.load())
+        self.assertEqual(favs.files_under('/repo'), [['d', '/repo/d.txt', None]])
+
+    def test_command(self):
+        """Test opening a favorite from the side bar folder."""
+
+        folder = os.path.join(self.tempdir, 'project')
+        os.makedirs(folder)
+        path = os.path.join(folder, 'a.txt')
+        with open(path, 'w') as f:
+            f.write('a')
+        with self.plugin.Favs.transaction():
+            self.plugin.Favs.set(path)
+            self.plugin.Favs.set('/elsewhere/b.txt')
+        window = self.sublime.create_window()
+
+        command = self.plugin.FavoriteFilesOpenInFolderCommand(window)
+        self.assertFalse(command.is_enabled())
+        self.assertFalse(command.is_visible(paths=[path]))
+        command.run(paths=[folder])
+        self.sublime.flush_async()
+        self.assertEqual(window.quick_panel.items, [['a.txt', path, 'Global']])
+        window.select(0)
+        self.assertEqual(window.active_view().file_name(), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Test page cache prefetching."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestPrefetch(unittest.TestCase):
+    """Test prefetching."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.prefetch = util.load_module('lib.prefetch')
+        self.advised = []
+        self.files = []
+        for i in range(5):
+            path = os.path.join(self.tempdir, '%d.txt' % i)
+            with open(path, 'w') as f:
+                f.write('x' * 100)
+            self.files.append(path)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def prefetcher(self):
+        """Return a prefetcher with one worker that records what it prefetches."""
+
+        return self.prefetch.Prefetcher(max_workers=1, advise=lambda p, n: self.advised.append((p, n)))
+
+    def wait(self, prefetcher):
+        """Wait for the prefetcher to finish."""
+
+        if prefetcher.executor is not None:
+            prefetcher.executor.shutdown(wait=True)
+            prefetcher.executor = None
+
+    def test_budget(self):
+        """Test that prefetching stops at the budget and skips files already prefetched."""
+
+        prefetcher = self.prefetcher()
+        prefetcher.reset(250)
+        prefetcher.prefetch(self.files[:2])
+        prefetcher.prefetch(self.files[1:4])
+        self.wait(prefetcher)
+        self.assertEqual(sum(n for _, n in self.advised), 250)
+        self.assertEqual([n for _, n in self.advised][-1], 50)
+        self.assertEqual(len(set(p for p, _ in self.advised)), 3)
+
+    def test_advise(self):
+        """Test prefetching a real file."""
+
+        self.prefetch.advise(self.files[0], 100)
+        with self.assertRaises(OSError):
+            self.prefetch.advise(os.path.join(self.tempdir, 'missing.txt'), 100)
+
+    def test_open_panel(self):
+        """Test that the highlighted favorite is prefetched before its neighbours."""
+
+        util.write_favorites(
+            os.path.join(self.tempdir, 'User', 'favorite_files_list.json'),
+            {"version": 2, "files": [{"file": f, "alias": os.path.basename(f)} for f in self.files], "groups": {}}
+        )
+        window = self.sublime.create_window()
+        prefetcher = self.prefetcher()
+        self.plugin.Prefetch = prefetcher
+
+        # Disabled by default
+        self.plugin.FavoriteFilesOpenCommand(window).run()
+        self.sublime.flush_async()
+        window.highlight(2)
+        self.wait(prefetcher)
+        self.assertEqual(self.advised, [])
+
+        self.sublime.load_settings("favorite_files.sublime-settings").set("enable_prefetch", True)
+        self.plugin.FavoriteFilesOpenCommand(window).run()
+        self.sublime.flush_async()
+        self.wait(prefetcher)
+        self.assertEqual([p for p, _ in self.advised], [self.files[0], self.files[1]])
+
+        del self.advised[:]
+        window.highlight(3)
+        self.wait(prefetcher)
+        self.assertEqual([p for p, _ in self.advised], [self.files[3], self.files[4], self.files[2]])
+
+
+if __name__ == "__main__":
+    unittest.main()
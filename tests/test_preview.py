@@ -0,0 +1,117 @@
+"""Test the highlight preview."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestPreview(unittest.TestCase):
+    """Test previews."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.preview = util.load_module('lib.preview')
+        self.files = []
+        for i in range(3):
+            path = os.path.join(self.tempdir, '%d.txt' % i)
+            with open(path, 'w') as f:
+                f.write('%d\n' % i * 100)
+            self.files.append(path)
+        util.write_favorites(
+            os.path.join(self.tempdir, 'User', 'favorite_files_list.json'),
+            {"version": 2, "files": [{"file": f, "alias": os.path.basename(f)} for f in self.files], "groups": {}}
+        )
+        self.sublime.load_settings("favorite_files.sublime-settings").set("preview_on_highlight", True)
+        self.window = self.sublime.create_window()
+        self.original = self.window.new_file()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def show_panel(self):
+        """Show the open panel."""
+
+        self.plugin.FavoriteFilesOpenCommand(self.window).run()
+        self.sublime.flush_async()
+
+    def file_views(self):
+        """Return the files open in the window."""
+
+        return [v.file_name() for v in self.window.views() if v.file_name()]
+
+    def test_cancel(self):
+        """Test that the highlighted file is previewed and closed with the panel."""
+
+        self.show_panel()
+        self.assertEqual(self.file_views(), [self.files[0]])
+        self.window.highlight(2)
+        self.assertEqual(self.file_views(), [self.files[2]])
+        self.window.select(-1)
+        self.assertEqual(self.file_views(), [])
+        self.assertIs(self.window.active_view(), self.original)
+
+    def test_select(self):
+        """Test that the previewed file stays open when selected."""
+
+        self.show_panel()
+        self.window.highlight(1)
+        view = self.window.active_view()
+        self.window.select(1)
+        self.assertEqual(self.file_views(), [self.files[1]])
+        self.assertIs(self.window.find_open_file(self.files[1]), view)
+
+    def test_open_file_kept(self):
+        """Test that a file that was already open is not closed."""
+
+        self.window.open_file(self.files[0])
+        self.show_panel()
+        self.window.highlight(1)
+        self.window.select(-1)
+        self.assertEqual(self.file_views(), [self.files[0]])
+
+    def test_debounce(self):
+        """Test that only the highlight that settles is previewed."""
+
+        preview = self.preview.Preview(self.window)
+        preview.highlight(self.files[0])
+        preview.highlight(self.files[1])
+        self.assertEqual(self.file_views(), [])
+        self.sublime.run_main()
+        self.assertEqual(self.file_views(), [self.files[1]])
+
+    def test_large_file(self):
+        """Test that a large file shows only its head in a scratch view."""
+
+        preview = self.preview.Preview(self.window, max_size=100, head_size=50)
+        preview.highlight(self.files[1])
+        self.sublime.run_main()
+        view = self.window.active_view()
+        self.assertIsNone(view.file_name())
+        self.assertTrue(view.scratch and view.read_only)
+        self.assertTrue(view.text.startswith(('1\n' * 100)[:50] + '\n\n'))
+
+        preview.highlight(self.files[2])
+        self.sublime.run_main()
+        self.assertIs(self.window.active_view(), view)
+        self.assertTrue(view.text.startswith('2\n'))
+        preview.close()
+        self.assertTrue(view.closed)
+        self.assertIs(self.window.active_view(), self.original)
+
+    def test_read_head(self):
+        """Test reading the head of empty and short files."""
+
+        empty = os.path.join(self.tempdir, 'empty.txt')
+        open(empty, 'w').close()
+        self.assertEqual(self.preview.read_head(empty), '')
+        self.assertEqual(self.preview.read_head(self.files[0], 4), '0\n0\n')
+
+
+if __name__ == "__main__":
+    unittest.main()
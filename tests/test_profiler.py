@@ -0,0 +1,95 @@
+"""Test profiler."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+profiler = util.load_module('lib.profiler')
+tasks = util.load_module('lib.tasks')
+sublime = util.load_api('sublime')
+
+
+class TestProfiler(unittest.TestCase):
+    """Test profiling command invocations."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.profiler = profiler.profiler
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.profiler.disarm()
+        shutil.rmtree(self.tempdir)
+
+    def test_next_invocations(self):
+        """Test that only the next N invocations are profiled."""
+
+        @self.profiler.profiled('command')
+        def command():
+            return sum(range(1000))
+
+        self.profiler.arm(2, self.tempdir)
+        for _ in range(3):
+            self.assertEqual(command(), 499500)
+
+        summaries = self.profiler.summaries()
+        self.assertEqual(len(summaries), 2)
+        for summary in summaries:
+            self.assertTrue(os.path.exists(summary[:-4] + '.pstats'))
+            with open(summary) as f:
+                self.assertTrue(f.read().startswith('command'))
+
+    def test_background_task(self):
+        """Test that a capture includes the background tasks it started."""
+
+        scheduler = tasks.TaskScheduler()
+        done = []
+
+        def work():
+            return 'work'
+
+        @self.profiler.profiled('command')
+        def command():
+            scheduler.submit('key', work, done.append)
+
+        self.profiler.arm(1, self.tempdir)
+        command()
+        sublime.flush_async()
+        self.assertEqual(done, ['work'])
+        summaries = self.profiler.summaries()
+        self.assertEqual(len(summaries), 1)
+        with open(summaries[0]) as f:
+            self.assertIn('(work)', f.read())
+
+    def test_panels(self):
+        """Test that a capture stays open across the panels a command shows."""
+
+        panels = []
+
+        def answer(value):
+            return sum(range(value))
+
+        @self.profiler.profiled('command')
+        def command():
+            panels.append(self.profiler.bind(answer))
+            panels.append(self.profiler.bind_input(answer)[2])
+
+        self.profiler.arm(1, self.tempdir)
+        command()
+        self.assertEqual(self.profiler.summaries(), [])
+        self.assertEqual(panels[0](1000), 499500)
+        self.assertEqual(self.profiler.summaries(), [])
+        # Cancelling the input panel closes the capture
+        self.assertIsNone(panels[1]())
+        summaries = self.profiler.summaries()
+        self.assertEqual(len(summaries), 1)
+        with open(summaries[0]) as f:
+            self.assertIn('(answer)', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""Test the cross project index."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestProjectIndex(unittest.TestCase):
+    """Test the project index."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.projects = util.load_module('lib.projects')
+        self.reads = []
+
+        def reader(filename):
+            self.reads.append(filename)
+            return self.plugin.FavFileMgr.read_favs_file(filename)
+
+        self.registry = os.path.join(self.tempdir, 'User', 'FavoriteFiles', 'projects.json')
+        self.index = self.projects.ProjectIndex(self.registry, reader)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def make_project(self, name, files, groups=None):
+        """Create a project favorites file and a window for it."""
+
+        project = os.path.join(self.tempdir, name + '.sublime-project')
+        util.write_favorites(
+            self.projects.project_favs_file(project),
+            {
+                "version": 2,
+                "files": [{"file": f, "alias": os.path.basename(f)} for f in files],
+                "groups": groups or {}
+            }
+        )
+        return self.sublime.create_window(project_file_name=project)
+
+    def test_refresh(self):
+        """Test that only changed lists are read again."""
+
+        self.make_project('a', ['/a/1.txt'], {"g": [{"file": "/a/2.txt", "alias": "2"}]})
+        self.make_project('b', ['/b/1.txt'])
+        rows = self.index.refresh()
+        self.assertEqual(
+            rows,
+            [
+                ['1.txt', '/a/1.txt', 'Project: a'],
+                ['2', '/a/2.txt', 'Project: a, Group: g'],
+                ['1.txt', '/b/1.txt', 'Project: b']
+            ]
+        )
+        self.assertEqual(len(self.reads), 2)
+
+        del self.reads[:]
+        self.assertIs(self.index.refresh(), rows)
+        self.assertEqual(self.reads, [])
+
+        self.make_project('b', ['/b/1.txt', '/b/3.txt'])
+        self.assertEqual([r[1] for r in self.index.refresh()], ['/a/1.txt', '/a/2.txt', '/b/1.txt', '/b/3.txt'])
+        self.assertEqual([os.path.basename(f) for f in self.reads], ['b-favs.json'])
+
+    def test_registry(self):
+        """Test that projects are remembered after their windows close."""
+
+        self.make_project('a', ['/a/1.txt'])
+        self.index.refresh()
+        self.sublime.reset()
+        self.sublime.set_packages_path(self.tempdir)
+
+        index = self.projects.ProjectIndex(self.registry, self.plugin.FavFileMgr.read_favs_file)
+        self.assertEqual([r[1] for r in index.refresh()], ['/a/1.txt'])
+
+        os.remove(os.path.join(self.tempdir, 'a-favs.json'))
+        self.assertEqual(index.refresh(), [])
+        self.assertEqual(index.known, set())
+
+    def test_command(self):
+        """Test opening a file from another project."""
+
+        path = os.path.join(self.tempdir, 'other.txt')
+        with open(path, 'w') as f:
+            f.write('other')
+        self.make_project('a', [path])
+        window = self.sublime.create_window()
+        self.plugin.FavoriteFilesOpenAnyProjectCommand(window).run()
+        self.sublime.flush_async()
+        window.select(0)
+        self.assertEqual(window.active_view().file_name(), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Test relocation of moved favorites."""
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestRelocate(unittest.TestCase):
+    """Test relocation."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.root = os.path.join(self.tempdir, 'root')
+        self.repo = os.path.join(self.root, 'repo')
+        os.makedirs(os.path.join(self.repo, 'src'))
+        self.files = []
+        for name in ('a.txt', os.path.join('src', 'b.txt'), 'c.txt'):
+            path = os.path.join(self.repo, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            self.files.append(path)
+
+        self.list_file = os.path.join(self.tempdir, 'User', 'favorite_files_list.json')
+        self.favs = self.plugin.Favorites(self.list_file)
+        self.favs.open()
+        self.favs.add_group('group')
+        self.favs.add_group('gone')
+        self.favs.set(self.files[0])
+        self.favs.set(self.files[1], group_name='group')
+        self.favs.set(self.files[2], group_name='gone')
+        self.favs.save(True)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        shutil.rmtree(self.tempdir)
+
+    def saved(self):
+        """Return the saved favorites list."""
+
+        with open(self.list_file) as f:
+            return json.load(f)
+
+    def test_relocate(self):
+        """Test that moved files are updated and deleted files are dropped."""
+
+        self.sublime.load_settings("favorite_files.sublime-settings").set("relocation_roots", [self.root])
+        moved = os.path.join(self.root, 'renamed')
+        os.rename(self.repo, moved)
+        os.remove(os.path.join(moved, 'c.txt'))
+
+        self.favs.load(force=True, clean=True)
+        data = self.saved()
+        self.assertEqual([e['file'] for e in data['files']], [os.path.join(moved, 'a.txt')])
+        self.assertEqual([e['file'] for e in data['groups']['group']], [os.path.join(moved, 'src', 'b.txt')])
+        self.assertEqual(data['groups']['group'][0]['alias'], 'b.txt')
+        self.assertNotIn('gone', data['groups'])
+
+    def test_relocate_edited(self):
+        """Test that a file that was edited and then moved is found."""
+
+        self.sublime.load_settings("favorite_files.sublime-settings").set("relocation_roots", [self.root])
+        with open(self.files[0], 'a') as f:
+            f.write('changed')
+        moved = os.path.join(self.root, 'moved.txt')
+        os.rename(self.files[0], moved)
+
+        self.favs.load(force=True, clean=True)
+        self.assertEqual([e['file'] for e in self.saved()['files']], [moved])
+
+    def test_no_roots(self):
+        """Test that moved files are orphaned without relocation roots."""
+
+        os.rename(self.repo, os.path.join(self.root, 'renamed'))
+        self.favs.load(force=True, clean=True)
+        data = self.saved()
+        self.assertEqual(data['files'], [])
+        self.assertEqual(data['groups'], {})
+
+    def test_find_moved(self):
+        """Test that files are found by device and inode, preferring a path with the recorded size and mtime."""
+
+        relocate = util.load_module('lib.relocate')
+        fp = relocate.fingerprint(self.files[0])
+        with open(self.files[0], 'a') as f:
+            f.write('changed')
+        self.assertEqual(relocate.find_moved([fp], [self.root]), {(fp[0], fp[1]): self.files[0]})
+        other = relocate.fingerprint(self.files[2])
+        os.remove(self.files[2])
+        self.assertEqual(relocate.find_moved([other], [self.root]), {})
+
+        # Overlapping roots find the same path twice
+        fp = relocate.fingerprint(self.files[1])
+        found = relocate.find_moved([fp], [self.root, self.repo])
+        self.assertEqual(found, {(fp[0], fp[1]): self.files[1]})
+
+
+if __name__ == "__main__":
+    unittest.main()
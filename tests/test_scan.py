@@ -0,0 +1,167 @@
+"""Test directory scanning and rules."""
+import unittest
+import os
+import shutil
+import tempfile
+from . import util
+
+
+class TestScan(unittest.TestCase):
+    """Test directory scanning and rules."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.scan = util.load_module('lib.scan')
+        self.root = os.path.join(self.tempdir, 'project')
+        for name in ('a.py', 'a.txt', 'x/b.py', 'x/y/c.py', 'z/d.py'):
+            self.touch(name)
+        self.plugin.RuleCache.clear()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.sublime.flush_async()
+        shutil.rmtree(self.tempdir)
+
+    def touch(self, name):
+        """Create a file under the project folder and return its path."""
+
+        path = os.path.join(self.root, *name.split('/'))
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(name)
+        return path
+
+    def glob(self, pattern, cache=None):
+        """Return the files under the project folder matching the pattern, relative to it."""
+
+        found = (cache or self.scan).iter_glob(os.path.join(self.root, pattern))
+        return sorted(os.path.relpath(path, self.root).replace('\\', '/') for path in found)
+
+    def test_translate(self):
+        """Test translating glob parts."""
+
+        regex = self.scan.compile_glob(['**', '*.py'])
+        for path in ('a.py', 'x/b.py', 'x/y/c.py'):
+            self.assertIsNotNone(regex.match(path))
+        self.assertIsNone(regex.match('a.txt'))
+
+        regex = self.scan.compile_glob(['[!x]?.py'])
+        self.assertIsNotNone(regex.match('ab.py'))
+        self.assertIsNone(regex.match('xb.py'))
+        self.assertIsNone(regex.match('a/b.py'))
+
+        # An unclosed class is a literal
+        self.assertEqual(self.scan._translate_part('[a'), r'\[a')
+        self.assertIsNotNone(self.scan.compile_glob(['[]]']).match(']'))
+
+    def test_split(self):
+        """Test splitting the literal base folder from the pattern."""
+
+        root = self.root.replace('\\', '/')
+        self.assertEqual(
+            self.scan.split_glob(self.root + '/x/*/c.py'), (os.path.normpath(root + '/x'), ['*', 'c.py'])
+        )
+        self.assertEqual(self.scan.split_glob(self.root + '/x/y'), (os.path.normpath(root + '/x/y'), []))
+        self.assertEqual(self.scan.split_glob('*.py'), (os.curdir, ['*.py']))
+        self.assertEqual(self.scan.glob_depth(['*', '*.py']), 2)
+        self.assertIsNone(self.scan.glob_depth(['x', '**', '*.py']))
+
+    def test_glob(self):
+        """Test expanding globs."""
+
+        self.assertEqual(self.glob('**/*.py'), ['a.py', 'x/b.py', 'x/y/c.py', 'z/d.py'])
+        self.assertEqual(self.glob('x/**/*.py'), ['x/b.py', 'x/y/c.py'])
+        self.assertEqual(self.glob('*/*.py'), ['x/b.py', 'z/d.py'])
+        self.assertEqual(self.glob('[!x]/*.py'), ['z/d.py'])
+        # Literal folders and files
+        self.assertEqual(self.glob('x'), ['x/b.py', 'x/y/c.py'])
+        self.assertEqual(self.glob('a.txt'), ['a.txt'])
+        self.assertEqual(self.glob('missing'), [])
+
+    def test_depth(self):
+        """Test that walks stop at the depth a glob can match."""
+
+        depths = []
+
+        def walk(root, max_depth=None):
+            depths.append(max_depth)
+            return self.scan.walk_files(root, max_depth)
+
+        found = list(self.scan.iter_glob(os.path.join(self.root, '*', '*.py'), walk))
+        self.assertEqual(depths, [2])
+        self.assertEqual(len(found), 2)
+        self.assertEqual(len(list(self.scan.walk_files(self.root, 1))), 2)
+        self.assertEqual(len(list(self.scan.walk_files(self.root))), 5)
+
+    def test_cache(self):
+        """Test that unchanged folders are not scanned again."""
+
+        cache = self.scan.ScanCache()
+        self.assertEqual(self.glob('**/*.py', cache), ['a.py', 'x/b.py', 'x/y/c.py', 'z/d.py'])
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+        self.assertEqual(self.glob('**/*.py', cache), ['a.py', 'x/b.py', 'x/y/c.py', 'z/d.py'])
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+
+        # Only the changed folder is scanned again
+        folder = os.path.join(self.root, 'x', 'y')
+        self.touch('x/y/e.py')
+        mtime = os.stat(folder).st_mtime_ns
+        os.utime(folder, ns=(mtime, mtime + 10 ** 9))
+        self.assertEqual(self.glob('**/*.py', cache), ['a.py', 'x/b.py', 'x/y/c.py', 'x/y/e.py', 'z/d.py'])
+        self.assertEqual((cache.hits, cache.misses), (7, 5))
+
+    def test_cache_bounded(self):
+        """Test that the least recently used listings are dropped."""
+
+        cache = self.scan.ScanCache(max_folders=2)
+        self.assertEqual(self.glob('**/*.py', cache), ['a.py', 'x/b.py', 'x/y/c.py', 'z/d.py'])
+        self.assertEqual(len(cache._folders), 2)
+        self.assertEqual(self.glob('z/*.py', cache), ['z/d.py'])
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+    def test_check(self):
+        """Test that a walk stops between folders when the check fails, even without matches."""
+
+        checked = []
+
+        def check():
+            checked.append(True)
+            return len(checked) < 3
+
+        self.assertEqual(list(self.scan.ScanCache().iter_glob(os.path.join(self.root, '**', '*.none'), check)), [])
+        self.assertEqual(len(checked), 3)
+
+    def test_rule_commands(self):
+        """Test adding, expanding, and removing a rule."""
+
+        window = self.sublime.create_window()
+        rule = os.path.join(self.root, 'x', '**', '*.py')
+        self.plugin.FavoriteFilesAddRuleCommand(window).run(rule=rule)
+        self.plugin.FavoriteFilesAddRuleCommand(window).run(rule=rule)
+        self.assertEqual(self.sublime.messages[-1], ('error', 'FavoriteFiles:\nRule "%s" already exists.' % rule))
+
+        command = self.plugin.FavoriteFilesOpenCommand(window)
+        command.run()
+        self.sublime.flush_async()
+        self.assertEqual(window.quick_panel.items, [["Rule: " + rule, rule]])
+        window.select(0)
+        command.rule_worker.join(5)
+        self.sublime.flush_async()
+        paths = [os.path.join(self.root, 'x', 'b.py'), os.path.join(self.root, 'x', 'y', 'c.py')]
+        self.assertEqual(sorted(row[1] for row in window.quick_panel.items), paths)
+        window.select([row[1] for row in window.quick_panel.items].index(paths[1]))
+        self.assertEqual(window.active_view().file_name(), paths[1])
+
+        self.plugin.FavoriteFilesRemoveCommand(window).run()
+        self.sublime.flush_async()
+        window.select(0)
+        self.assertFalse(self.plugin.Favs.rule_exists(rule))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Test the settings snapshot."""
+import unittest
+import shutil
+import tempfile
+from . import util
+
+
+class TestSettings(unittest.TestCase):
+    """Test settings."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.settings = util.load_module('lib.settings')
+        self.obj = self.sublime.load_settings(self.settings.SETTINGS_FILE)
+
+    def tearDown(self):
+        """Cleanup."""
+
+        self.settings.remove_listener('test')
+        shutil.rmtree(self.tempdir)
+
+    def test_defaults(self):
+        """Test that missing options use the defaults."""
+
+        self.assertEqual(self.settings.get(), self.settings.DEFAULTS)
+
+    def test_snapshot(self):
+        """Test that the snapshot is read only and only replaced on change."""
+
+        options = self.settings.get()
+        with self.assertRaises(AttributeError):
+            options.always_ask_alias = True
+        self.assertIs(self.settings.get(), options)
+
+        self.obj.set('always_ask_alias', True)
+        self.assertTrue(self.settings.get().always_ask_alias)
+        self.assertFalse(options.always_ask_alias)
+
+    def test_invalid(self):
+        """Test that values of the wrong type use the default."""
+
+        self.obj.set('metrics_log_interval', "10")
+        self.assertEqual(self.settings.get().metrics_log_interval, 0)
+
+    def test_listener(self):
+        """Test change listeners."""
+
+        seen = []
+        self.settings.add_listener('test', seen.append)
+        self.obj.set('enable_metrics', True)
+        self.assertEqual([options.enable_metrics for options in seen], [True])
+        self.assertTrue(self.plugin.metrics.enabled)
+        self.obj.set('enable_metrics', False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Test the support commands."""
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import types
+from . import util
+
+
+class TestRenderCache(unittest.TestCase):
+    """Test caching rendered markdown."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.sublime, self.plugin = util.setup_plugin(self.tempdir)
+        self.support = util.load_module('support')
+        self.renders = []
+        self.phantoms = []
+
+        mdpopups = types.ModuleType('mdpopups')
+        mdpopups.version = lambda: (4, 0, 0)
+        mdpopups.md2html = lambda view, text: self.renders.append(text) or '<p>%s</p>' % text
+        mdpopups.add_phantom = lambda view, key, region, content, layout, **kwargs: self.phantoms.append(
+            (content, kwargs['md'])
+        )
+        self.mdpopups = sys.modules.get('mdpopups')
+        sys.modules['mdpopups'] = mdpopups
+        self.clear()
+
+        self.sublime.add_resource('Packages/FavoriteFiles/CHANGES.md', '# Changes')
+        self.window = self.sublime.create_window()
+
+    def tearDown(self):
+        """Cleanup."""
+
+        if self.mdpopups is None:
+            del sys.modules['mdpopups']
+        else:
+            sys.modules['mdpopups'] = self.mdpopups
+        self.clear()
+        shutil.rmtree(self.tempdir)
+
+    def clear(self):
+        """Forget what the support module cached."""
+
+        self.support._rendered.clear()
+        del self.support._mdpopups[:]
+
+    def test_memory(self):
+        """Test that the changelog is only rendered once per color scheme."""
+
+        command = self.support.FavoriteFilesChangesCommand(self.window)
+        command.run()
+        command.run()
+        self.assertEqual(self.renders, ['# Changes'])
+        self.assertEqual(self.phantoms, [('<p># Changes</p>', False)] * 2)
+
+        self.sublime.add_resource('Packages/FavoriteFiles/CHANGES.md', '# More changes')
+        command.run()
+        self.assertEqual(self.renders, ['# Changes', '# More changes'])
+
+    def test_disk(self):
+        """Test that renders are reused across sessions when the disk cache is enabled."""
+
+        self.sublime.load_settings("favorite_files.sublime-settings").set("cache_rendered_docs", True)
+        command = self.support.FavoriteFilesChangesCommand(self.window)
+        command.run()
+        self.clear()
+        command.run()
+        self.assertEqual(self.renders, ['# Changes'])
+        self.assertEqual(len(os.listdir(os.path.join(self.sublime.cache_path(), 'FavoriteFiles', 'rendered'))), 1)
+
+    def test_no_phantoms(self):
+        """Test that old versions of mdpopups show the plain text."""
+
+        sys.modules['mdpopups'].version = lambda: (1, 9, 0)
+        self.support.FavoriteFilesChangesCommand(self.window).run()
+        self.assertEqual(self.phantoms, [])
+        self.assertEqual(self.window.active_view().text, '# Changes')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""Test background tasks."""
+import unittest
+import threading
+from . import util
+
+tasks = util.load_module('lib.tasks')
+metrics = util.load_module('lib.metrics')
+sublime = util.load_api('sublime')
+
+
+class TestTaskScheduler(unittest.TestCase):
+    """Test the task scheduler."""
+
+    def setUp(self):
+        """Setup."""
+
+        self.scheduler = tasks.TaskScheduler()
+        self.ran = []
+        self.done = []
+
+    def task(self, name, result=None, wait=None, started=None):
+        """Create a task function."""
+
+        def fn():
+            if started is not None:
+                started.set()
+            if wait is not None:
+                wait.wait(5)
+            self.ran.append(name)
+            return result
+        return fn
+
+    def block(self):
+        """Block the async thread until the returned event is set."""
+
+        gate = threading.Event()
+        started = threading.Event()
+
+        def fn():
+            started.set()
+            gate.wait(5)
+
+        sublime.set_timeout_async(fn, 0)
+        started.wait(5)
+        return gate
+
+    def test_result(self):
+        """Test that the result is delivered."""
+
+        self.scheduler.submit('a', self.task('a', 1), self.done.append)
+        sublime.flush_async()
+        self.assertEqual(self.ran, ['a'])
+        self.assertEqual(self.done, [1])
+
+    def test_coalesce(self):
+        """Test that queued tasks for the same key are replaced."""
+
+        gate = self.block()
+        self.scheduler.submit('a', self.task('first', 1), self.done.append)
+        self.scheduler.submit('b', self.task('other', 2), self.done.append)
+        self.scheduler.submit('a', self.task('second', 3), self.done.append)
+        self.assertEqual(self.scheduler.pending(), 2)
+        gate.set()
+        sublime.flush_async()
+        self.assertEqual(self.ran, ['second', 'other'])
+        self.assertEqual(self.done, [3, 2])
+
+    def test_supersede_running(self):
+        """Test that a running task's result is dropped when a newer task is submitted."""
+
+        release = threading.Event()
+        started = threading.Event()
+        self.scheduler.submit('a', self.task('first', 1, release, started), self.done.append)
+        started.wait(5)
+        self.scheduler.submit('a', self.task('second', 2), self.done.append)
+        release.set()
+        sublime.flush_async()
+        self.assertEqual(self.ran, ['first', 'second'])
+        self.assertEqual(self.done, [2])
+
+    def test_cancel(self):
+        """Test cancelling a task."""
+
+        gate = self.block()
+        self.scheduler.submit('a', self.task('a', 1), self.done.append)
+        self.scheduler.cancel('a')
+        gate.set()
+        sublime.flush_async()
+        self.assertEqual(self.ran, [])
+        self.assertEqual(self.done, [])
+
+    def test_main_thread(self):
+        """Test that results are delivered on the main thread."""
+
+        threads = []
+        started = threading.Event()
+        self.scheduler.submit(
+            'a', self.task('a', 1, started=started), lambda result: threads.append(threading.current_thread())
+        )
+        started.wait(5)
+        # Queued for the main thread, not run on the async thread
+        self.assertEqual(threads, [])
+        sublime.flush_async()
+        self.assertEqual(threads, [threading.current_thread()])
+
+    def test_command_latency(self):
+        """Test that a command's latency includes the tasks it started."""
+
+        registry = metrics.metrics
+        registry.enabled = True
+        registry.reset()
+        self.addCleanup(setattr, registry, 'enabled', False)
+
+        @registry.command('command')
+        def command():
+            self.scheduler.submit('a', self.task('a', 1, wait=gate), self.done.append)
+
+        gate = threading.Event()
+        command()
+        self.assertNotIn('command', registry.summary()['latency'])
+        gate.set()
+        sublime.flush_async()
+        self.assertEqual(self.done, [1])
+        self.assertEqual(registry.summary()['latency']['command']['count'], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
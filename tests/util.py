@@ -0,0 +1,74 @@
+"""Test utilities for loading the plugin outside of Sublime Text."""
+import importlib
+import json
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ST_API = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'st_api')
+
+
+def setup_environment():
+    """Make the stand-in Sublime API and the `FavoriteFiles` package importable."""
+
+    if ST_API not in sys.path:
+        sys.path.insert(0, ST_API)
+
+    if 'FavoriteFiles' not in sys.modules:
+        package = types.ModuleType('FavoriteFiles')
+        package.__path__ = [ROOT]
+        sys.modules['FavoriteFiles'] = package
+
+
+def load_module(name):
+    """Import a `FavoriteFiles` module using the stand-in Sublime API."""
+
+    setup_environment()
+    return importlib.import_module('FavoriteFiles.' + name)
+
+
+def load_api(name):
+    """Import the stand-in Sublime API module (`sublime` or `sublime_plugin`)."""
+
+    setup_environment()
+    return importlib.import_module(name)
+
+
+def make_favorites(count, groups=0, group_size=0, root='/home/build/workspaces/repo'):
+    """Generate a favorites list with `count` global files and `groups` groups of `group_size` files."""
+
+    def entry(path):
+        return {"file": path, "alias": os.path.basename(path)}
+
+    return {
+        "version": 2,
+        "files": [entry('%s/src/module%d/file%d.py' % (root, i // 100, i)) for i in range(count)],
+        "groups": dict(
+            ('group%d' % g, [entry('%s/group%d/file%d.py' % (root, g, i)) for i in range(group_size)])
+            for g in range(groups)
+        )
+    }
+
+
+def write_favorites(filename, data):
+    """Write a favorites list."""
+
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def setup_plugin(packages):
+    """Reset the stand-in Sublime API and load the plugin with `packages` as the packages path."""
+
+    sublime = load_api('sublime')
+    sublime.reset()
+    # Drop rate limits recorded by earlier tests
+    load_module('lib.notify')._last_shown.clear()
+    sublime.set_packages_path(packages)
+    user = os.path.join(packages, 'User')
+    if not os.path.exists(user):
+        os.makedirs(user)
+    plugin = load_module('favorite_files')
+    plugin.plugin_loaded()
+    return sublime, plugin
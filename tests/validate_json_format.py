@@ -5,6 +5,7 @@ Licensed under MIT
 Copyright (c) 2012-2015 Isaac Muse <isaacmuse@gmail.com>
 """
 import re
+import bisect
 import codecs
 import json
 
@@ -95,25 +96,23 @@ class CheckJsonFormat(object):
         self.fail = False
 
     def index_lines(self, text):
-        """Index the char range of each line."""
+        """Index the char offset where each line starts."""
 
-        self.line_range = []
-        count = 1
-        last = 0
-        for m in re.finditer('\n', text):
-            self.line_range.append((last, m.end(0) - 1, count))
-            last = m.end(0)
-            count += 1
+        self.line_starts = [0]
+        self.line_starts.extend(m.end(0) for m in re.finditer('\n', text))
 
     def get_line(self, pt):
         """Get the line from char index."""
 
-        line = None
-        for r in self.line_range:
-            if pt >= r[0] and pt <= r[1]:
-                line = r[2]
-                break
-        return line
+        return bisect.bisect_right(self.line_starts, pt)
+
+    def original_position(self, pt):
+        """Map a char index in the comment stripped text back to the original text."""
+
+        index = bisect.bisect_right(self.stripped_starts, pt) - 1
+        if index < 0:
+            return pt
+        return self.original_starts[index] + (pt - self.stripped_starts[index])
 
     def check_comments(self, text):
         """
@@ -125,19 +124,25 @@ class CheckJsonFormat(object):
         def remove_comments(group):
             return ''.join([x[0] for x in RE_LINE_PRESERVE.findall(group)])
 
-        def evaluate(m):
-            text = ''
+        # Map each chunk of the stripped text to where it started in the original text
+        self.stripped_starts = []
+        self.original_starts = []
+        chunks = []
+        offset = 0
+        for m in RE_COMMENT.finditer(text):
             g = m.groupdict()
             if g["code"] is None:
                 if not self.allow_comments:
                     self.log_failure(E_COMMENTS, self.get_line(m.start(0)))
-                text = remove_comments(g["comments"])
+                chunk = remove_comments(g["comments"])
             else:
-                text = g["code"]
-            return text
+                chunk = g["code"]
+            self.stripped_starts.append(offset)
+            self.original_starts.append(m.start(0))
+            chunks.append(chunk)
+            offset += len(chunk)
 
-        content = ''.join(map(lambda m: evaluate(m), RE_COMMENT.finditer(text)))
-        return content
+        return ''.join(chunks)
 
     def check_dangling_commas(self, text):
         """
@@ -156,7 +161,9 @@ class CheckJsonFormat(object):
 
         def evaluate(m):
             g = m.groupdict()
-            return check_comma(g, m, self.get_line(m.start(0))) if g["code"] is None else g["code"]
+            if g["code"] is None:
+                return check_comma(g, m, self.get_line(self.original_position(m.start(0))))
+            return g["code"]
 
         return ''.join(map(lambda m: evaluate(m), RE_TRAILING_COMMA.finditer(text)))
 
@@ -179,42 +186,41 @@ class CheckJsonFormat(object):
         self.fail = False
         comment_align = None
         with codecs.open(file_name, encoding='utf-8') as f:
-            count = 1
-            for line in f:
-                indent_match = (RE_LINE_INDENT_TAB if self.use_tabs else RE_LINE_INDENT_SPACE).match(line)
-                end_comment = (comment_align is not None or indent_match.group(2)) and RE_COMMENT_END.search(line)
-                # Don't allow empty lines at file start.
-                if count == 1 and line.strip() == '':
-                    self.log_failure(W_NL_START, count)
-                # Line must end in new line
-                if not line.endswith('\n'):
-                    self.log_failure(W_NL_END, count)
-                # Trailing spaces
-                if RE_TRAILING_SPACES.match(line):
-                    self.log_failure(W_TRAILING_SPACE, count)
-                # Handle block comment content indentation
-                if comment_align is not None:
-                    if comment_align.match(line) is None:
-                        self.log_failure(W_COMMENT_INDENT, count)
-                    if end_comment:
-                        comment_align = None
-                # Handle general indentation
-                elif indent_match is None:
-                    self.log_failure(W_INDENT, count)
-                # Enter into block comment
-                elif comment_align is None and indent_match.group(2):
-                    alignment = indent_match.group(1) if indent_match.group(1) is not None else ""
-                    if not end_comment:
-                        comment_align = re.compile(
-                            (PATTERN_COMMENT_INDENT_TAB if self.use_tabs else PATTERN_COMMENT_INDENT_SPACE) % alignment
-                        )
-                count += 1
-            f.seek(0)
             text = f.read()
 
+        count = 1
+        for line in text.splitlines(True):
+            indent_match = (RE_LINE_INDENT_TAB if self.use_tabs else RE_LINE_INDENT_SPACE).match(line)
+            end_comment = (comment_align is not None or indent_match.group(2)) and RE_COMMENT_END.search(line)
+            # Don't allow empty lines at file start.
+            if count == 1 and line.strip() == '':
+                self.log_failure(W_NL_START, count)
+            # Line must end in new line
+            if not line.endswith('\n'):
+                self.log_failure(W_NL_END, count)
+            # Trailing spaces
+            if RE_TRAILING_SPACES.match(line):
+                self.log_failure(W_TRAILING_SPACE, count)
+            # Handle block comment content indentation
+            if comment_align is not None:
+                if comment_align.match(line) is None:
+                    self.log_failure(W_COMMENT_INDENT, count)
+                if end_comment:
+                    comment_align = None
+            # Handle general indentation
+            elif indent_match is None:
+                self.log_failure(W_INDENT, count)
+            # Enter into block comment
+            elif comment_align is None and indent_match.group(2):
+                alignment = indent_match.group(1) if indent_match.group(1) is not None else ""
+                if not end_comment:
+                    comment_align = re.compile(
+                        (PATTERN_COMMENT_INDENT_TAB if self.use_tabs else PATTERN_COMMENT_INDENT_SPACE) % alignment
+                    )
+            count += 1
+
         self.index_lines(text)
         text = self.check_comments(text)
-        self.index_lines(text)
         text = self.check_dangling_commas(text)
         try:
             json.loads(text)
@@ -0,0 +1,167 @@
+"""
+Validate the JSON format of Sublime resource files in bulk.
+
+Files are discovered in a single walk, validated across a process pool, and results are
+cached by file content so unchanged files are skipped on the next run. Results are
+always reported in path order.
+
+    python -m tests.validate_json_runner [folder ...] [--jobs N] [--no-cache]
+
+Licensed under MIT
+Copyright (c) 2012-2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import argparse
+import contextlib
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from . import validate_json_format
+
+PATTERNS = (
+    '*.sublime-settings',
+    '*.sublime-keymap',
+    '*.sublime-commands',
+    '*.sublime-menu',
+    '*.sublime-theme'
+)
+EXCLUDES = ('.svn', '.git', '.tox')
+CACHE_DIR = '.json_validate_cache'
+CACHE_FILE = 'results.json'
+
+# Run in-process below this many files as starting a pool costs more than it saves
+MIN_PARALLEL = 8
+
+
+def discover(folder='.', patterns=PATTERNS, excludes=EXCLUDES):
+    """Find all files matching any of the patterns in a single walk."""
+
+    found = []
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in excludes:
+                    stack.append(entry.path)
+            elif any(fnmatch.fnmatch(entry.name, p) for p in patterns):
+                found.append(entry.path)
+    return sorted(found)
+
+
+def validator_fingerprint():
+    """Return a hash of the validator so cached results are dropped when it changes."""
+
+    with open(validate_json_format.__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def content_key(path, fingerprint):
+    """Return the cache key for the file's content."""
+
+    h = hashlib.sha1(fingerprint.encode('utf-8'))
+    with open(path, 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def validate_file(path):
+    """Validate a file and return whether it failed and what was reported."""
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            failed = validate_json_format.CheckJsonFormat(False, True).check_format(path)
+        except Exception as e:
+            # One broken file should not stop the validation of the others
+            print('Validation error: %s' % e)
+            failed = True
+    return bool(failed), output.getvalue()
+
+
+def load_cache(cache_dir):
+    """Load cached results."""
+
+    try:
+        with open(os.path.join(cache_dir, CACHE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_dir, cache):
+    """Save cached results."""
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    filename = os.path.join(cache_dir, CACHE_FILE)
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(cache, f)
+    os.replace(filename + '.tmp', filename)
+
+
+def validate(paths, cache_dir=CACHE_DIR, jobs=None):
+    """
+    Validate the files and return a list of `(path, failed, output)` in the order given.
+
+    Pass `None` as `cache_dir` to disable the cache.
+    """
+
+    fingerprint = validator_fingerprint()
+    cache = load_cache(cache_dir) if cache_dir is not None else {}
+    keys = [content_key(path, fingerprint) for path in paths]
+    todo = []
+    pending = set()
+    for path, key in zip(paths, keys):
+        # Files with identical content only need to be validated once
+        if key not in cache and key not in pending:
+            pending.add(key)
+            todo.append((path, key))
+
+    if todo:
+        if len(todo) < MIN_PARALLEL or jobs == 1:
+            fresh = [validate_file(path) for path, _ in todo]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                fresh = list(executor.map(validate_file, [path for path, _ in todo], chunksize=4))
+        for (_, key), (failed, output) in zip(todo, fresh):
+            cache[key] = [failed, output]
+        if cache_dir is not None:
+            # Only keep results for files that still exist in this form
+            save_cache(cache_dir, dict((key, cache[key]) for key in keys))
+
+    return [(path, cache[key][0], cache[key][1]) for path, key in zip(paths, keys)]
+
+
+def main():
+    """Validate the given folders."""
+
+    parser = argparse.ArgumentParser(description='Validate the JSON format of Sublime resource files.')
+    parser.add_argument('folders', nargs='*', default=['.'], help='Folders to search.')
+    parser.add_argument('--jobs', type=int, default=None, help='Number of worker processes.')
+    parser.add_argument('--no-cache', action='store_true', help='Validate every file.')
+    args = parser.parse_args()
+
+    paths = []
+    for folder in args.folders:
+        paths.extend(discover(folder))
+    results = validate(paths, None if args.no_cache else CACHE_DIR, args.jobs)
+    failures = 0
+    for path, failed, output in results:
+        if failed:
+            failures += 1
+            print(path)
+            print(output)
+    print('%d file(s) validated, %d failed' % (len(results), failures))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())